@@ -1,26 +1,38 @@
 import logging
+import os
 
 import falcon
 from falcon_cors import CORS
 from falcon_auth import FalconAuthMiddleware
 import rollbar
 from falcon import media
-import rapidjson
-from functools import partial
-from rapidjson import DM_ISO8601, UM_CANONICAL, NM_DECIMAL
 from falcon_swagger_ui import register_swaggerui_app
 
 # from .database.manager import db
 from app.config import appconfig, Environment
 
 
-from app.controllers.users_controller import UsersManager, UsersListManager
-
-from app.lib.middleware import ResponseLoggerMiddleware
+from app.controllers.users_controller import (
+    UsersManager,
+    UsersListManager,
+    UsersBulkManager,
+)
+from app.controllers.metrics_controller import MetricsResource
+from app.controllers.stats_controller import StatsResource
+from app.controllers.profile_controller import ProfileResource
+
+from app.lib.middleware import (
+    ResponseLoggerMiddleware,
+    MetricsMiddleware,
+    DbConnectionMiddleware,
+)
 from app.lib.exceptions import ValidationError, ObjectCreationError
-from app.lib.validation import CustomJSONHandler
+from app.lib.serialization import media_dumps, use_encoder
+from app.lib.encoders import get_encoder
+from app.lib.access_log import AccessLog
+from app.lib.profiler import Profiler
 from app.connections import db, datadog_middleware
-from app import __version__
+from app import __version__, root
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +43,12 @@ class FalconService(falcon.API):
     def __init__(self, *args, **kargs):
         # database manager
         self.db = db
+        # written from a thread of its own, started by each worker
+        self.access_log = AccessLog.create(appconfig)
+        # sampling profiler, started by each worker
+        self.profiler = Profiler.create(
+            appconfig, directory=os.path.join(root, "data", "profiles")
+        )
 
         if appconfig.app.environment in [
             Environment.production.value,
@@ -58,7 +76,9 @@ class FalconService(falcon.API):
         cors = CORS(**cors_parameters)
         # preparing the final list of middlewares
         list_middlewares = [
-            ResponseLoggerMiddleware(),
+            ResponseLoggerMiddleware(self.access_log),
+            MetricsMiddleware(self.db),
+            DbConnectionMiddleware(self.db),
             cors.middleware,
             # auth_middleware,
         ]
@@ -76,16 +96,14 @@ class FalconService(falcon.API):
 
         # custom media handlers
 
-        json_handler = media.JSONHandler(
-            dumps=partial(
-                rapidjson.dumps,
-                ensure_ascii=False, sort_keys=True,  datetime_mode=DM_ISO8601
-            ),
-        )        
+        # the responses can be attrs objects, see media_dumps
+        encoder = get_encoder(appconfig.app.json_encoder)
+        logger.warning(f"JSON encoder: {encoder.name}")
+        use_encoder(encoder)
+        json_handler = media.JSONHandler(dumps=media_dumps, loads=encoder.loads)
         extra_handlers = {
             'application/json': json_handler,
         }        
-        # handlers = falcon.media.Handlers({"application/json": CustomJSONHandler()})
 
         self.req_options.media_handlers.update(extra_handlers)
         self.resp_options.media_handlers.update(extra_handlers)
@@ -114,14 +132,49 @@ class FalconService(falcon.API):
         self.add_route(
             "/users/all",
             UsersListManager()
-        )        
+        )
+        self.add_route(
+            "/users/bulk",
+            UsersBulkManager()
+        )
+        self.add_route(
+            "/_stats",
+            StatsResource(self.db)
+        )
+        self.add_route(
+            "/metrics",
+            MetricsResource()
+        )
+        self.add_route(
+            "/_profile",
+            ProfileResource(self.profiler)
+        )
         print('all routes')    
         # fmt: on
 
+    def preload(self):
+        """ A hook to when Gunicorn loads the app in its master (preload_app),
+            the schema is reflected once for all the workers
+        """
+        self.db.connect()
+        # the workers must not inherit the connections of the master
+        self.db.engine.dispose()
+
+    def post_fork(self):
+        """ A hook to when a Gunicorn worker was forked from a preloading master """
+        self.db.engine.dispose()
+
     def start(self):
         """ A hook to when a Gunicorn worker calls run()."""
+        self.access_log.start()
+        self.profiler.start()
+        if self.db.ready:
+            # preloaded, the pool connects on the first request
+            return
         self.db.connect()
 
     def stop(self, signal):
         """ A hook to when a Gunicorn worker starts shutting down. """
         self.db.stop()
+        self.access_log.stop()
+        self.profiler.stop()
@@ -0,0 +1,163 @@
+""" The ASGI build of the service: the routes of app.py as coroutines, on
+    asyncpg (app/database/pycrudorm_async.py), served by uvicorn workers
+
+    python manage.py run-asgi
+"""
+import gc
+import logging
+import os
+
+import falcon
+import falcon.asgi
+import rollbar
+from falcon import media
+
+from app.config import appconfig, Environment
+from app.controllers.users_controller import (
+    AsyncUsersManager,
+    AsyncUsersListManager,
+    AsyncUsersBulkManager,
+)
+from app.controllers.metrics_controller import AsyncMetricsResource
+from app.controllers.stats_controller import AsyncStatsResource
+from app.controllers.profile_controller import AsyncProfileResource
+from app.lib.middleware import (
+    ResponseLoggerMiddleware,
+    MetricsMiddleware,
+    AsyncDbMiddleware,
+    ProfilerMiddleware,
+)
+from app.lib.exceptions import ValidationError, ObjectCreationError
+from app.lib.serialization import media_dumps, use_encoder
+from app.lib.encoders import get_encoder
+from app.lib.access_log import AccessLog
+from app.lib.profiler import Profiler
+from app.connections import async_db
+from app import __version__, root
+
+logger = logging.getLogger(__name__)
+
+
+class FalconASGIService(falcon.asgi.App):
+    def __init__(self, *args, **kargs):
+        # database manager, connected by the lifespan startup event
+        self.db = async_db
+        # written from a thread of its own, started by the lifespan startup
+        self.access_log = AccessLog.create(appconfig)
+        # sampling profiler, started by the lifespan startup
+        self.profiler = Profiler.create(
+            appconfig, directory=os.path.join(root, "data", "profiles")
+        )
+
+        if appconfig.app.environment in [
+            Environment.production.value,
+            Environment.test.value,
+        ]:
+            logger.warning("rollbar init")
+            rollbar.init(appconfig.app.rollbar, environment=appconfig.app.environment)
+        else:
+            logger.warning("rollbar not started")
+
+        # falcon_cors has no ASGI support, falcon 3 ships its own middleware
+        if appconfig.app.cors_enabled:
+            logger.warning("CORS is enabled")
+            cors = falcon.CORSMiddleware(allow_origins=appconfig.app.cors_allowed_host)
+        else:
+            logger.warning("NO CORS")
+            cors = falcon.CORSMiddleware(allow_origins="*")
+
+        list_middlewares = [
+            ResponseLoggerMiddleware(self.access_log),
+            MetricsMiddleware(self.db),
+            AsyncDbMiddleware(self.db),
+            ProfilerMiddleware(self.profiler),
+            cors,
+        ]
+
+        super().__init__(middleware=list_middlewares)
+
+        # error handlers
+        self.add_error_handler(ValidationError, ValidationError.handle_async)
+        self.add_error_handler(ObjectCreationError, ObjectCreationError.handle_async)
+
+        # custom media handlers
+        # the responses can be attrs objects, see media_dumps
+        encoder = get_encoder(appconfig.app.json_encoder)
+        logger.warning(f"JSON encoder: {encoder.name}")
+        use_encoder(encoder)
+        json_handler = media.JSONHandler(dumps=media_dumps, loads=encoder.loads)
+        extra_handlers = {
+            'application/json': json_handler,
+        }
+        self.req_options.media_handlers.update(extra_handlers)
+        self.resp_options.media_handlers.update(extra_handlers)
+
+        # fmt: off
+        class RootResource:
+            auth = {"exempt_methods": ["GET"]}
+
+            async def on_get(self, req, resp):
+                resp.media = {
+                    'service-version': __version__,
+                    'service-name': 'questionnaire-service',
+                }
+
+        self.add_route(
+            "/",
+            RootResource()
+        )
+        self.add_route(
+            "/users",
+            AsyncUsersManager()
+        )
+        self.add_route(
+            "/users/all",
+            AsyncUsersListManager()
+        )
+        self.add_route(
+            "/users/bulk",
+            AsyncUsersBulkManager()
+        )
+        self.add_route(
+            "/_stats",
+            AsyncStatsResource(self.db)
+        )
+        self.add_route(
+            "/metrics",
+            AsyncMetricsResource()
+        )
+        self.add_route(
+            "/_profile",
+            AsyncProfileResource(self.profiler)
+        )
+        # fmt: on
+
+    def preload(self):
+        """ A hook to when Gunicorn loads the app in its master (preload_app),
+            nothing to connect: the asyncpg pool is per worker (lifespan)
+        """
+
+    def post_fork(self):
+        """ A hook to when a Gunicorn worker was forked from a preloading master """
+
+
+app = FalconASGIService()
+
+
+def main() -> None:
+    # imported here: the WSGI build does not need the ASGI stack
+    from app.wsgi import GunicornApp
+
+    if appconfig.gunicorn.preload_app:
+        # until the app is loaded: GunicornApp sets the hooks enabling the
+        # collections again, see app.wsgi.when_ready and post_fork
+        gc.disable()
+
+    from app.lib import metrics
+
+    metrics.clear_multiprocess_dir()
+    gunicorn_app = GunicornApp(
+        app, appconfig.gunicorn, worker_class="uvicorn.workers.UvicornWorker"
+    )
+
+    gunicorn_app.run()
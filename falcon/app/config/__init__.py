@@ -1,39 +1,38 @@
 import logging
 import os
 
-from .config import ServiceConfig, Environment  # noqa
+import attr
+
+from .config import ServiceConfig, Environment, Reflection, WorkerModel  # noqa
 from .config import DbConfig, GunicornConfig, AppConfig
 
 logger = logging.getLogger(__name__)
 
 
+def from_env(prefix: str, config_class) -> dict:
+    """ Collects the fields of config_class overridden in the environment
+
+        ie: with prefix "HP__DB_", DbConfig.host is read from HP__DB_HOST
+    """
+    values = {}
+    for field in attr.fields(config_class):
+        value = os.getenv(f"{prefix}{field.name.upper()}")
+        if value is None:
+            continue
+        if isinstance(field.default, bool):
+            value = value.lower() in ("1", "true", "yes")
+        values[field.name] = value
+
+    return values
+
+
 def load_config(test=False) -> ServiceConfig:
 
-    # dumb version
-    db_config = DbConfig(
-        # host=os.getenv("HP__DB_HOST", ""),
-        # port=os.getenv("HP__DB_PORT", ""),
-        # user=os.getenv("HP__DB_USERNAME", ""),
-        # password=os.getenv("HP__DB_PASSWORD", ""),
-        # dbname=os.getenv("HP__DB_DBNAME", ""),
-    )
+    db_config = DbConfig(**from_env("HP__DB_", DbConfig))
 
-    gunicorn_config = GunicornConfig(
-        # bind=os.getenv("HP__GUNICORN_BIND"),
-        # workers=os.getenv("HP__GUNICORN_WORKERS"),
-        # timeout=os.getenv("HP__GUNICORN_TIMEOUT"),
-        # reload=bool(os.getenv("HP__GUNICORN_RELOAD")),
-    )
+    gunicorn_config = GunicornConfig(**from_env("HP__GUNICORN_", GunicornConfig))
 
-    app_config = AppConfig(
-        # salt=os.getenv("HP__APP_SALT"),
-        # secret_iv=os.getenv("HP__APP_SERCRET_IV"),
-        # amplitude=os.getenv("HP__APP_AMPLITUDE"),
-        # braze=os.getenv("HP__APP_BRAZE"),
-        # rollbar=os.getenv("HP__APP_ROLLBAR"),
-        # environment=Environment(os.getenv("HP__APP_ENVIRONMENT")),
-        # analytics_cache_threshold=os.getenv("HP__ANALYTICS_CACHE_THRESHOLD"),
-    )
+    app_config = AppConfig(**from_env("HP__APP_", AppConfig))
 
     return ServiceConfig(
         db=db_config,
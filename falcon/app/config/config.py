@@ -11,6 +11,34 @@ class Environment(enum.Enum):
     ci = "ci"
 
 
+class Reflection(enum.Enum):
+    """ Where the worker gets the table definitions of DataBaseManager.base
+
+        automap: reflects the database catalog on every worker boot
+        snapshot: loads the file written by `manage.py schema-snapshot`,
+                  reflects when the database schema changed since
+        declared: uses the tables of app/database/models/sqla_models.py
+    """
+
+    automap = "automap"
+    snapshot = "snapshot"
+    declared = "declared"
+
+
+class WorkerModel(enum.Enum):
+    """ How a gunicorn worker of the WSGI build handles its requests
+
+        sync: one request at a time
+        gthread: one request per thread, up to GunicornConfig.threads
+        gevent: one request per greenlet, up to worker_connections
+                (needs the gevent and psycogreen packages)
+    """
+
+    sync = "sync"
+    gthread = "gthread"
+    gevent = "gevent"
+
+
 class Borg(object):
     _state = {}
 
@@ -28,11 +56,27 @@ class DbConfig(object):
     password = related.StringField(default="password")
     dbname = related.StringField(default="falcon")
     echo_sql = related.BooleanField(default=False)
+    # connection pool, per worker
+    pool_size = related.IntegerField(default=5)
+    pool_max_overflow = related.IntegerField(default=10)
+    pool_recycle = related.IntegerField(default=1800)  # seconds, -1 to disable
+    pool_pre_ping = related.BooleanField(default=True)
+    pool_timeout = related.IntegerField(default=30)  # seconds to wait for a checkout
+    # table definitions, see Reflection
+    reflection = related.ChildField(Reflection, default=Reflection.automap)
+    reflection_schema = related.StringField(default="question")
+    # defaults to data/schema-snapshot.pickle
+    schema_snapshot = related.StringField(required=False, default=None)
 
     @property
     def sqlalchemy_database_uri(self):
         return f"postgres://{self.user}:{self.password}@{self.host}:{self.port}/{self.dbname}?application_name=falcon"
 
+    @property
+    def async_database_uri(self):
+        """ for the databases library (asyncpg) of the ASGI build """
+        return f"postgresql://{self.user}:{self.password}@{self.host}:{self.port}/{self.dbname}"
+
     @property
     def sqlalchemy_database_uri_nodb(self):
         return f"postgres://{self.user}:{self.password}@{self.host}:{self.port}/postgres?application_name=falcon"
@@ -44,6 +88,21 @@ class GunicornConfig(object):
     workers = related.IntegerField(default=1)
     timeout = related.IntegerField(default=3000)
     reload = related.BooleanField(default=False)
+    # see WorkerModel, the database pool should allow as many connections
+    worker_model = related.ChildField(WorkerModel, default=WorkerModel.sync)
+    threads = related.IntegerField(default=1)
+    worker_connections = related.IntegerField(default=1000)
+    # the app is built and the schema reflected once, by the master
+    preload_app = related.BooleanField(default=False)
+
+    @property
+    def concurrency(self) -> int:
+        """ requests handled at once by one worker """
+        if self.worker_model == WorkerModel.gthread:
+            return self.threads
+        if self.worker_model == WorkerModel.gevent:
+            return self.worker_connections
+        return 1
 
     @property
     def to_dict(self):
@@ -54,10 +113,38 @@ class GunicornConfig(object):
 class AppConfig(object):
     rollbar = related.StringField(required=False, default=None)
     environment = related.ChildField(Environment, default=Environment.dev)
-    caching = related.IntegerField(default=1)
+    # in-process cache of CRUD.load rows: off when 0, entries expire after
+    # cache_ttl seconds and the least recently used go beyond cache_size
+    caching = related.IntegerField(default=0)
+    cache_ttl = related.IntegerField(default=60)
+    cache_size = related.IntegerField(default=10000)
     cors_enabled = related.BooleanField(default=False)
     cors_allowed_host = related.StringField(required=True, default="localhost")
     host = related.StringField(required=True, default="http://localhost:8001")
+    # rows fetched per round trip by the streaming endpoints
+    stream_chunk_size = related.IntegerField(default=1000)
+    # keyset pagination of the list endpoints
+    page_default_limit = related.IntegerField(default=100)
+    page_max_limit = related.IntegerField(default=1000)
+    # items accepted by the bulk creation endpoints
+    bulk_max_items = related.IntegerField(default=1000)
+    # JSON library of the media handlers: auto, json, rapidjson, ujson or
+    # orjson, see app/lib/encoders.py
+    json_encoder = related.StringField(default="auto")
+    # access log of ResponseLoggerMiddleware: the level of the successful
+    # requests, and the share of them logged (errors are always logged)
+    access_log_level = related.StringField(default="INFO")
+    access_log_sample_rate = related.FloatField(default=1.0)
+    # sampling profiler, see app/lib/profiler.py. GET /_profile needs an
+    # "Authorization: Bearer <profiler_token>" header, and is off without one
+    profiler_token = related.StringField(required=False, default=None)
+    profiler_hz = related.IntegerField(default=100)
+    profiler_max_seconds = related.IntegerField(default=60)
+    # SIGUSR2 to a worker writes a profile to profiler_dir (data/profiles)
+    profiler_signal_seconds = related.IntegerField(default=30)
+    profiler_dir = related.StringField(required=False, default=None)
+    # always-on sampling of the worker, off when 0
+    profiler_continuous_hz = related.FloatField(default=0.0)
 
 @related.immutable
 class ServiceConfig(Borg):
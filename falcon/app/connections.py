@@ -5,6 +5,8 @@ import functools
 from app.config import appconfig, Environment
 
 from app.database.database import QuestionnaireDatabaseManager
+from app.database.pycrudorm_async import AsyncDataBaseManager
+from app.database.models import sqla_models
 
 from . import root
 
@@ -16,8 +18,14 @@ db = QuestionnaireDatabaseManager.create(
     sql_files=[
         "users.sql",
     ],
+    snapshot_path=os.path.join(root, "data", "schema-snapshot.pickle"),
+    declared_metadata=sqla_models.metadata,
 )
 
+# the ASGI build (app/asgi.py) queries through this one, connected by
+# its lifespan startup
+async_db = AsyncDataBaseManager.create(appconfig=appconfig, queries=db.queries)
+
 logger.warning("Initialise database schema...")
 
 ## for ddog
@@ -0,0 +1,26 @@
+from app.lib import metrics
+
+
+class MetricsResource:
+    """ The Prometheus metrics, of all the workers, see app.lib.metrics """
+
+    auth = {"exempt_methods": ["GET"]}
+
+    def on_get(self, req, resp):
+        """GET /metrics
+
+            Returns: the metrics in the Prometheus text format
+        """
+        resp.content_type = metrics.CONTENT_TYPE_LATEST
+        resp.data = metrics.latest()
+
+
+class AsyncMetricsResource:
+    """ MetricsResource of the ASGI build """
+
+    auth = {"exempt_methods": ["GET"]}
+
+    async def on_get(self, req, resp):
+        """GET /metrics, see MetricsResource"""
+        resp.content_type = metrics.CONTENT_TYPE_LATEST
+        resp.data = metrics.latest()
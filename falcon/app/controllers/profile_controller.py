@@ -0,0 +1,105 @@
+import asyncio
+import hmac
+import logging
+import os
+
+import falcon
+
+from app.config import appconfig, WorkerModel
+from app.lib.profiler import Profiler, ProfilerBusy, FORMATS
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileResource:
+    """ The sampling profiler of the worker answering, see app.lib.profiler """
+
+    def __init__(self, profiler: Profiler):
+        self.profiler = profiler
+
+    def on_get(self, req, resp):
+        """GET /_profile
+            headers: Authorization: Bearer <profiler_token>
+            params: seconds: samples the worker for that long (at most
+                    profiler_max_seconds), its other threads keep answering
+                    continuous (bool): the stacks of the continuous profiler
+                    instead, under their route, only the ones of route if given
+                    format: speedscope (default) or folded
+
+            Returns: the profile, as a file to open in speedscope
+                     (https://www.speedscope.app) or flamegraph.pl
+        """
+        fmt, route = self.check(req)
+        if req.get_param_as_bool("continuous"):
+            stacks = self.continuous_stacks()
+        else:
+            seconds = self.seconds(req)
+            if appconfig.gunicorn.worker_model == WorkerModel.sync:
+                raise falcon.HTTPConflict(
+                    title="Profiler Error",
+                    description="a sync worker answers one request at a time, "
+                    f"profile it with: kill -USR2 {os.getpid()}",
+                )
+            stacks = self.run(self.profiler.profile, seconds)
+
+        self.respond(resp, stacks, fmt, route)
+
+    def check(self, req):
+        """ (format, route) of an authenticated request """
+        token = appconfig.app.profiler_token
+        if not token or not self.profiler.enabled:
+            raise falcon.HTTPNotFound()
+
+        authorization = req.get_header("Authorization") or ""
+        if not hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode()):
+            raise falcon.HTTPUnauthorized(title="Profiler Error")
+
+        fmt = req.get_param("format") or FORMATS[0]
+        if fmt not in FORMATS:
+            raise falcon.HTTPInvalidParam(f"one of {', '.join(FORMATS)}", "format")
+        return fmt, req.get_param("route")
+
+    def seconds(self, req) -> int:
+        return req.get_param_as_int(
+            "seconds", min_value=1, max_value=self.profiler.max_seconds
+        ) or 10
+
+    def continuous_stacks(self):
+        if self.profiler.continuous is None:
+            raise falcon.HTTPConflict(
+                title="Profiler Error",
+                description="the continuous profiler is off, see profiler_continuous_hz",
+            )
+        return self.profiler.continuous
+
+    @staticmethod
+    def run(profile, seconds):
+        try:
+            return profile(seconds)
+        except ProfilerBusy as ex:
+            raise falcon.HTTPConflict(title="Profiler Error", description=str(ex))
+
+    @staticmethod
+    def respond(resp, stacks, fmt, route):
+        name = f"{os.getpid()}-{route or 'worker'}"
+        resp.content_type, resp.data = stacks.render(fmt, name, route)
+
+
+class AsyncProfileResource(ProfileResource):
+    """ ProfileResource of the ASGI build: the event loop keeps answering
+        while a thread samples it
+    """
+
+    async def on_get(self, req, resp):
+        """GET /_profile, see ProfileResource"""
+        fmt, route = self.check(req)
+        if req.get_param_as_bool("continuous"):
+            stacks = self.continuous_stacks()
+        else:
+            seconds = self.seconds(req)
+            loop = asyncio.get_running_loop()
+            stacks = await loop.run_in_executor(
+                None, self.run, self.profiler.profile, seconds
+            )
+
+        self.respond(resp, stacks, fmt, route)
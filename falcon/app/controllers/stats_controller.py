@@ -0,0 +1,37 @@
+import logging
+
+from app.database.base import BaseObject
+
+logger = logging.getLogger(__name__)
+
+
+class StatsResource:
+    """ Runtime counters of the worker answering, to tune its settings """
+
+    auth = {"exempt_methods": ["GET"]}
+
+    def __init__(self, db):
+        self.db = db
+
+    def on_get(self, req, resp):
+        """GET /_stats
+
+            Returns: the counters of this worker (one gunicorn worker)
+        """
+        resp.media = self.stats()
+
+    def stats(self) -> dict:
+        return {
+            "db_pool": self.db.pool_stats,
+            "queries": self.db.query_stats,
+            "statement_cache": BaseObject.statement_cache.as_dict,
+            "object_cache": BaseObject.object_cache.as_dict,
+        }
+
+
+class AsyncStatsResource(StatsResource):
+    """ StatsResource of the ASGI build, db is the AsyncDataBaseManager """
+
+    async def on_get(self, req, resp):
+        """GET /_stats, see StatsResource"""
+        resp.media = self.stats()
@@ -5,8 +5,23 @@ import falcon
 import sqlalchemy
 import attr
 
+from app.config import appconfig
 from app.models.users_models import User
-from app.lib.validation import  ValidatedEntity, ValidateRequest
+from app.lib.serialization import (
+    NDJSON,
+    stream_json_array,
+    stream_ndjson,
+    astream_json_array,
+    astream_ndjson,
+)
+from app.lib.pagination import encode_cursor, decode_cursor
+from app.lib.etag import make_etag, etag_matches
+from app.lib.validation import (
+    ValidatedEntity,
+    ValidateRequest,
+    AsyncValidateRequest,
+    describe_errors,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -47,18 +62,35 @@ class UsersManager:
             )
             
         # import ipdb; ipdb.set_trace()
-        resp.media = user.as_dict
+        resp.media = user
 
     
     def on_get(self, req, resp):
         """GET /users/{userid}/
             params: formid
+            headers: If-None-Match, answered with a 304 when the user did not
+                     change, only its version is read from the database
 
             Returns: Questions for the requested questionnaire
         """
-        user_id = req.get_param("user_id", required=True)
-        user = User.get_one(user_id)    
-        resp.media = user.json_response
+        user_id = req.get_param_as_int("user_id", required=True)
+
+        if_none_match = req.get_header("If-None-Match")
+        if if_none_match:
+            version = User.load_version(user_id=user_id)
+            if version is not None and etag_matches(if_none_match, make_etag(version)):
+                resp.set_header("ETag", make_etag(version))
+                resp.status = falcon.HTTP_304
+                return
+
+        user, version = User.load_with_version(user_id=user_id)
+        if user is None:
+            raise falcon.HTTPNotFound(
+                description="No User found with params %r" % {"user_id": user_id}
+            )
+
+        resp.set_header("ETag", make_etag(version))
+        resp.media = user
 
     @falcon.before(ValidateRequest(UserCreation))
     def on_put(self, req, resp, user_creation, **kwargs):
@@ -67,11 +99,14 @@ class UsersManager:
 
             Returns: Questions for the requested questionnaire
         """
-        user_id = req.get_param("user_id", required=True)
-        user = User.get_one(user_id)
-        user.update(**user_creation.json_response)
-        
-        resp.media = user.json_response
+        user_id = req.get_param_as_int("user_id", required=True)
+        user = User.load_or_404(user_id=user_id)
+
+        changes = user_creation.as_dict_not_null
+        changes.pop("user_id", None)
+        user.update(**changes)
+
+        resp.media = user
 
 
 
@@ -81,21 +116,240 @@ class UsersManager:
 
             Returns: Questions for the requested questionnaire
         """
-        user_id = req.get_param("user_id", required=True)
-        user = User.get_one(user_id)
+        user_id = req.get_param_as_int("user_id", required=True)
+        user = User.load_or_404(user_id=user_id)
         user.delete()
 
-        resp.media = user.json_response
+        resp.media = user
+
+
+class UsersBulkManager:
+    def on_post(self, req, resp):
+        """POST /users/bulk/
+            body: a JSON array of users, as posted to /users/, at most
+                  bulk_max_items of them
+
+            Returns: one result per posted user, in order, with either the
+                     created user or the reason it was not created. One
+                     invalid or duplicate user does not fail the others.
+        """
+        results, valid = self.validate(req, req.media)
+        users = User.create_many([values for _, values in valid]) if valid else []
+        resp.media = self.response(results, valid, users)
+
+    @staticmethod
+    def validate(req, payload):
+        """ The results of the invalid users, and the (index, values) of the
+            valid ones
+        """
+        if not isinstance(payload, list):
+            raise falcon.HTTPBadRequest(
+                title="Validation Error", description="expected a JSON array of users"
+            )
+        max_items = appconfig.app.bulk_max_items
+        if len(payload) > max_items:
+            raise falcon.HTTPBadRequest(
+                title="Validation Error",
+                description=f"at most {max_items} users can be created per request",
+            )
+
+        validator = UserCreation.validator()
+        results = [None] * len(payload)
+        valid = []
+        for index, item in enumerate(payload):
+            user_creation, errors = validator.validate(req, item)
+            if errors:
+                results[index] = {"index": index, "error": describe_errors(errors)}
+                continue
+            valid.append((index, user_creation.as_dict_not_null))
+
+        return results, valid
+
+    @staticmethod
+    def response(results, valid, users) -> dict:
+        for (index, _), user in zip(valid, users):
+            if user is None:
+                results[index] = {
+                    "index": index,
+                    "error": "User cannot be created, already exists",
+                }
+            else:
+                results[index] = {"index": index, "user": user.as_dict}
+
+        created = sum(1 for result in results if "user" in result)
+        return {
+            "created": created,
+            "failed": len(results) - created,
+            "results": results,
+        }
 
 
 class UsersListManager:
     def on_get(self, req, resp):
         """GET /users/all/
-            params: formid
+            params: limit, cursor: keyset pagination ordered by user_id, the
+                    cursor of the next page is sent in the X-Next-Cursor
+                    header (absent on the last page). Takes precedence
+                    over stream.
+                    stream (bool) streams the users from a server-side cursor,
+                    as a JSON array or as NDJSON when the client accepts
+                    application/x-ndjson
 
-            Returns: Questions for the requested questionnaire
+                    If-None-Match header, answered with a 304 when the users
+                    table was not written since
+
+            Returns: the users
         """
-        resp.media =  [x.as_dict for x in User.get_all()]
+        stream, ndjson = self.representation(req)
+        if self.not_modified(req, resp, User.table_version(), ndjson):
+            return
+
+        page = self.page(req)
+        if page is not None:
+            users, next_after = User.get_page(*page)
+            if next_after is not None:
+                resp.set_header("X-Next-Cursor", encode_cursor(next_after))
+            resp.media = users
+            return
+
+        if stream:
+            chunks = User.stream_all(chunk_size=appconfig.app.stream_chunk_size)
+            if ndjson:
+                resp.content_type = NDJSON
+                resp.stream = stream_ndjson(chunks)
+            else:
+                resp.content_type = falcon.MEDIA_JSON
+                resp.stream = stream_json_array(chunks)
+            return
+
+        resp.media = User.get_all()
+
+    @staticmethod
+    def representation(req):
+        """ (stream, ndjson) """
+        stream = req.get_param_as_bool("stream")
+        return stream, bool(stream and NDJSON in (req.accept or ""))
+
+    @staticmethod
+    def not_modified(req, resp, table_version: int, ndjson: bool) -> bool:
+        """ Sets the ETag, and the 304 status when If-None-Match matches it """
+        etag = make_etag(f"users-{table_version}", variant="ndjson" if ndjson else None)
+        resp.set_header("ETag", etag)
+        resp.vary = ("Accept",)
+        if etag_matches(req.get_header("If-None-Match"), etag):
+            resp.status = falcon.HTTP_304
+            return True
+        return False
+
+    @staticmethod
+    def page(req):
+        """ (limit, after) of a paginated request, None otherwise """
+        limit = req.get_param_as_int(
+            "limit", min_value=1, max_value=appconfig.app.page_max_limit
+        )
+        cursor = req.get_param("cursor")
+        if limit is None and cursor is None:
+            return None
+
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise falcon.HTTPInvalidParam("not a valid cursor", "cursor")
+
+        return limit or appconfig.app.page_default_limit, after
+
+
+# resources of the ASGI build (app/asgi.py), same routes and semantics
+
+
+class AsyncUsersManager:
+    @falcon.before(AsyncValidateRequest(UserCreation))
+    async def on_post(self, req, resp, user_creation: UserCreation, **kwargs):
+        """POST /users/, see UsersManager"""
+        try:
+            user = await User.acreate(**user_creation.as_dict_not_null)
+        except sqlalchemy.exc.IntegrityError:
+            raise falcon.HTTPError(
+                falcon.HTTP_400,
+                "User cannot be created, already exists",
+            )
+
+        resp.media = user
+
+    async def on_get(self, req, resp):
+        """GET /users/{userid}/, see UsersManager"""
+        user_id = req.get_param_as_int("user_id", required=True)
+
+        if_none_match = req.get_header("If-None-Match")
+        if if_none_match:
+            version = await User.aload_version(user_id=user_id)
+            if version is not None and etag_matches(if_none_match, make_etag(version)):
+                resp.set_header("ETag", make_etag(version))
+                resp.status = falcon.HTTP_304
+                return
+
+        user, version = await User.aload_with_version(user_id=user_id)
+        if user is None:
+            raise falcon.HTTPNotFound(
+                description="No User found with params %r" % {"user_id": user_id}
+            )
+
+        resp.set_header("ETag", make_etag(version))
+        resp.media = user
+
+    @falcon.before(AsyncValidateRequest(UserCreation))
+    async def on_put(self, req, resp, user_creation, **kwargs):
+        """PUT /users/{userid}/, see UsersManager"""
+        user_id = req.get_param_as_int("user_id", required=True)
+        user = await User.aload_or_404(user_id=user_id)
+
+        changes = user_creation.as_dict_not_null
+        changes.pop("user_id", None)
+        await user.aupdate(**changes)
+
+        resp.media = user
+
+    async def on_delete(self, req, resp):
+        """DELETE /users/{userid}/, see UsersManager"""
+        user_id = req.get_param_as_int("user_id", required=True)
+        user = await User.aload_or_404(user_id=user_id)
+        await user.adelete()
+
+        resp.media = user
+
+
+class AsyncUsersBulkManager:
+    async def on_post(self, req, resp):
+        """POST /users/bulk/, see UsersBulkManager"""
+        results, valid = UsersBulkManager.validate(req, await req.get_media())
+        users = await User.acreate_many([values for _, values in valid]) if valid else []
+        resp.media = UsersBulkManager.response(results, valid, users)
+
+
+class AsyncUsersListManager:
+    async def on_get(self, req, resp):
+        """GET /users/all/, see UsersListManager"""
+        stream, ndjson = UsersListManager.representation(req)
+        table_version = await User.atable_version()
+        if UsersListManager.not_modified(req, resp, table_version, ndjson):
+            return
 
+        page = UsersListManager.page(req)
+        if page is not None:
+            users, next_after = await User.aget_page(*page)
+            if next_after is not None:
+                resp.set_header("X-Next-Cursor", encode_cursor(next_after))
+            resp.media = users
+            return
 
+        if stream:
+            chunks = User.astream_all(chunk_size=appconfig.app.stream_chunk_size)
+            if ndjson:
+                resp.content_type = NDJSON
+                resp.stream = astream_ndjson(chunks)
+            else:
+                resp.content_type = falcon.MEDIA_JSON
+                resp.stream = astream_json_array(chunks)
+            return
 
+        resp.media = await User.aget_all()
@@ -1,6 +1,13 @@
-from app.database.pycrudorm import CRUD
-from app.connections import db
+from app.config import appconfig
+from app.database.pycrudorm import ObjectCache
+from app.database.pycrudorm_async import AsyncCRUD
+from app.connections import db, async_db
 
 
-class BaseObject(CRUD):
+class BaseObject(AsyncCRUD):
     db = db
+    adb = async_db
+    object_cache = ObjectCache(
+        max_size=appconfig.app.cache_size if appconfig.app.caching else 0,
+        ttl=appconfig.app.cache_ttl,
+    )
@@ -35,4 +35,8 @@ class QuestionnaireDatabaseManager(DataBaseManager):
             else:
                 raise ex
 
+        self.execute_direct_file(
+            os.path.join(project_root, "app/database/sql/table-versions.sql")
+        )
+
         logger.info("Base schema initialised.")
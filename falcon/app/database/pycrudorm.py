@@ -1,30 +1,407 @@
+import collections
+import contextlib
 import logging
+import operator
 import os
+import pickle
+import threading
+import time
 import typing
-from typing import List, Dict, Tuple, Any
+from typing import List, Dict, Tuple, Any, Callable, Iterable, Optional
 
 import falcon
 import sqlalchemy
 import sqlalchemy as sqla
 from sqlalchemy import orm
+from sqlalchemy.dialects import postgresql
 import attr
 from ddtrace import Pin, patch, tracer
 
 logger = logging.getLogger(__name__)
 
+# postgres system column changed by every write of a row
+ROW_VERSION = sqla.literal_column("xmin::text").label("_version")
+
+# one catalog query, cheaper than a reflection, telling if the columns
+# of a schema changed
+SCHEMA_HASH = sqla.sql.text(
+    """
+    SELECT md5(coalesce(string_agg(
+        table_name || '.' || column_name || ' ' || data_type || ' ' || is_nullable,
+        ',' ORDER BY table_name, ordinal_position
+    ), ''))
+    FROM information_schema.columns
+    WHERE table_schema = :schema
+    """
+)
+
+
+@attr.s(auto_attribs=True)
+class PoolStats(object):
+    """ Counters of the connection checkouts, to tune the pool settings """
+
+    checkouts: int = 0
+    timeouts: int = 0
+    connects: int = 0
+    wait_ms_total: float = 0.0
+    wait_ms_max: float = 0.0
+    _lock: threading.Lock = attr.ib(factory=threading.Lock, repr=False)
+
+    def record_checkout(self, wait_ms: float):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_ms_total += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def record_connect(self, *args):
+        with self._lock:
+            self.connects += 1
+
+    def as_dict(self, pool) -> dict:
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "connects": self.connects,
+            "wait_ms_total": round(self.wait_ms_total, 3),
+            "wait_ms_avg": round(self.wait_ms_total / self.checkouts, 3)
+            if self.checkouts
+            else 0.0,
+            "wait_ms_max": round(self.wait_ms_max, 3),
+        }
+
+
+@attr.s(auto_attribs=True)
+class StatementCache(object):
+    """ Compiled statements, keyed by (table, operation, column set)
+
+        The statements only hold bound parameters: the values are passed
+        at execution, and SQLAlchemy skips the compilation of the ones
+        already in the cache.
+    """
+
+    max_size: int = 1024
+    hits: int = 0
+    misses: int = 0
+    _statements: Dict[tuple, Any] = attr.ib(factory=dict, repr=False)
+    _lock: threading.Lock = attr.ib(factory=threading.Lock, repr=False)
+
+    def get(self, key: tuple, build: Callable, dialect, column_keys=None):
+        compiled = self._statements.get(key)
+        if compiled is not None:
+            self.hits += 1
+            return compiled
+
+        compiled = build().compile(dialect=dialect, column_keys=column_keys)
+        with self._lock:
+            self.misses += 1
+            if len(self._statements) < self.max_size:
+                self._statements[key] = compiled
+            else:
+                logger.warning(f"statement cache full, {key} not cached")
+
+        return compiled
+
+    @property
+    def as_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._statements),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+@attr.s(auto_attribs=True)
+class ObjectCache(object):
+    """ LRU cache of the rows loaded by CRUD.load, keyed by
+        (class, pk or unique column, value), expiring ttl seconds after
+        being stored. Disabled when max_size is 0.
+
+        It is per process: a write made by another worker is only seen
+        once the entry expires.
+    """
+
+    max_size: int = 0
+    ttl: float = 60.0
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    _rows: collections.OrderedDict = attr.ib(
+        factory=collections.OrderedDict, repr=False
+    )
+    _lock: threading.Lock = attr.ib(factory=threading.Lock, repr=False)
+    # seconds, the expirations are computed from it
+    clock: Callable[[], float] = attr.ib(default=time.monotonic, repr=False)
+
+    def get(self, key: tuple):
+        if not self.max_size:
+            return None
+
+        with self._lock:
+            entry = self._rows.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, row = entry
+            if expires_at < self.clock():
+                del self._rows[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._rows.move_to_end(key)
+            self.hits += 1
+            return row
+
+    def set(self, key: tuple, row):
+        if not self.max_size:
+            return
+
+        with self._lock:
+            self._rows[key] = (self.clock() + self.ttl, row)
+            self._rows.move_to_end(key)
+            while len(self._rows) > self.max_size:
+                self._rows.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, keys: Iterable[tuple]):
+        if not self.max_size:
+            return
+
+        with self._lock:
+            for key in keys:
+                if self._rows.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    @property
+    def as_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": bool(self.max_size),
+            "size": len(self._rows),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+@attr.s(auto_attribs=True)
+class NamedQuery(object):
+    """ A query of a sql file, its text() statement built once at load
+
+        sql may hold str.format fields ({field}) filled by
+        execute_dynamic_query, each rendering is then cached.
+    """
+
+    name: str
+    sql: str
+    source: str
+    statement: Any = attr.ib(repr=False)
+    params: frozenset
+    calls: int = 0
+    total_ms: float = 0.0
+    max_fragments: int = 256
+    _fragments: Dict[tuple, Any] = attr.ib(factory=dict, repr=False)
+    _lock: threading.Lock = attr.ib(factory=threading.Lock, repr=False)
+
+    @classmethod
+    def parse(cls, name: str, sql: str, source: str) -> "NamedQuery":
+        if not sql.strip():
+            raise ValueError(f"the query {name} of {source} is empty")
+        statement = sqla.sql.text(sql)
+        return cls(
+            name=name,
+            sql=sql,
+            source=source,
+            statement=statement,
+            params=frozenset(statement._bindparams),
+        )
+
+    def check_params(self, params: dict, statement=None):
+        """ Raises ValueError when a bind parameter has no value """
+        expected = self.params if statement is None else statement._bindparams
+        missing = [param for param in expected if param not in params]
+        if missing:
+            raise ValueError(
+                f"missing parameters for the query {self.name}: {', '.join(sorted(missing))}"
+            )
+
+    def render(self, dynamic: dict):
+        """ The text() statement of sql formatted with dynamic """
+        key = tuple(sorted(dynamic.items()))
+        statement = self._fragments.get(key)
+        if statement is None:
+            statement = sqla.sql.text(self.sql.format(**dynamic))
+            with self._lock:
+                if len(self._fragments) < self.max_fragments:
+                    self._fragments[key] = statement
+        return statement
+
+    def record(self, elapsed_ms: float):
+        with self._lock:
+            self.calls += 1
+            self.total_ms += elapsed_ms
+
+    @property
+    def as_dict(self) -> dict:
+        return {
+            "source": self.source,
+            "params": sorted(self.params),
+            "calls": self.calls,
+            "total_ms": round(self.total_ms, 3),
+            "avg_ms": round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            "fragments": len(self._fragments),
+        }
+
+
+class QueryRegistry(dict):
+    """ The NamedQuery of the sql files, by name """
+
+    @classmethod
+    def read(cls, folder: str, sql_files: List[str]) -> "QueryRegistry":
+        """ Read all the queries from a file organized in the same way than anosql
+            Each query MUST start with the following token "-- name:"
+                The text after will be the query's name
+                The query itself should start on the following line
+        """
+        texts = {}
+        sources = {}
+        for sql in sql_files:
+            with open(os.path.join(folder, sql), "r") as fin:
+                data = fin.read()
+
+            rows = [r for r in data.split("\n")]
+            for row in rows:
+                if "-- name:" in row:
+                    key = row.split("-- name:")[1].strip()
+                    if key in texts:
+                        raise Exception("the query %s is present in another file!", key)
+                    texts[key] = ""
+                    sources[key] = sql
+                elif len(row) > 0:
+                    texts[key] += row + "\n"
+
+        return cls(
+            (name, NamedQuery.parse(name, text, sources[name]))
+            for name, text in texts.items()
+        )
+
+    @property
+    def as_dict(self) -> dict:
+        return {name: query.as_dict for name, query in sorted(self.items())}
+
+
+def _row_constructor(cls, columns: Tuple[str, ...]) -> Callable:
+    """ A function building a cls from a row with the columns in this order
+
+        For attrs classes whose init arguments are all columns, the row
+        values are picked by position and passed positionally, otherwise
+        the row is passed as keywords.
+    """
+    if "__attrs_attrs__" not in cls.__dict__:
+        return lambda row: cls(**dict(zip(columns, row)))
+
+    fields = [field for field in attr.fields(cls) if field.init]
+    if not fields or any(field.name not in columns for field in fields):
+        return lambda row: cls(**dict(zip(columns, row)))
+
+    getter = operator.itemgetter(*[columns.index(field.name) for field in fields])
+    if len(fields) == 1:
+        return lambda row: cls(getter(row))
+
+    return lambda row: cls(*getter(row))
+
+
+@attr.s(auto_attribs=True)
+class CRUDMeta(object):
+    """ What CRUD needs to know about a class, computed when it is defined
+
+        from_row expects the columns in table order, as returned by
+        select(table.c), extra columns after them are ignored. It is built
+        on first use when the class is not an attrs class yet (attrs
+        decorates after __init_subclass__).
+    """
+
+    cls: type
+    table: Any
+    columns: Tuple[str, ...]
+    column_set: frozenset
+    pk_or_unique: Tuple[Any, ...]
+    lookup_columns: Tuple[str, ...]
+
+    @classmethod
+    def build(cls, klass, table) -> "CRUDMeta":
+        primary = [col for col in table.columns if col.primary_key]
+        unique = [col for col in table.columns if col.unique]
+        columns = tuple(col.name for col in table.columns)
+        meta = cls(
+            cls=klass,
+            table=table,
+            columns=columns,
+            column_set=frozenset(columns),
+            pk_or_unique=tuple(primary + unique),
+            lookup_columns=tuple(col.name for col in primary + unique),
+        )
+        if "__attrs_attrs__" in klass.__dict__:
+            meta.from_row = _row_constructor(klass, columns)
+
+        return meta
+
+    @property
+    def pk(self):
+        return self.pk_or_unique[0]
+
+    def from_row(self, row):
+        self.from_row = _row_constructor(self.cls, self.columns)
+        return self.from_row(row)
+
 
 @attr.s(auto_attribs=True)
 class DataBaseManager(object):
     dburi: str
     engine: None = attr.ib(repr=False)
-    queries: Dict[str, str] = attr.ib(repr=False)
+    queries: "QueryRegistry" = attr.ib(repr=False)
     DBSession: None = attr.ib(repr=False)
-    connection: None = attr.ib(repr=False, default=None)
     ready: bool = attr.ib(default=False)
     base: typing.Any = attr.ib(default=None)
+    stats: PoolStats = attr.ib(factory=PoolStats, repr=False)
+    # where the table definitions come from, see config.Reflection
+    reflection: str = attr.ib(default="automap")
+    reflection_schema: str = attr.ib(default=None)
+    snapshot_path: str = attr.ib(default=None)
+    declared_metadata: sqla.MetaData = attr.ib(default=None, repr=False)
+    # connection of the request being processed by the current thread
+    _local: threading.local = attr.ib(factory=threading.local, repr=False)
 
     @classmethod
-    def create(cls, *args, appconfig, folder: str, sql_files: List[str], **kargs):
+    def create(
+        cls,
+        *args,
+        appconfig,
+        folder: str,
+        sql_files: List[str],
+        snapshot_path: str = None,
+        declared_metadata: sqla.MetaData = None,
+        **kargs,
+    ):
         from ..config import Environment
 
         # For datadog APM
@@ -35,7 +412,15 @@ class DataBaseManager(object):
         logger.warning(
             f"Preparing connection to database {appconfig.db.dbname} on host {appconfig.db.host}"
         )
-        engine = sqla.create_engine(dburi, echo=appconfig.db.echo_sql)
+        engine = sqla.create_engine(
+            dburi,
+            echo=appconfig.db.echo_sql,
+            pool_size=appconfig.db.pool_size,
+            max_overflow=appconfig.db.pool_max_overflow,
+            pool_recycle=appconfig.db.pool_recycle,
+            pool_pre_ping=appconfig.db.pool_pre_ping,
+            pool_timeout=appconfig.db.pool_timeout,
+        )
 
         # For datadog APM
         if appconfig.app.environment in (Environment.production, Environment.test):
@@ -46,15 +431,25 @@ class DataBaseManager(object):
             orm.sessionmaker(bind=engine, autocommit=True)
         )
 
-        queries = cls._read_queries(folder=folder, sql_files=sql_files)
+        queries = QueryRegistry.read(folder=folder, sql_files=sql_files)
 
-        return cls(
-            dburi=dburi, engine=engine, queries=queries, DBSession=DBSession, base=None
+        manager = cls(
+            dburi=dburi,
+            engine=engine,
+            queries=queries,
+            DBSession=DBSession,
+            base=None,
+            reflection=appconfig.db.reflection.value,
+            reflection_schema=appconfig.db.reflection_schema,
+            snapshot_path=appconfig.db.schema_snapshot or snapshot_path,
+            declared_metadata=declared_metadata,
         )
+        sqla.event.listen(engine, "connect", manager.stats.record_connect)
+
+        return manager
 
     def connect(self):
         counter = 0
-        import time
 
         while True:
             try:
@@ -76,18 +471,146 @@ class DataBaseManager(object):
     def _connect(self):
         from sqlalchemy.ext.automap import automap_base
 
-        Base = automap_base()
+        metadata = None
+        if self.reflection == "declared":
+            metadata = self.declared_metadata
+        elif self.reflection == "snapshot":
+            metadata = self._load_schema_snapshot()
 
-        Base.prepare(self.engine, reflect=True, schema="question")
+        if metadata is None:
+            Base = automap_base()
+            Base.prepare(self.engine, reflect=True, schema=self.reflection_schema)
+        else:
+            # no catalog query, the classes are mapped on the known tables
+            Base = automap_base(metadata=metadata)
+            Base.prepare()
 
-        self.connection = self.engine.connect()
+        # opens the first connection of the pool
+        self.engine.connect().close()
         logger.warning("Connected to database")
 
         self.ready = True
         self.base = Base
 
+    def schema_hash(self) -> str:
+        with self.checkout() as connection:
+            return connection.execute(
+                SCHEMA_HASH, schema=self.reflection_schema
+            ).scalar()
+
+    def write_schema_snapshot(self) -> str:
+        """ Reflects reflection_schema and saves it to snapshot_path, with the
+            schema hash it was taken at. Returns the hash.
+        """
+        metadata = sqla.MetaData()
+        metadata.reflect(self.engine, schema=self.reflection_schema)
+        schema_hash = self.schema_hash()
+
+        with open(self.snapshot_path, "wb") as fout:
+            pickle.dump(
+                {
+                    "schema": self.reflection_schema,
+                    "hash": schema_hash,
+                    "metadata": metadata,
+                },
+                fout,
+            )
+
+        return schema_hash
+
+    def _load_schema_snapshot(self):
+        """ The metadata of the snapshot, None when it is missing or the
+            schema changed since it was taken
+        """
+        try:
+            with open(self.snapshot_path, "rb") as fin:
+                snapshot = pickle.load(fin)
+        except FileNotFoundError:
+            logger.error(f"no schema snapshot at {self.snapshot_path}, reflecting")
+            return None
+
+        if (
+            snapshot["schema"] != self.reflection_schema
+            or snapshot["hash"] != self.schema_hash()
+        ):
+            logger.error(
+                f"schema snapshot {self.snapshot_path} is outdated, reflecting."
+                " Run `manage.py schema-snapshot` again"
+            )
+            return None
+
+        return snapshot["metadata"]
+
     def stop(self):
-        self.connection.close()
+        self.engine.dispose()
+
+    def reset_local_state(self):
+        """ Recreates the thread locals (request connections, sessions) and
+            the pool, whose checkouts wait on locks.
+
+            For gevent workers: the app is built in the gunicorn master,
+            before the worker patches threading, so those were created
+            with the real threading primitives and would be shared by all
+            the greenlets of the worker.
+        """
+        self._local = threading.local()
+        self.DBSession = orm.scoping.scoped_session(
+            orm.sessionmaker(bind=self.engine, autocommit=True)
+        )
+        self.engine.dispose()
+
+    def _checkout(self):
+        start = time.perf_counter()
+        try:
+            connection = self.engine.connect()
+        except sqla.exc.TimeoutError:
+            self.stats.record_timeout()
+            logger.error("Timeout while waiting for a database connection")
+            raise
+        self.stats.record_checkout((time.perf_counter() - start) * 1000)
+        return connection
+
+    @contextlib.contextmanager
+    def request_scope(self):
+        """ Within the scope (a request), the first query checks a connection
+            out of the pool, the following ones reuse it, and it goes back
+            to the pool when the scope ends.
+        """
+        self._local.scoped = True
+        try:
+            yield
+        finally:
+            self._local.scoped = False
+            connection = getattr(self._local, "connection", None)
+            self._local.connection = None
+            if connection is not None:
+                connection.close()
+
+    @contextlib.contextmanager
+    def checkout(self):
+        """ Yields the connection of the current request scope, or, outside
+            of any scope, a connection returned to the pool on exit.
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            yield connection
+            return
+
+        connection = self._checkout()
+        if getattr(self._local, "scoped", False):
+            # released by request_scope
+            self._local.connection = connection
+            yield connection
+            return
+
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    @property
+    def pool_stats(self) -> dict:
+        return self.stats.as_dict(self.engine.pool)
 
     def get_sa_table(self, table: str) -> sqlalchemy.sql.schema.Table:
         try:
@@ -104,21 +627,52 @@ class DataBaseManager(object):
             dynamic: set of parameters that will be used to format the query
             parameters: set of parameters that will be sent to
         """
-        sql = self._get_query(query_name).format(**dynamic)
+        named_query = self._get_named_query(query_name)
+        statement = named_query.render(dynamic)
+        named_query.check_params(parameters, statement)
 
-        # logger.warning(sql)
-        # logger.info(parameters)
-        return self.execute_raw_sql(sql, **parameters)
+        start = time.perf_counter()
+        with self.checkout() as connection, connection.begin():
+            res = connection.execute(statement, **parameters)
+        named_query.record((time.perf_counter() - start) * 1000)
+        return res
 
     def execute_file(self, query, **kwargs):
-        sql = self._get_query(query_name=query)
-        with self.connection.begin():
-            res = self.connection.execute(sqla.sql.text(sql), **kwargs)
+        named_query = self._get_named_query(query)
+        named_query.check_params(kwargs)
+
+        start = time.perf_counter()
+        with self.checkout() as connection, connection.begin():
+            res = connection.execute(named_query.statement, **kwargs)
+        named_query.record((time.perf_counter() - start) * 1000)
         return res
 
+    def stream_file(self, query, chunk_size: int = 1000, **kwargs):
+        """ Yields the rows of a named query in lists of chunk_size rows
+
+            The rows are read from a server-side cursor, on a connection of
+            their own: the generator can be consumed after the request
+            handler returned (ie: resp.stream) and memory does not grow
+            with the size of the result. Its timing in the query stats only
+            covers opening the cursor.
+        """
+        named_query = self._get_named_query(query)
+        named_query.check_params(kwargs)
+        with self._checkout() as connection, connection.begin():
+            start = time.perf_counter()
+            res = connection.execution_options(stream_results=True).execute(
+                named_query.statement, **kwargs
+            )
+            named_query.record((time.perf_counter() - start) * 1000)
+            while True:
+                rows = res.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+
     def execute_raw_sql(self, sql, **kwargs):
-        with self.connection.begin():
-            res = self.connection.execute(sqla.sql.text(sql), **kwargs)
+        with self.checkout() as connection, connection.begin():
+            res = connection.execute(sqla.sql.text(sql), **kwargs)
 
         return res
 
@@ -128,10 +682,16 @@ class DataBaseManager(object):
 
         return self.execute_raw_sql(sql=sql)
 
-    def execute_sqla(self, statement):
-        with self.connection.begin():
+    def execute_sqla(self, statement, params: dict = None):
+        """ statement: a sqlalchemy statement, or a compiled one with the
+                values of its bound parameters in params
+        """
+        with self.checkout() as connection, connection.begin():
             try:
-                res = self.connection.execute(statement)
+                if params is None:
+                    res = connection.execute(statement)
+                else:
+                    res = connection.execute(statement, params)
             except sqla.exc.ProgrammingError as ex:
                 logger.exception(f"could not execute: {statement}")
                 raise ex
@@ -141,7 +701,7 @@ class DataBaseManager(object):
 
         return res
 
-    def _get_query(self, query_name: str) -> str:
+    def _get_named_query(self, query_name: str) -> NamedQuery:
         if query_name in self.queries:
             return self.queries[query_name]
         else:
@@ -152,49 +712,59 @@ class DataBaseManager(object):
             )
             raise ValueError("Could not find query %s", query_name)
 
-    @staticmethod
-    def _read_queries(folder: str, sql_files: str) -> Dict[str, str]:
-        """ Read all the queries from a file organized in the same way than anosql
-            Each query MUST start with the following token "-- name:"
-                The text after will be the query's name
-                The query itself should start on the following line
-        """
-        queries = {}
-        for sql in sql_files:
-            with open(os.path.join(folder, sql), "r") as fin:
-                data = fin.read()
-
-            rows = [r for r in data.split("\n")]
-            for row in rows:
-                if "-- name:" in row:
-                    key = row.split("-- name:")[1].strip()
-                    if key in queries:
-                        raise Exception("the query %s is present in another file!", key)
-                    queries[key] = ""
-                elif len(row) > 0:
-                    queries[key] += row + "\n"
+    def _get_query(self, query_name: str) -> str:
+        return self._get_named_query(query_name).sql
 
-        return queries
+    @property
+    def query_stats(self) -> dict:
+        return self.queries.as_dict
 
 
 class CRUD(object):
     db = None
+    statement_cache = StatementCache()
+    object_cache = ObjectCache()
+    _table = None
+    _meta: CRUDMeta = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls._table is not None:
+            cls._meta = CRUDMeta.build(cls, cls._table)
 
     @classmethod
-    def pk(cls, *args, **kwargs) -> List:
-        pk_or_unique = []
-        for col in cls._table.columns:
-            if col.primary_key:
-                pk_or_unique.append(col)
-        for col in cls._table.columns:
-            if col.unique:
-                pk_or_unique.append(col)
+    def _statement(cls, table, operation: str, build: Callable, columns: Iterable = ()):
+        """ The compiled statement of operation on table for this column set
+
+            build returns the statement, it is only called on a cache miss.
+            For inserts and updates, columns are the ones receiving values.
+        """
+        columns = tuple(columns)
+        return cls.statement_cache.get(
+            (table.fullname, operation, columns),
+            build,
+            dialect=cls.db.engine.dialect,
+            column_keys=list(columns) if operation in ("insert", "update") else None,
+        )
 
-        return pk_or_unique
+    @classmethod
+    def _check_columns(cls, columns: Iterable[str]):
+        unknown = [column for column in columns if column not in cls._meta.column_set]
+        if unknown:
+            raise ValueError(f"Unconsumed column names: {', '.join(unknown)}")
+
+    def _cache_keys(self) -> List[tuple]:
+        """ The object_cache keys this object can be loaded with """
+        cls = type(self)
+        return [(cls, col, getattr(self, col)) for col in self._meta.lookup_columns]
+
+    @classmethod
+    def pk(cls, *args, **kwargs) -> List:
+        return list(cls._meta.pk_or_unique)
 
     @classmethod
     def _constructor(cls, res):
-        return cls(**res)
+        return cls._meta.from_row(res)
 
     @staticmethod
     def pk_dict_to_tuple(pk: dict) -> tuple:
@@ -206,37 +776,110 @@ class CRUD(object):
     @tracer.wrap(service="questionnaire-service")
     def load(cls, **kwargs):
         logger.info(f"{cls} - PYCRUD- LOAD")
-        pk_or_unique = cls.pk()
+        res = cls._load_row(**kwargs)
+        if res is None:
+            return None
+        return cls._constructor(res)
+
+    @classmethod
+    @tracer.wrap(service="questionnaire-service")
+    def load_with_version(cls, **kwargs) -> Tuple[Any, Optional[str]]:
+        """ Like load, with the version of the row: its xmin, which changes
+            with every write of the row. (None, None) when not found.
+        """
+        res = cls._load_row(**kwargs)
+        if res is None:
+            return None, None
+        return cls._constructor(res), res[len(cls._meta.columns)]
+
+    @classmethod
+    @tracer.wrap(service="questionnaire-service")
+    def load_version(cls, **kwargs) -> Optional[str]:
+        """ Only the version of the row (see load_with_version), None when
+            not found. Nothing else is fetched from the row.
+        """
+        column, value = cls._lookup(kwargs)
+        res = cls.object_cache.get((cls, column, value))
+        if res is not None:
+            return res[len(cls._meta.columns)]
+
+        table = cls._table
+        stmt = cls._statement(
+            table,
+            "load_version",
+            lambda: sqla.sql.select([ROW_VERSION])
+            .select_from(table)
+            .where(table.c[column] == sqla.bindparam("value")),
+            columns=(column,),
+        )
+        return cls.db.execute_sqla(stmt, {"value": value}).scalar()
+
+    @classmethod
+    def _lookup(cls, kwargs: dict) -> Tuple[str, Any]:
+        """ The pk or unique column to load with, and its value """
         column, value = None, None
 
-        for col in pk_or_unique:
-            if col.name in kwargs:
-                column = col.name
-                value = kwargs[col.name]
+        for col in cls._meta.lookup_columns:
+            if col in kwargs:
+                column = col
+                value = kwargs[col]
 
         if column is None:
             raise ValueError(
                 "Load only works with a argument (primary key or unique col) "
             )
 
-        stmt = sqla.sql.select(cls._table.c).where(
-            getattr(cls._table.c, column) == value
+        return column, value
+
+    @classmethod
+    def _load_row(cls, **kwargs):
+        """ The row, table columns then its version, from object_cache or
+            the database
+        """
+        column, value = cls._lookup(kwargs)
+        cache_key = (cls, column, value)
+        res = cls.object_cache.get(cache_key)
+        if res is not None:
+            return res
+
+        table = cls._table
+        stmt = cls._statement(
+            table,
+            "load",
+            lambda: sqla.sql.select(list(table.c) + [ROW_VERSION]).where(
+                table.c[column] == sqla.bindparam("value")
+            ),
+            columns=(column,),
         )
-        res = cls.db.execute_sqla(stmt).first()
+        res = cls.db.execute_sqla(stmt, {"value": value}).first()
 
         if res is None:
             logger.error(f"no row for class {cls} with pk {column}={value}")
             return None
-        return cls._constructor(res)
+        cls.object_cache.set(cache_key, res)
+        return res
 
     @classmethod
     @tracer.wrap(service="questionnaire-service")
     def load_from_all_args(cls, table, **kwargs):
         """Will try to load an object with all the passed args"""
         table = cls.db.get_sa_table(table)
-        lt = [getattr(table.c, column) == value for column, value in kwargs.items()]
-        stmt = sqla.sql.select(table.c).where(sqla.sql.and_(*lt))
-        res = cls.db.execute_sqla(stmt)
+        columns = sorted(kwargs)
+        stmt = cls._statement(
+            table,
+            "load_from_all_args",
+            lambda: sqla.sql.select(
+                [table.c[col] for col in cls._meta.columns]
+            ).where(
+                sqla.sql.and_(
+                    *[table.c[col] == sqla.bindparam(f"value_{col}") for col in columns]
+                )
+            ),
+            columns=columns,
+        )
+        res = cls.db.execute_sqla(
+            stmt, {f"value_{col}": kwargs[col] for col in columns}
+        )
         if res.rowcount > 1:
             logger.error(f"got more than one row for class {cls} and args {kwargs}")
             return None
@@ -250,57 +893,121 @@ class CRUD(object):
     @classmethod
     @tracer.wrap(service="questionnaire-service")
     def create(cls, **kwargs):
-        stmt = cls._table.insert().values(**kwargs)
+        """ Inserts a row and returns it as a cls, server defaults included
+
+            The row comes back from INSERT ... RETURNING, in one round trip.
+        """
+        try:
+            cls._check_columns(kwargs)
+        except ValueError:
+            logger.exception("Could not compile. Some extra column ?")
+            raise
+
+        table = cls._table
+        stmt = cls._statement(
+            table,
+            "insert",
+            lambda: table.insert().returning(*table.c),
+            columns=sorted(kwargs),
+        )
         try:
-            res = cls.db.execute_sqla(stmt)
+            res = cls.db.execute_sqla(stmt, kwargs)
         except sqla.exc.IntegrityError as ex:
-            res = False
             logger.exception("Already exists")
             raise ex
-        except sqla.exc.CompileError as ex:
-            logger.exception("Could not compile. Some extra column ?")
-            raise ValueError(str(ex))
 
-        if res is False:
-            return False
+        obj = cls._constructor(res.first())
+        cls.object_cache.invalidate(obj._cache_keys())
+        return obj
 
-        try:
-            ret = cls.load(**kwargs)
-        except ValueError:
-            logger.exception("could not load")
-            ret = True
+    @classmethod
+    @tracer.wrap(service="questionnaire-service")
+    def create_many(cls, rows: List[dict]) -> List[Any]:
+        """ Inserts the rows with multi-row INSERT ... ON CONFLICT DO NOTHING
+            RETURNING statements, one per set of columns.
+
+            Returns one element per row: the created cls, or None when the
+            row was skipped because of a unique constraint. The returned
+            rows are matched back by the first pk or unique column the
+            rows have.
+        """
+        cls._check_columns({column for row in rows for column in row})
+
+        indexes_by_columns = {}
+        for index, row in enumerate(rows):
+            indexes_by_columns.setdefault(tuple(sorted(row)), []).append(index)
+
+        table = cls._table
+        results = [None] * len(rows)
+        for columns, indexes in indexes_by_columns.items():
+            stmt = (
+                postgresql.insert(table)
+                .values([rows[index] for index in indexes])
+                .on_conflict_do_nothing()
+                .returning(*table.c)
+            )
+            created = [cls._constructor(row) for row in cls.db.execute_sqla(stmt)]
 
-        return ret
+            key = next((col for col in cls._meta.lookup_columns if col in columns), None)
+            if key is None:
+                # no pk nor unique value sent, nothing can conflict but
+                # server defaults: all the rows are returned, in order
+                for index, obj in zip(indexes, created):
+                    results[index] = obj
+                continue
+
+            created_by_key = {getattr(obj, key): obj for obj in created}
+            for index in indexes:
+                # pop: of two rows with the same key, only the first is created
+                results[index] = created_by_key.pop(rows[index][key], None)
+
+        for obj in results:
+            if obj is not None:
+                cls.object_cache.invalidate(obj._cache_keys())
+
+        return results
 
     @tracer.wrap(service="questionnaire-service")
     def delete(self):
-        pk = self.pk()[0]
-        stmt = self._table.delete().where(pk == getattr(self, pk.name))
-        self.db.execute_sqla(stmt)
+        pk = self._meta.pk
+        table = self._table
+        stmt = self._statement(
+            table, "delete", lambda: table.delete().where(pk == sqla.bindparam("_pk"))
+        )
+        self.db.execute_sqla(stmt, {"_pk": getattr(self, pk.name)})
+        self.object_cache.invalidate(self._cache_keys())
 
     @tracer.wrap(service="questionnaire-service")
     def update(self, **kwargs):
-        for col, val in kwargs.items():
-            setattr(self, col, val)
-
-        pk = self.pk()[0]
         try:
-            stmt = (
-                self._table.update()
-                .values(**kwargs)
-                .where(pk == getattr(self, pk.name))
-            )
-        except sqlalchemy.exc.CompileError as ex:
+            self._check_columns(kwargs)
+        except ValueError as ex:
             missing_col = str(ex).split(":")[1]
             raise ValueError(
                 f"trying to updated column {missing_col} which does not exist in db"
             )
 
+        pk = self._meta.pk
+        pk_value = getattr(self, pk.name)
+        stale_keys = self._cache_keys()
+        for col, val in kwargs.items():
+            setattr(self, col, val)
+
+        table = self._table
+        stmt = self._statement(
+            table,
+            "update",
+            lambda: table.update().where(pk == sqla.bindparam("_pk")),
+            columns=sorted(kwargs),
+        )
+
         try:
-            self.db.execute_sqla(stmt)
+            self.db.execute_sqla(stmt, {**kwargs, "_pk": pk_value})
         except sqla.exc.IntegrityError as ex:
             logger.exception("Already exists")
             raise ex
+        finally:
+            self.object_cache.invalidate(stale_keys + self._cache_keys())
 
     @classmethod
     @tracer.wrap(service="questionnaire-service")
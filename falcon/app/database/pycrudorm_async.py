@@ -0,0 +1,274 @@
+""" The asyncio counterpart of pycrudorm, for the ASGI build (app/asgi.py)
+
+    Queries go through the databases library on asyncpg. The named queries,
+    the CRUD class metadata and the object cache are the ones of pycrudorm.
+"""
+import logging
+import time
+from typing import List, Tuple, Any, Optional
+
+import attr
+import falcon
+import sqlalchemy as sqla
+from sqlalchemy.dialects import postgresql
+
+from app.database.pycrudorm import CRUD, QueryRegistry, ROW_VERSION
+
+try:
+    from asyncpg.exceptions import IntegrityConstraintViolationError
+except ImportError:  # the WSGI build runs without asyncpg
+    IntegrityConstraintViolationError = sqla.exc.IntegrityError
+
+logger = logging.getLogger(__name__)
+
+
+@attr.s(auto_attribs=True)
+class AsyncDataBaseManager(object):
+    dburi: str = attr.ib(repr=False)
+    queries: QueryRegistry = attr.ib(repr=False)
+    pool_options: dict = attr.ib(factory=dict)
+    # a databases.Database, created by connect
+    database: Any = attr.ib(default=None, repr=False)
+    ready: bool = attr.ib(default=False)
+
+    @classmethod
+    def create(cls, *args, appconfig, queries: QueryRegistry, **kargs):
+        return cls(
+            dburi=appconfig.db.async_database_uri,
+            queries=queries,
+            pool_options={
+                "min_size": appconfig.db.pool_size,
+                "max_size": appconfig.db.pool_size + appconfig.db.pool_max_overflow,
+                "timeout": appconfig.db.pool_timeout,
+            },
+        )
+
+    async def connect(self):
+        # only needed by the ASGI build
+        import databases
+
+        self.database = databases.Database(self.dburi, **self.pool_options)
+        await self.database.connect()
+        logger.warning("Connected to database (asyncpg)")
+        self.ready = True
+
+    async def stop(self):
+        await self.database.disconnect()
+        self.ready = False
+
+    @property
+    def pool_stats(self) -> dict:
+        pool = getattr(getattr(self.database, "_backend", None), "_pool", None)
+        if pool is None:
+            return {}
+        return {
+            "size": pool.get_size(),
+            "idle": pool.get_idle_size(),
+            "min_size": pool.get_min_size(),
+            "max_size": pool.get_max_size(),
+        }
+
+    @property
+    def query_stats(self) -> dict:
+        return self.queries.as_dict
+
+    def _named_statement(self, query: str, kwargs: dict):
+        named_query = self.queries[query]
+        named_query.check_params(kwargs)
+        return named_query, named_query.statement.bindparams(**kwargs)
+
+    async def execute_file(self, query, **kwargs) -> list:
+        """ The rows of a named query, see DataBaseManager.execute_file """
+        named_query, statement = self._named_statement(query, kwargs)
+        start = time.perf_counter()
+        rows = await self.database.fetch_all(statement)
+        named_query.record((time.perf_counter() - start) * 1000)
+        return rows
+
+    async def fetch_val_file(self, query, **kwargs):
+        """ The first column of the first row of a named query """
+        named_query, statement = self._named_statement(query, kwargs)
+        start = time.perf_counter()
+        value = await self.database.fetch_val(statement)
+        named_query.record((time.perf_counter() - start) * 1000)
+        return value
+
+    async def stream_file(self, query, chunk_size: int = 1000, **kwargs):
+        """ Yields the rows of a named query in lists of chunk_size rows, read
+            from a server-side cursor (see DataBaseManager.stream_file)
+        """
+        named_query, statement = self._named_statement(query, kwargs)
+        named_query.record(0.0)
+        chunk = []
+        async for row in self.database.iterate(statement):
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    async def fetch_one(self, statement, values: dict = None):
+        return await self.database.fetch_one(statement, values)
+
+    async def fetch_all(self, statement, values: dict = None) -> list:
+        return await self.database.fetch_all(statement, values)
+
+    async def fetch_val(self, statement, values: dict = None):
+        return await self.database.fetch_val(statement, values)
+
+    async def execute(self, statement, values: dict = None):
+        return await self.database.execute(statement, values)
+
+
+class AsyncCRUD(CRUD):
+    """ The CRUD operations as coroutines, prefixed with "a" (aload, acreate...)
+
+        They share the class metadata and object_cache of CRUD, their
+        statements are compiled by the databases library.
+    """
+
+    adb: AsyncDataBaseManager = None
+
+    @classmethod
+    async def _aload_row(cls, **kwargs):
+        column, value = cls._lookup(kwargs)
+        cache_key = (cls, column, value)
+        res = cls.object_cache.get(cache_key)
+        if res is not None:
+            return res
+
+        table = cls._table
+        stmt = sqla.sql.select(list(table.c) + [ROW_VERSION]).where(
+            table.c[column] == value
+        )
+        res = await cls.adb.fetch_one(stmt)
+        if res is None:
+            logger.error(f"no row for class {cls} with pk {column}={value}")
+            return None
+        cls.object_cache.set(cache_key, res)
+        return res
+
+    @classmethod
+    async def aload(cls, **kwargs):
+        res = await cls._aload_row(**kwargs)
+        if res is None:
+            return None
+        return cls._constructor(res)
+
+    @classmethod
+    async def aload_with_version(cls, **kwargs) -> Tuple[Any, Optional[str]]:
+        res = await cls._aload_row(**kwargs)
+        if res is None:
+            return None, None
+        return cls._constructor(res), res[len(cls._meta.columns)]
+
+    @classmethod
+    async def aload_version(cls, **kwargs) -> Optional[str]:
+        column, value = cls._lookup(kwargs)
+        res = cls.object_cache.get((cls, column, value))
+        if res is not None:
+            return res[len(cls._meta.columns)]
+
+        table = cls._table
+        stmt = (
+            sqla.sql.select([ROW_VERSION])
+            .select_from(table)
+            .where(table.c[column] == value)
+        )
+        return await cls.adb.fetch_val(stmt)
+
+    @classmethod
+    async def aload_or_404(cls, **kwargs):
+        obj = await cls.aload(**kwargs)
+        if not obj:
+            raise falcon.HTTPNotFound(
+                description=f"No {cls.__name__} found with params %r" % kwargs
+            )
+
+        return obj
+
+    @classmethod
+    async def acreate(cls, **kwargs):
+        try:
+            cls._check_columns(kwargs)
+        except ValueError:
+            logger.exception("Could not compile. Some extra column ?")
+            raise
+
+        table = cls._table
+        stmt = table.insert().values(**kwargs).returning(*table.c)
+        try:
+            res = await cls.adb.fetch_one(stmt)
+        except IntegrityConstraintViolationError as ex:
+            logger.exception("Already exists")
+            # the exception raised by CRUD.create
+            raise sqla.exc.IntegrityError(str(stmt), kwargs, ex)
+        obj = cls._constructor(res)
+        cls.object_cache.invalidate(obj._cache_keys())
+        return obj
+
+    @classmethod
+    async def acreate_many(cls, rows: List[dict]) -> List[Any]:
+        """ See CRUD.create_many """
+        cls._check_columns({column for row in rows for column in row})
+
+        indexes_by_columns = {}
+        for index, row in enumerate(rows):
+            indexes_by_columns.setdefault(tuple(sorted(row)), []).append(index)
+
+        table = cls._table
+        results = [None] * len(rows)
+        for columns, indexes in indexes_by_columns.items():
+            stmt = (
+                postgresql.insert(table)
+                .values([rows[index] for index in indexes])
+                .on_conflict_do_nothing()
+                .returning(*table.c)
+            )
+            created = [cls._constructor(row) for row in await cls.adb.fetch_all(stmt)]
+
+            key = next((col for col in cls._meta.lookup_columns if col in columns), None)
+            if key is None:
+                for index, obj in zip(indexes, created):
+                    results[index] = obj
+                continue
+
+            created_by_key = {getattr(obj, key): obj for obj in created}
+            for index in indexes:
+                results[index] = created_by_key.pop(rows[index][key], None)
+
+        for obj in results:
+            if obj is not None:
+                cls.object_cache.invalidate(obj._cache_keys())
+
+        return results
+
+    async def adelete(self):
+        pk = self._meta.pk
+        await self.adb.execute(self._table.delete().where(pk == getattr(self, pk.name)))
+        self.object_cache.invalidate(self._cache_keys())
+
+    async def aupdate(self, **kwargs):
+        try:
+            self._check_columns(kwargs)
+        except ValueError as ex:
+            missing_col = str(ex).split(":")[1]
+            raise ValueError(
+                f"trying to updated column {missing_col} which does not exist in db"
+            )
+
+        pk = self._meta.pk
+        pk_value = getattr(self, pk.name)
+        stale_keys = self._cache_keys()
+        for col, val in kwargs.items():
+            setattr(self, col, val)
+
+        stmt = self._table.update().values(**kwargs).where(pk == pk_value)
+        try:
+            await self.adb.execute(stmt)
+        except IntegrityConstraintViolationError as ex:
+            logger.exception("Already exists")
+            raise sqla.exc.IntegrityError(str(stmt), kwargs, ex)
+        finally:
+            self.object_cache.invalidate(stale_keys + self._cache_keys())
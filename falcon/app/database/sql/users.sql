@@ -1,3 +1,18 @@
 -- name: get-all-users
-SELECT *
-FROM users;
\ No newline at end of file
+-- the columns are listed in the order of sqla_models.t_users, which is the
+-- order CRUD._constructor expects
+SELECT email, full_name, password, is_active, is_superuser, created_date, user_id
+FROM users;
+
+-- name: get-users-page
+SELECT email, full_name, password, is_active, is_superuser, created_date, user_id
+FROM users
+WHERE user_id > :after
+ORDER BY user_id
+LIMIT :limit;
+
+-- name: get-users-version
+-- moved by the trigger of table-versions.sql, no row before its first write
+SELECT version
+FROM table_versions
+WHERE table_name = 'users';
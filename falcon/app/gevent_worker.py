@@ -0,0 +1,17 @@
+""" The gevent worker of the WSGI build, HP__GUNICORN_WORKER_MODEL=gevent
+
+    Needs the gevent and psycogreen packages (poetry install -E gevent).
+"""
+from gunicorn.workers.ggevent import GeventWorker
+from psycogreen.gevent import patch_psycopg
+
+from .wsgi import WorkerHooks
+
+
+class CustomGeventWorker(WorkerHooks, GeventWorker):
+    def patch(self):
+        super().patch()
+        # psycopg2 waits on its socket through gevent, queries do not block
+        # the other greenlets
+        patch_psycopg()
+        self.app.application.db.reset_local_state()
@@ -0,0 +1,124 @@
+""" The access log of ResponseLoggerMiddleware
+
+    The request threads only put the records on a queue: a QueueListener
+    thread formats and writes them, one JSON object per line. The fields of a
+    request (method, path, status, duration_ms, remote) are attributes of its
+    record, its message is only used before start() (tests, manage.py).
+
+    Successful requests are logged at access_log_level, one in
+    1 / access_log_sample_rate of them. Server errors, 401 and 403 are always
+    logged, the latter with the request headers, credentials redacted.
+"""
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from typing import Optional
+
+import attr
+
+logger = logging.getLogger("access")
+
+ACCESS_FIELDS = ("method", "path", "status", "duration_ms", "remote", "headers")
+
+# lower case: falcon upper cases the header names, the ASGI scope does not
+REDACTED_HEADERS = frozenset(("authorization", "cookie", "x-api-key"))
+REDACTED = "[redacted]"
+
+
+def redact_headers(headers: dict) -> dict:
+    """ A copy of the headers without the credentials of the request """
+    return {
+        name: REDACTED if name.lower() in REDACTED_HEADERS else value
+        for name, value in headers.items()
+    }
+
+
+class AccessFormatter(logging.Formatter):
+    def format(self, record) -> str:
+        entry = {"time": self.formatTime(record), "level": record.levelname}
+        for field in ACCESS_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        return json.dumps(entry)
+
+
+class AccessQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # the record as is: formatted by the listener thread, not the request
+        return record
+
+
+@attr.s(auto_attribs=True)
+class AccessLog(object):
+    level: int = logging.INFO
+    sample_rate: float = 1.0
+    listener: Optional[logging.handlers.QueueListener] = attr.ib(
+        default=None, repr=False
+    )
+
+    @classmethod
+    def create(cls, appconfig):
+        level = logging.getLevelName(appconfig.app.access_log_level.upper())
+        if not isinstance(level, int):
+            raise ValueError(f"unknown log level {appconfig.app.access_log_level!r}")
+        return cls(level=level, sample_rate=float(appconfig.app.access_log_sample_rate))
+
+    def start(self, handler: logging.Handler = None):
+        """ In each worker, the listener thread does not survive a fork """
+        if self.listener is not None:
+            return
+
+        handler = handler or logging.StreamHandler(sys.stderr)
+        handler.setFormatter(AccessFormatter())
+        log_queue = queue.SimpleQueue()
+        logger.handlers = [AccessQueueHandler(log_queue)]
+        logger.setLevel(min(self.level, logging.WARNING))
+        logger.propagate = False
+        self.listener = logging.handlers.QueueListener(log_queue, handler)
+        self.listener.start()
+
+    def stop(self):
+        """ Writes the queued records and stops the listener thread """
+        if self.listener is None:
+            return
+        self.listener.stop()
+        self.listener = None
+
+    def level_of(self, status: int) -> Optional[int]:
+        """ The level to log a response at, None when it is not logged """
+        if status >= 500:
+            return logging.ERROR
+        if status in (401, 403):
+            return logging.WARNING
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return None
+        return self.level if logger.isEnabledFor(self.level) else None
+
+    def log(self, level: int, method: str, path: str, status: int,
+            duration_ms: float, remote: str, headers: dict = None):
+        # not logger.log: its lookup of the calling frame costs more than
+        # the rest of the record
+        if headers is not None:
+            headers = redact_headers(headers)
+        record = logger.makeRecord(
+            logger.name,
+            level,
+            __file__,
+            0,
+            "%s %s %s - %.2f ms [%s]",
+            (method, path, status, duration_ms, remote),
+            None,
+            extra={
+                "method": method,
+                "path": path,
+                "status": status,
+                "duration_ms": round(duration_ms, 3),
+                "remote": remote,
+                "headers": headers,
+            },
+        )
+        logger.handle(record)
@@ -0,0 +1,148 @@
+""" The JSON libraries the media handlers can use, set by AppConfig.json_encoder
+
+    They write the same JSON for the same objects: sorted keys, non-ASCII
+    characters as is, dates in ISO 8601, UUIDs as strings, decimals as
+    numbers (ujson only writes them so) and attrs objects as their dicts.
+    They only differ by speed, measured by `python -m benchmarks.encoders`.
+"""
+import json
+import logging
+import datetime as dt
+import decimal
+import uuid
+from functools import lru_cache, partial
+from typing import Any, Callable
+
+import attr
+
+logger = logging.getLogger(__name__)
+
+# fastest first on the users payloads (benchmarks/encoders.py), "auto" picks
+# the first one installed. Dumping 10k users: orjson ~5 ms, rapidjson
+# ~32 ms, json ~78 ms, ujson ~87 ms (its dates go through _default, its
+# attrs objects through _without_attrs)
+PREFERENCE = ("orjson", "rapidjson", "json", "ujson")
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class JSONEncoder(object):
+    name: str
+    dumps: Callable[[Any], str]
+    # from str or bytes
+    loads: Callable[[Any], Any]
+
+
+def _default(obj):
+    if attr.has(type(obj)):
+        return attr.asdict(obj)
+    if isinstance(obj, (dt.datetime, dt.date, dt.time)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    raise TypeError(f"{obj!r} is not JSON serializable")
+
+
+def _json() -> JSONEncoder:
+    dumps = partial(
+        json.dumps,
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+        default=_default,
+    )
+    return JSONEncoder(name="json", dumps=dumps, loads=json.loads)
+
+
+def _rapidjson() -> JSONEncoder:
+    import rapidjson
+
+    dumps = partial(
+        rapidjson.dumps,
+        ensure_ascii=False,
+        sort_keys=True,
+        datetime_mode=rapidjson.DM_ISO8601,
+        default=_default,
+    )
+    return JSONEncoder(name="rapidjson", dumps=dumps, loads=rapidjson.loads)
+
+
+def _without_attrs(obj):
+    """ obj with its attrs objects turned into dicts beforehand: when sorting
+        keys, ujson writes the dicts returned by its default as {}
+    """
+    if attr.has(type(obj)):
+        return attr.asdict(obj)
+    if isinstance(obj, dict):
+        return {key: _without_attrs(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_without_attrs(value) for value in obj]
+    return obj
+
+
+def _ujson() -> JSONEncoder:
+    import ujson
+
+    ujson_dumps = partial(
+        ujson.dumps,
+        ensure_ascii=False,
+        sort_keys=True,
+        escape_forward_slashes=False,
+        default=_default,
+    )
+
+    def dumps(obj) -> str:
+        return ujson_dumps(_without_attrs(obj))
+
+    return JSONEncoder(name="ujson", dumps=dumps, loads=ujson.loads)
+
+
+def _orjson() -> JSONEncoder:
+    import orjson
+
+    def dumps(obj) -> str:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SORT_KEYS).decode()
+
+    return JSONEncoder(name="orjson", dumps=dumps, loads=orjson.loads)
+
+
+_FACTORIES = {
+    "json": _json,
+    "rapidjson": _rapidjson,
+    "ujson": _ujson,
+    "orjson": _orjson,
+}
+
+
+def available() -> list:
+    """ The names of the encoders installed, in PREFERENCE order """
+    names = []
+    for name in PREFERENCE:
+        try:
+            _FACTORIES[name]()
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+@lru_cache(maxsize=None)
+def get_encoder(name: str) -> JSONEncoder:
+    """ The encoder named name, or with "auto" the first one installed of
+        PREFERENCE
+    """
+    if name == "auto":
+        return get_encoder(available()[0])
+
+    try:
+        factory = _FACTORIES[name]
+    except KeyError:
+        raise ValueError(
+            f"unknown JSON encoder {name!r}, one of auto, {', '.join(_FACTORIES)}"
+        )
+    try:
+        return factory()
+    except ImportError:
+        logger.critical(f"JSON encoder {name} is not installed")
+        raise
@@ -0,0 +1,32 @@
+from typing import Optional
+
+
+def make_etag(version, variant: Optional[str] = None) -> str:
+    """ A strong ETag for the representation of a version of a resource
+
+        variant tells apart the representations served on the same URL
+        (ie: "ndjson")
+    """
+    if variant:
+        return f'"{version}-{variant}"'
+    return f'"{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """ True when an If-None-Match header value lists etag, or is "*"
+
+        If-None-Match uses the weak comparison: W/ prefixes are ignored.
+    """
+    if not if_none_match:
+        return False
+
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+
+    return False
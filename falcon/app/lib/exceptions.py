@@ -12,10 +12,29 @@ class MissingAttribute(Exception):
 class ObjectCreationError(Exception):
     @staticmethod
     def handle(ex, req, resp, params):
-        # TODO: Log the error
-        logger.exception("Object Creation Error:")
+        # a bad request, not a bug: no traceback
+        logger.warning(f"Object Creation Error: {ex}")
         raise falcon.HTTPBadRequest(title="Entity creation Error", description=str(ex))
 
+    @staticmethod
+    async def handle_async(req, resp, ex, params):
+        ObjectCreationError.handle(ex, req, resp, params)
+
+
+class InvalidEntity(falcon.HTTPBadRequest):
+    """ A request body not matching its entity (see validation.EntityValidator),
+        errors lists the {"field", "message"} of each problem
+    """
+
+    def __init__(self, description: str, errors: list):
+        super().__init__(title="Entity creation Error", description=description)
+        self.errors = errors
+
+    def to_dict(self, obj_type=dict):
+        obj = super().to_dict(obj_type)
+        obj["errors"] = self.errors
+        return obj
+
 
 class ValidationError(Exception):
     @staticmethod
@@ -23,3 +42,7 @@ class ValidationError(Exception):
         # TODO: Log the error
         logger.exception("Validation Error:")
         raise falcon.HTTPBadRequest(title="Validation Error", description=str(ex))
+
+    @staticmethod
+    async def handle_async(req, resp, ex, params):
+        ValidationError.handle(ex, req, resp, params)
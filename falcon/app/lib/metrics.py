@@ -0,0 +1,180 @@
+""" The Prometheus metrics of the service, served by GET /metrics
+
+    With several gunicorn workers, PROMETHEUS_MULTIPROC_DIR must name a
+    directory, set in the environment before the start: every process writes
+    its metrics to memory-mapped files there, which /metrics sums whichever
+    worker answers. The master deletes its *.db files when it starts. Without it,
+    /metrics only has the metrics of the process answering.
+
+    Recording a request is a few microseconds: the children of the labelled
+    metrics are cached, the pool and GC metrics are only written once per
+    FLUSH_INTERVAL_NS, by the request ending after it.
+"""
+import gc
+import glob
+import os
+import time
+from functools import lru_cache
+from typing import Optional
+
+import attr
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+MULTIPROC_DIR = "PROMETHEUS_MULTIPROC_DIR"
+
+FLUSH_INTERVAL_NS = 1_000_000_000
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# the numeric states of DataBaseManager.pool_stats (and of the asyncpg pool)
+POOL_STATES = ("size", "checked_out", "checked_in", "idle")
+
+REQUESTS = Counter(
+    "http_requests", "Requests answered", ["method", "route", "status"]
+)
+LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time to answer a request",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requests being answered",
+    multiprocess_mode="livesum",
+)
+DB_POOL = Gauge(
+    "db_pool_connections",
+    "Connections of the database pools, by state",
+    ["state"],
+    multiprocess_mode="livesum",
+)
+GC_COLLECTIONS = Counter(
+    "gc_collections", "Garbage collections, by generation", ["generation"]
+)
+GC_PAUSE = Counter(
+    "gc_pause_seconds", "Time spent in garbage collections", ["generation"]
+)
+
+
+@lru_cache(maxsize=None)
+def _requests(method: str, route: str, status: str):
+    return REQUESTS.labels(method, route, status)
+
+
+@lru_cache(maxsize=None)
+def _latency(method: str, route: str):
+    return LATENCY.labels(method, route)
+
+
+def observe_request(method: str, route: Optional[str], status: str, duration_ns: int):
+    """ route: the URI template of the resource, None when none matched """
+    route = route or "unmatched"
+    _requests(method, route, status).inc()
+    _latency(method, route).observe(duration_ns / 1e9)
+
+
+@attr.s(auto_attribs=True)
+class GCWatch(object):
+    """ Collections and pause time by generation, from gc.callbacks
+
+        The callback only adds them up: it can run in the middle of a write
+        to a metric, and the multiprocess metrics take a lock.
+    """
+
+    collections: list = attr.ib(factory=lambda: [0, 0, 0])
+    pause_ns: list = attr.ib(factory=lambda: [0, 0, 0])
+    start_ns: int = 0
+
+    def __call__(self, phase, info):
+        if phase == "start":
+            self.start_ns = time.perf_counter_ns()
+            return
+        generation = info["generation"]
+        self.collections[generation] += 1
+        self.pause_ns[generation] += time.perf_counter_ns() - self.start_ns
+
+    def flush(self):
+        for generation in range(3):
+            collections = self.collections[generation]
+            if not collections:
+                continue
+            pause_ns = self.pause_ns[generation]
+            # a collection during the flush is counted by the next one
+            self.collections[generation] -= collections
+            self.pause_ns[generation] -= pause_ns
+            GC_COLLECTIONS.labels(str(generation)).inc(collections)
+            GC_PAUSE.labels(str(generation)).inc(pause_ns / 1e9)
+
+
+gc_watch = GCWatch()
+gc.callbacks.append(gc_watch)
+
+
+@attr.s(auto_attribs=True)
+class ProcessMetrics(object):
+    """ Writes the pool and GC metrics of the process, at most once per
+        FLUSH_INTERVAL_NS
+    """
+
+    db: object = attr.ib(repr=False)
+    next_flush_ns: int = 0
+
+    def flush(self, now_ns: int):
+        if now_ns < self.next_flush_ns:
+            return
+        self.next_flush_ns = now_ns + FLUSH_INTERVAL_NS
+
+        gc_watch.flush()
+        if not self.db.ready:
+            return
+        stats = self.db.pool_stats
+        for state in POOL_STATES:
+            if state in stats:
+                DB_POOL.labels(state).set(stats[state])
+
+
+def latest() -> bytes:
+    """ The metrics in the text format, of all the workers when they share
+        PROMETHEUS_MULTIPROC_DIR
+    """
+    if not os.environ.get(MULTIPROC_DIR):
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+
+def clear_multiprocess_dir():
+    """ By the gunicorn master before the workers start: the files of a
+        previous run would be summed with the new ones
+
+        Only the *.db files of prometheus_client are deleted, the directory
+        may be shared
+    """
+    path = os.environ.get(MULTIPROC_DIR)
+    if not path:
+        return
+    os.makedirs(path, exist_ok=True)
+    for db_file in glob.glob(os.path.join(path, "*.db")):
+        try:
+            os.remove(db_file)
+        except FileNotFoundError:
+            pass
+
+
+def child_exit(server, worker):
+    """ The gunicorn hook: the live gauges of a dead worker are dropped """
+    if os.environ.get(MULTIPROC_DIR):
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,21 +1,128 @@
 import logging
-import datetime as dt
+import time
+
+from app.lib.access_log import AccessLog
+from app.lib import metrics
 
 
 logger = logging.getLogger(__name__)
 
 
 class ResponseLoggerMiddleware(object):
+    """ Times the requests and writes them to the access log, see AccessLog """
+
+    def __init__(self, access_log: AccessLog):
+        self.access_log = access_log
+
     def process_request(self, req, resp):
-        logger.warning(f"{req.method}] {req.relative_uri} - received")
-        req.context["start_time"] = dt.datetime.now()
+        req.context["start_ns"] = time.perf_counter_ns()
 
     def process_response(self, req, resp, *args, **kwargs):
-        duration = (
-            dt.datetime.now() - req.context["start_time"]
-        ).total_seconds() * 1000
-        logger.warning(
-            f"{req.method}] {req.relative_uri} {resp.status[:3]} - {duration:.2f} ms [{req.access_route[0]}]"
+        start_ns = req.context.get("start_ns")
+        if start_ns is None:
+            # failed before process_request
+            return
+        duration_ms = (time.perf_counter_ns() - start_ns) / 1e6
+
+        status = int(resp.status[:3])
+        level = self.access_log.level_of(status)
+        if level is None:
+            return
+        self.access_log.log(
+            level,
+            req.method,
+            req.relative_uri,
+            status,
+            duration_ms,
+            req.access_route[0],
+            headers=dict(req.headers) if status in (401, 403) else None,
         )
-        if resp.status[:3] in ("401", "403"):
-            logger.error(f"Posted headers: {req.headers}")
+
+    async def process_startup(self, scope, event):
+        self.access_log.start()
+
+    async def process_shutdown(self, scope, event):
+        self.access_log.stop()
+
+    async def process_request_async(self, req, resp):
+        self.process_request(req, resp)
+
+    async def process_response_async(self, req, resp, *args, **kwargs):
+        self.process_response(req, resp, *args, **kwargs)
+
+
+class MetricsMiddleware(object):
+    """ Records the requests in the Prometheus metrics, see app.lib.metrics """
+
+    def __init__(self, db):
+        self.process_metrics = metrics.ProcessMetrics(db)
+
+    def process_request(self, req, resp):
+        metrics.IN_FLIGHT.inc()
+        req.context["metrics_start_ns"] = time.perf_counter_ns()
+
+    def process_response(self, req, resp, *args, **kwargs):
+        start_ns = req.context.get("metrics_start_ns")
+        if start_ns is None:
+            return
+        metrics.IN_FLIGHT.dec()
+        now_ns = time.perf_counter_ns()
+        metrics.observe_request(
+            req.method, req.uri_template, resp.status[:3], now_ns - start_ns
+        )
+        self.process_metrics.flush(now_ns)
+
+    async def process_request_async(self, req, resp):
+        self.process_request(req, resp)
+
+    async def process_response_async(self, req, resp, *args, **kwargs):
+        self.process_response(req, resp, *args, **kwargs)
+
+
+class DbConnectionMiddleware(object):
+    """ Each request gets its own connection from the pool, checked out by
+        its first query and given back once the response is ready
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def process_request(self, req, resp):
+        scope = self.db.request_scope()
+        scope.__enter__()
+        req.context["db_scope"] = scope
+
+    def process_response(self, req, resp, resource, req_succeeded):
+        scope = req.context.get("db_scope")
+        if scope is not None:
+            scope.__exit__(None, None, None)
+
+
+class AsyncDbMiddleware(object):
+    """ Connects the asyncpg pool of the ASGI build when the worker starts,
+        each request then gets its own connection from the databases library
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    async def process_startup(self, scope, event):
+        await self.db.connect()
+
+    async def process_shutdown(self, scope, event):
+        await self.db.stop()
+
+
+class ProfilerMiddleware(object):
+    """ Starts the sampling profiler of the ASGI build in each worker, see
+        app.lib.profiler
+    """
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+
+    async def process_startup(self, scope, event):
+        self.profiler.start()
+
+    async def process_shutdown(self, scope, event):
+        self.profiler.stop()
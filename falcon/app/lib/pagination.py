@@ -0,0 +1,39 @@
+import base64
+import binascii
+import json
+from typing import Optional, Sequence, Tuple
+
+
+def encode_cursor(after: int) -> str:
+    """ Opaque keyset cursor: the last user_id of the page, base64url encoded """
+    raw = json.dumps({"after": after}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    """ Returns the user_id to start after, 0 without cursor
+
+        Raises ValueError when the cursor was not built by encode_cursor
+    """
+    if not cursor:
+        return 0
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        after = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))["after"]
+    except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError):
+        raise ValueError(f"invalid cursor {cursor!r}")
+
+    if not isinstance(after, int) or isinstance(after, bool) or after < 0:
+        raise ValueError(f"invalid cursor {cursor!r}")
+
+    return after
+
+
+def split_page(rows: Sequence, limit: int, key: str = "user_id") -> Tuple[Sequence, Optional[int]]:
+    """ The rows of a page fetched with limit + 1 rows, and the key of its
+        last row to start the next page after (None on the last page)
+    """
+    if len(rows) <= limit:
+        return rows, None
+    return rows[:limit], rows[limit - 1][key]
@@ -0,0 +1,285 @@
+""" A sampling profiler of the worker, without restarting it under vmprof
+
+    A thread takes the stacks of the other threads of the process
+    (sys._current_frames) hz times per second and counts each distinct stack,
+    leaving out the idle ones (waiting on a lock, a queue or a selector).
+    The counts are written as folded stacks (flamegraph.pl, speedscope,
+    inferno) or as a speedscope file.
+
+    - GET /_profile?seconds=N samples the worker answering for N seconds, see
+      ProfileResource
+    - SIGUSR2 to a worker (not the master: it upgrades gunicorn) samples it
+      for profiler_signal_seconds, written to profiler_dir
+    - with profiler_continuous_hz, the worker is sampled at a low rate for
+      its whole life, its stacks rooted under the route of their request
+
+    Under gevent the sampler would be a greenlet, seeing only itself: the
+    profiler is disabled.
+"""
+import collections
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional, Set, Tuple
+
+import attr
+import falcon
+
+logger = logging.getLogger(__name__)
+
+# name, file, line
+Frame = Tuple[str, str, int]
+
+# the innermost frames of a thread waiting for work
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("handlers.py", "dequeue"),
+    ("selectors.py", "select"),
+    ("socket.py", "accept"),
+}
+
+FORMATS = ("speedscope", "folded")
+
+# the threads of the samplers running, left out of the samples
+_samplers: Set[int] = set()
+
+
+@attr.s(auto_attribs=True)
+class Stacks(object):
+    """ Sampled stacks, root first, with the number of samples of each """
+
+    hz: float
+    counts: collections.Counter = attr.ib(factory=collections.Counter)
+    max_stacks: int = 20000
+
+    def add(self, stack: Tuple[Frame, ...]):
+        if stack not in self.counts and len(self.counts) >= self.max_stacks:
+            stack = (("(more stacks)", "", 0),)
+        self.counts[stack] += 1
+
+    @property
+    def samples(self) -> int:
+        return sum(self.counts.copy().values())
+
+    def most_common(self):
+        # a copy: the continuous profiler adds to its stacks meanwhile
+        return self.counts.copy().most_common()
+
+    def folded(self, route: str = None) -> str:
+        """ One "root;...;leaf count" line per stack, only the ones of route
+            when given (continuous profiler)
+        """
+        lines = []
+        for stack, count in self.most_common():
+            if route is not None and stack[0][0] != route:
+                continue
+            names = ";".join(f"{name} ({file}:{line})" if file else name
+                             for name, file, line in stack)
+            lines.append(f"{names} {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, name: str, route: str = None) -> dict:
+        """ The speedscope file format (https://www.speedscope.app), the
+            weights are seconds
+        """
+        frames: Dict[Frame, int] = {}
+        samples, weights = [], []
+        for stack, count in self.most_common():
+            if route is not None and stack[0][0] != route:
+                continue
+            samples.append([frames.setdefault(frame, len(frames)) for frame in stack])
+            weights.append(count / self.hz)
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "app.lib.profiler",
+            "shared": {
+                "frames": [
+                    {"name": frame_name, "file": file, "line": line}
+                    for frame_name, file, line in frames
+                ]
+            },
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+        }
+
+    def render(self, fmt: str, name: str, route: str = None) -> Tuple[str, bytes]:
+        """ (content type, body) of the stacks in fmt, one of FORMATS """
+        if fmt == "folded":
+            return "text/plain; charset=utf-8", self.folded(route).encode()
+        return "application/json", json.dumps(self.speedscope(name, route)).encode()
+
+
+def stack_of(frame, route_of_frame: Callable = None) -> Optional[Tuple[Frame, ...]]:
+    """ The stack of a thread, root first, under its route with
+        route_of_frame. None when the thread is idle.
+    """
+    code = frame.f_code
+    if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+        return None
+
+    stack = []
+    route = None
+    while frame is not None:
+        code = frame.f_code
+        stack.append((code.co_name, code.co_filename, frame.f_lineno))
+        if route_of_frame is not None and route is None:
+            route = route_of_frame(frame)
+        frame = frame.f_back
+    if route_of_frame is not None:
+        stack.append((route or "(no request)", "", 0))
+    stack.reverse()
+    return tuple(stack)
+
+
+def request_route(frame) -> Optional[str]:
+    """ The URI template of the falcon request a frame handles: the
+        responders, hooks and middleware take it as req
+    """
+    if "req" not in frame.f_code.co_varnames:
+        return None
+    req = frame.f_locals.get("req")
+    if not isinstance(req, falcon.Request):
+        return None
+    return req.uri_template or "(no route)"
+
+
+def collect(hz: float, seconds: float, route_of_frame: Callable = None,
+            stop: threading.Event = None, stacks: Stacks = None) -> Stacks:
+    """ Samples the other threads for seconds, or until stop is set, from the
+        calling thread
+    """
+    stacks = stacks if stacks is not None else Stacks(hz=hz)
+    stop = stop or threading.Event()
+    interval = 1 / hz
+    deadline = time.monotonic() + seconds
+    ident = threading.get_ident()
+
+    _samplers.add(ident)
+    try:
+        while not stop.is_set() and time.monotonic() < deadline:
+            frames = sys._current_frames()
+            for thread_ident, frame in frames.items():
+                if thread_ident in _samplers:
+                    continue
+                stack = stack_of(frame, route_of_frame)
+                if stack is not None:
+                    stacks.add(stack)
+            # the frames of the threads must not outlive them
+            frames = frame = None
+            stop.wait(interval)
+    finally:
+        _samplers.discard(ident)
+    return stacks
+
+
+def _gevent_patched() -> bool:
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched("threading")
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+@attr.s(auto_attribs=True)
+class Profiler(object):
+    """ The profiling sessions and the continuous profiler of a worker """
+
+    hz: int = 100
+    max_seconds: int = 60
+    signal_seconds: int = 30
+    directory: str = None
+    continuous_hz: float = 0.0
+    # the route of the request a frame is part of, None for the others
+    route_of_frame: Callable = attr.ib(default=None, repr=False)
+    enabled: bool = True
+    continuous: Optional[Stacks] = attr.ib(default=None, repr=False)
+    _session: threading.Lock = attr.ib(factory=threading.Lock, repr=False)
+    _stop: threading.Event = attr.ib(factory=threading.Event, repr=False)
+
+    @classmethod
+    def create(cls, appconfig, directory: str, route_of_frame: Callable = request_route):
+        return cls(
+            hz=appconfig.app.profiler_hz,
+            max_seconds=appconfig.app.profiler_max_seconds,
+            signal_seconds=appconfig.app.profiler_signal_seconds,
+            directory=appconfig.app.profiler_dir or directory,
+            continuous_hz=float(appconfig.app.profiler_continuous_hz),
+            route_of_frame=route_of_frame,
+        )
+
+    def start(self):
+        """ In each worker: the SIGUSR2 handler and the continuous profiler """
+        if _gevent_patched():
+            logger.warning("no sampling profiler under gevent")
+            self.enabled = False
+            return
+
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGUSR2, self.handle_signal)
+        if self.continuous_hz > 0 and self.continuous is None:
+            self._stop.clear()
+            self.continuous = Stacks(hz=self.continuous_hz)
+            threading.Thread(
+                target=collect,
+                kwargs={
+                    "hz": self.continuous_hz,
+                    "seconds": float("inf"),
+                    "route_of_frame": self.route_of_frame,
+                    "stop": self._stop,
+                    "stacks": self.continuous,
+                },
+                name="continuous-profiler",
+                daemon=True,
+            ).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def profile(self, seconds: float) -> Stacks:
+        """ Samples the worker for seconds, from the calling thread. One
+            session at a time.
+        """
+        if not self._session.acquire(blocking=False):
+            raise ProfilerBusy("a profile of this worker is already running")
+        try:
+            return collect(self.hz, min(seconds, self.max_seconds), stop=self._stop)
+        finally:
+            self._session.release()
+
+    def handle_signal(self, signum, frame):
+        threading.Thread(target=self.profile_to_file, name="profiler", daemon=True).start()
+
+    def profile_to_file(self):
+        try:
+            stacks = self.profile(self.signal_seconds)
+        except ProfilerBusy as ex:
+            logger.warning(str(ex))
+            return
+
+        name = f"{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}"
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{name}.speedscope.json")
+        with open(path, "w") as profile_file:
+            json.dump(stacks.speedscope(name), profile_file)
+        logger.warning(f"Profile of {stacks.samples} samples written to {path}")
@@ -0,0 +1,173 @@
+import logging
+import datetime as dt
+from functools import partial
+from json.encoder import encode_basestring
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+)
+
+import attr
+import rapidjson
+from rapidjson import DM_ISO8601
+
+logger = logging.getLogger(__name__)
+
+NDJSON = "application/x-ndjson"
+
+json_dumps = partial(
+    rapidjson.dumps, ensure_ascii=False, sort_keys=True, datetime_mode=DM_ISO8601
+)
+
+
+def _as_dict(obj):
+    if attr.has(type(obj)):
+        return attr.asdict(obj)
+    raise TypeError(f"{obj!r} is not JSON serializable")
+
+
+# for the values the serializers have no fast path for, see use_encoder
+_fallback_dumps = partial(json_dumps, default=_as_dict)
+
+
+def use_encoder(encoder) -> None:
+    """ Sets the JSON library of media_dumps and the streams, an
+        encoders.JSONEncoder
+    """
+    global _fallback_dumps
+    _fallback_dumps = encoder.dumps
+
+def _encode_str(value: str) -> str:
+    encoded = encode_basestring(value)
+    # rapidjson writes the \u escapes of the control characters in upper case
+    return encoded if "\\u" not in encoded else json_dumps(value)
+
+
+# how a serializer writes a value {v}, by field type, when type({v}) is that type
+_ENCODERS = {
+    str: "_encode_str({v})",
+    bool: "('true' if {v} else 'false')",
+    int: "int.__repr__({v})",
+    dt.datetime: "'\"' + {v}.isoformat() + '\"'",
+    dt.date: "'\"' + {v}.isoformat() + '\"'",
+}
+
+_serializers: Dict[type, Callable[[Any], str]] = {}
+
+
+def compile_serializer(cls) -> Callable[[Any], str]:
+    """ Generates the function writing an instance of the attrs class cls as
+        a JSON object, with the same output as json_dumps(attr.asdict(obj))
+
+        the keys are sorted once, each field goes through the encoder of its
+        annotated type, other values (or types) through json_dumps
+    """
+    lines = [f"def serialize_{cls.__name__}(obj):"]
+    parts = []
+    separator = "{"
+    for index, field in enumerate(sorted(attr.fields(cls), key=lambda f: f.name)):
+        key = separator + encode_basestring(field.name) + ":"
+        value = f"v{index}"
+        encoder = _ENCODERS.get(field.type)
+        lines.append(f"    {value} = obj.{field.name}")
+        if encoder is None:
+            parts.append(f"{key!r} + _dumps({value})")
+        else:
+            parts.append(
+                f"{key!r} + ('null' if {value} is None"
+                f" else {encoder.format(v=value)} if type({value}) is _types[{index}]"
+                f" else _dumps({value}))"
+            )
+        separator = ","
+    parts.append("'}'" if parts else "'{}'")
+    lines.append("    return " + " + ".join(parts))
+
+    namespace = {
+        "_encode_str": _encode_str,
+        "_dumps": media_dumps,
+        "_types": [f.type for f in sorted(attr.fields(cls), key=lambda f: f.name)],
+    }
+    exec("\n".join(lines), namespace)  # nosec: generated from the field names
+    return namespace[f"serialize_{cls.__name__}"]
+
+
+def serializer(cls) -> Callable[[Any], str]:
+    """ The serializer of the attrs class cls, compiled on first use """
+    try:
+        return _serializers[cls]
+    except KeyError:
+        return _serializers.setdefault(cls, compile_serializer(cls))
+
+
+def media_dumps(media) -> str:
+    """ json_dumps, through the compiled serializers for attrs objects and
+        lists of them: a response can be the objects themselves, no
+        intermediate dicts are built
+    """
+    media_type = type(media)
+    if attr.has(media_type):
+        return serializer(media_type)(media)
+
+    if media_type is list and media:
+        item_type = type(media[0])
+        if attr.has(item_type) and all(type(item) is item_type for item in media):
+            return "[" + ",".join(map(serializer(item_type), media)) + "]"
+
+    return _fallback_dumps(media)
+
+
+def encoder_dumps(obj) -> str:
+    """ The JSON of obj, with the encoder set by use_encoder """
+    return _fallback_dumps(obj)
+
+
+def stream_json_array(
+    chunks: Iterable[list], dumps: Callable = encoder_dumps
+) -> Iterator[bytes]:
+    """ Serializes the chunks of items as one JSON array, one chunk at a time """
+    yield b"["
+    separator = ""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        # each chunk is a valid array, only its items are kept
+        yield (separator + dumps(chunk)[1:-1]).encode("utf-8")
+        separator = ","
+    yield b"]"
+
+
+def stream_ndjson(
+    chunks: Iterable[list], dumps: Callable = encoder_dumps
+) -> Iterator[bytes]:
+    """ Serializes the chunks of items as newline delimited JSON """
+    for chunk in chunks:
+        if chunk:
+            yield "".join(dumps(item) + "\n" for item in chunk).encode("utf-8")
+
+
+async def astream_json_array(
+    chunks: AsyncIterable[list], dumps: Callable = encoder_dumps
+) -> AsyncIterator[bytes]:
+    """ stream_json_array, for the ASGI build """
+    yield b"["
+    separator = ""
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        yield (separator + dumps(chunk)[1:-1]).encode("utf-8")
+        separator = ","
+    yield b"]"
+
+
+async def astream_ndjson(
+    chunks: AsyncIterable[list], dumps: Callable = encoder_dumps
+) -> AsyncIterator[bytes]:
+    """ stream_ndjson, for the ASGI build """
+    async for chunk in chunks:
+        if chunk:
+            yield "".join(dumps(item) + "\n" for item in chunk).encode("utf-8")
@@ -1,18 +1,17 @@
-import json
+import re
 import enum
 import logging
 import datetime as dt
-from typing import Dict, Any
+from typing import Dict, Any, FrozenSet, List, Optional, Set, Tuple
 
 import attr
 import sqlalchemy
 import falcon
 
 # from falcon import errors
-from falcon.media import BaseHandler
 from sqlalchemy.orm import Session
 
-from app.lib.exceptions import ObjectCreationError, MissingAttribute
+from app.lib.exceptions import ObjectCreationError, MissingAttribute, InvalidEntity
 from app.connections import tracer
 
 logger = logging.getLogger(__name__)
@@ -113,42 +112,122 @@ class ValidatedEntity(ValidatedObject):
         return cls(*args, **kwargs)
 
     @classmethod
-    def from_dict_safe(cls, *args, **kwargs):
-
+    def validator(cls) -> "EntityValidator":
+        """ The checks of the request bodies creating cls, compiled once """
         try:
-            return cls.from_dict(*args, **kwargs)
-        except (ValueError, AssertionError) as ex:
-            raise ObjectCreationError(str(ex))
-        except TypeError as ex:
-
-            if "multiple" in str(ex):
-                raise ObjectCreationError(
-                    f"Please pass only keywords arguments to create {cls.__name__}"
-                )
-            elif "missing" in str(ex):
-                try:
-                    missing_keys = str(ex).split("arguments:")[1]
-                except Exception as ex:
-                    missing_keys = str(ex).split("argument:")[1]
-
-                raise ObjectCreationError(
-                    f"Missing some key(s): {missing_keys} when creating {cls.__name__}"
-                )
-            elif "must be" in str(ex):
-                msg = str(ex).split(">")[0]
-                raise ObjectCreationError(f"{msg}>")
-            else:
-                raise ObjectCreationError(f"unhandled object creation error: {str(ex)}")
+            return _validators[cls]
+        except KeyError:
+            return _validators.setdefault(cls, EntityValidator.build(cls))
 
-            unexpected_key = str(ex).split("argument")[1]
+    @classmethod
+    def from_dict_safe(cls, req=None, **kwargs):
+        instance, errors = cls.validator().validate(req, kwargs)
+        if errors:
             raise ObjectCreationError(
-                f"key {unexpected_key} does not exist when creating {cls.__name__}"
+                f"{describe_errors(errors)} when creating {cls.__name__}"
             )
+        return instance
+
+
+_PARAM_KEY_WORDS = re.compile("(.)([A-Z][a-z]+)")
+_PARAM_KEY_CAPS = re.compile("([a-z0-9])([A-Z])")
+
+# the types of the JSON values accepted by a field, from its annotation
+_FIELD_TYPES = {
+    str: {str},
+    int: {int},
+    float: {int, float},
+    bool: {bool},
+    dt.datetime: {str},
+    dt.date: {str},
+    dict: {dict},
+    list: {list},
+}
+
+_validators: Dict[type, "EntityValidator"] = {}
+
+
+def param_key(name: str) -> str:
+    """ The responder parameter of an entity, ie: UserCreation -> user_creation """
+    words = _PARAM_KEY_WORDS.sub(r"\1_\2", name)
+    return _PARAM_KEY_CAPS.sub(r"\1_\2", words).lower()
+
+
+def describe_errors(errors: List[dict]) -> str:
+    return "; ".join(
+        f"{error['field']}: {error['message']}" if error["field"] else error["message"]
+        for error in errors
+    )
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class EntityValidator(object):
+    """ The checks of a request body against the attrs fields of an entity:
+        the fields are read once, and the checks return their errors
+        ({"field", "message"}) rather than raising them
+    """
+
+    entity: type
+    param_key: str
+    fields: FrozenSet[str]
+    # no default, and not nullable
+    required: Tuple[str, ...]
+    # field -> (the accepted types, the error when the value is of another)
+    types: Dict[str, Tuple[Set[type], str]]
+
+    @classmethod
+    def build(cls, entity) -> "EntityValidator":
+        fields = attr.fields(entity)
+        return cls(
+            entity=entity,
+            param_key=param_key(entity.__name__),
+            fields=frozenset(field.name for field in fields),
+            required=tuple(
+                field.name for field in fields if field.default is attr.NOTHING
+            ),
+            types={
+                field.name: (_FIELD_TYPES[field.type], f"must be {field.type.__name__}")
+                for field in fields
+                if field.type in _FIELD_TYPES
+            },
+        )
+
+    def errors(self, payload) -> List[dict]:
+        if type(payload) is not dict:
+            return [{"field": None, "message": "expected a JSON object"}]
+
+        errors = [
+            {"field": name, "message": "missing"}
+            for name in self.required
+            if payload.get(name) is None
+        ]
+        for name, value in payload.items():
+            if name not in self.fields:
+                errors.append({"field": name, "message": "unknown field"})
+            elif value is not None and name in self.types:
+                accepted, message = self.types[name]
+                if type(value) not in accepted:
+                    errors.append({"field": name, "message": message})
+
+        return errors
+
+    def validate(self, req, payload) -> Tuple[Optional[Any], List[dict]]:
+        """ (the entity, []) or (None, its errors) """
+        errors = self.errors(payload)
+        if errors:
+            return None, errors
+
+        try:
+            return self.entity.from_dict(req=req, **payload), []
+        except (ValueError, AssertionError) as ex:
+            # the attrs validators of the entity
+            return None, [{"field": None, "message": str(ex)}]
 
 
 class ValidateRequest(object):
     def __init__(self, entity):
-        self._entity = entity  # should be a subclass of ValidatedEntity
+        # should be a subclass of ValidatedEntity
+        self._validator = entity.validator()
 
     def __call__(self, req, resp, resource, params):
         try:
@@ -157,15 +236,24 @@ class ValidateRequest(object):
             payload = {}
         except Exception:
             raise
-        instance = self._entity.from_dict_safe(req=req, **payload)
-        key = self.convert(self._entity.__name__)
-        params[key] = instance
+        self.validate(req, payload, params)
+
+    def validate(self, req, payload: dict, params: dict):
+        instance, errors = self._validator.validate(req, payload)
+        if errors:
+            entity_name = self._validator.entity.__name__
+            raise InvalidEntity(
+                f"{describe_errors(errors)} when creating {entity_name}", errors
+            )
+        params[self._validator.param_key] = instance
+
 
-    def convert(self, name):
-        import re
+class AsyncValidateRequest(ValidateRequest):
+    """ ValidateRequest for the responders of the ASGI build """
 
-        s1 = re.sub("(.)([A-Z][a-z]+)", r"\1_\2", name)
-        return re.sub("([a-z0-9])([A-Z])", r"\1_\2", s1).lower()
+    async def __call__(self, req, resp, resource, params):
+        payload = await req.get_media(default_when_empty={})
+        self.validate(req, payload, params)
 
 
 class PostgresEnum(enum.Enum):
@@ -209,30 +297,6 @@ class PostgresEnum(enum.Enum):
         )
 
 
-class CustomJSONHandler(BaseHandler):
-    """Handler built using Python's :py:mod:`json` module."""
-
-    def deserialize(self, raw, content_type, content_length):
-        try:
-            return json.loads(raw.decode("utf-8"))
-        except ValueError as err:
-            raise falcon.HTTPBadRequest(
-                title="Invalid JSON",
-                description="Could not parse JSON body - {0}".format(err),
-            )
-
-    def serialize(self, media, content_type):
-        try:
-            result = json.dumps(media, ensure_ascii=False, default=str)
-        except TypeError as ex:
-            logger.exception(f"error when serializing {media}")
-            raise ex
-        if not isinstance(result, bytes):
-            return result.encode("utf-8")
-
-        return result
-
-
 def admin_only(req, resp, resource, params):
     """To be used as a before_hook. Only admins will be allowed to use this endpoint"""
 
@@ -15,6 +15,7 @@ from app.lib.exceptions import ValidationError, ObjectCreationError
 from app.database.base import BaseObject
 from app.database.models import sqla_models
 
+from app.lib.pagination import split_page
 from app.lib.validation import ValidatedObject, ValidatedEntity, second_to_datetime
 from datetime import datetime
 
@@ -61,6 +62,65 @@ class User(BaseObject, ValidatedObject):
         # for x in cls.db.execute_file("get-all-users").fetchall():
             # print(x)
 
-        return [cls(*x) for x in cls.db.execute_file("get-all-users").fetchall()]
+        return [
+            cls._constructor(x) for x in cls.db.execute_file("get-all-users").fetchall()
+        ]
 
+    @classmethod
+    def get_page(cls, limit: int, after: int = 0) -> Tuple[List["User"], Optional[int]]:
+        """ Keyset pagination: the first `limit` users with a user_id greater
+            than `after`, and the user_id to start the next page after (None
+            on the last page).
+
+            One extra row is fetched to know if there is a next page, the
+            cost of a page does not depend on how far it is in the table.
+        """
+        rows, next_after = split_page(
+            cls.db.execute_file("get-users-page", after=after, limit=limit + 1).fetchall(),
+            limit,
+        )
+        return [cls._constructor(x) for x in rows], next_after
+
+    @classmethod
+    def table_version(cls) -> int:
+        """ Moved by the commit of every transaction writing to the users table """
+        res = cls.db.execute_file("get-users-version").scalar()
+        return res or 0
+
+    @classmethod
+    def stream_all(cls, chunk_size: int):
+        """ Yields all the users as lists of dicts, chunk_size at a time
+
+            No User object is built, the rows are turned into the same
+            dicts than User.as_dict
+        """
+        for rows in cls.db.stream_file("get-all-users", chunk_size=chunk_size):
+            yield [dict(row) for row in rows]
 
+    # coroutines of the ASGI build
+
+    @classmethod
+    async def aget_all(cls):
+        return [cls._constructor(x) for x in await cls.adb.execute_file("get-all-users")]
+
+    @classmethod
+    async def aget_page(
+        cls, limit: int, after: int = 0
+    ) -> Tuple[List["User"], Optional[int]]:
+        """ See get_page """
+        rows, next_after = split_page(
+            await cls.adb.execute_file("get-users-page", after=after, limit=limit + 1),
+            limit,
+        )
+        return [cls._constructor(x) for x in rows], next_after
+
+    @classmethod
+    async def astream_all(cls, chunk_size: int):
+        """ See stream_all """
+        async for rows in cls.adb.stream_file("get-all-users", chunk_size=chunk_size):
+            yield [dict(row) for row in rows]
+
+    @classmethod
+    async def atable_version(cls) -> int:
+        res = await cls.adb.fetch_val_file("get-users-version")
+        return res or 0
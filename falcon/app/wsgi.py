@@ -1,27 +1,71 @@
+import gc
 import sys
+import logging
 
 from gunicorn.app.base import BaseApplication
 from gunicorn.workers.sync import SyncWorker
+from gunicorn.workers.gthread import ThreadWorker
 import rollbar
 
 from .app import FalconService
-from .config import appconfig
+from .lib import metrics
+from .config import appconfig, WorkerModel
 
+logger = logging.getLogger(__name__)
+
+
+class WorkerHooks(object):
+    """ The start()/stop() hooks of the application and the rollbar error
+        reporting, shared by the worker classes
+    """
 
-class CustomWorker(SyncWorker):
     def handle_quit(self, sig, frame):
         self.app.application.stop(sig)
-        super(CustomWorker, self).handle_quit(sig, frame)
+        super().handle_quit(sig, frame)
 
     def run(self):
         self.app.application.start()
-        super(CustomWorker, self).run()
+        super().run()
 
     def handle_error(self, req, client, addr, exc):
         rollbar.report_exc_info(
             sys.exc_info(), req, extra_data={"client": client, "uri": req.uri}
         )
-        super(CustomWorker, self).handle_error(req, client, addr, exc)
+        super().handle_error(req, client, addr, exc)
+
+
+class CustomWorker(WorkerHooks, SyncWorker):
+    pass
+
+
+class CustomThreadWorker(WorkerHooks, ThreadWorker):
+    pass
+
+
+# gevent is optional, its worker class is imported by gunicorn when selected
+WORKER_CLASSES = {
+    WorkerModel.sync: "app.wsgi.CustomWorker",
+    WorkerModel.gthread: "app.wsgi.CustomThreadWorker",
+    WorkerModel.gevent: "app.gevent_worker.CustomGeventWorker",
+}
+
+
+def pre_fork(server, worker) -> None:
+    # the objects of the preloaded app are left out of the collections of
+    # the workers: their memory pages stay shared with the master
+    gc.freeze()
+
+
+def post_fork(server, worker) -> None:
+    gc.enable()
+    server.app.application.post_fork()
+
+
+def when_ready(server) -> None:
+    # the master collects again once the app is loaded, its objects frozen
+    # first: they stay out of the collections of the master too
+    gc.freeze()
+    gc.enable()
 
 
 class GunicornApp(BaseApplication):
@@ -30,23 +74,46 @@ class GunicornApp(BaseApplication):
     This allows for us to load gunicorn settings from an external source
     """
 
-    def __init__(self, app, options=None):
+    def __init__(self, app, options=None, worker_class=None):
         self.options = options or {}
         self.application = app
+        self.worker_class = worker_class or WORKER_CLASSES[self.options.worker_model]
         super(GunicornApp, self).__init__()
 
     def load_config(self) -> None:
         for key, value in self.options.to_dict.items():
-            self.cfg.set(key.lower(), value)
+            # worker_model is ours, not a gunicorn setting
+            if key.lower() in self.cfg.settings:
+                self.cfg.set(key.lower(), value)
 
-        self.cfg.set("worker_class", "app.wsgi.CustomWorker")
+        self.cfg.set("worker_class", self.worker_class)
+        self.cfg.set("child_exit", metrics.child_exit)
+        if self.cfg.preload_app:
+            self.cfg.set("pre_fork", pre_fork)
+            self.cfg.set("post_fork", post_fork)
+            self.cfg.set("when_ready", when_ready)
 
     def load(self) -> FalconService:
+        if self.cfg.preload_app:
+            self.application.preload()
         return self.application
 
 
 def main() -> None:
 
+    pool_max = appconfig.db.pool_size + appconfig.db.pool_max_overflow
+    if appconfig.gunicorn.concurrency > pool_max:
+        logger.warning(
+            f"{appconfig.gunicorn.worker_model.value} workers handle up to "
+            f"{appconfig.gunicorn.concurrency} requests at once with at most "
+            f"{pool_max} database connections, raise HP__DB_POOL_SIZE"
+        )
+
+    if appconfig.gunicorn.preload_app:
+        # until the app is loaded, see when_ready and pre_fork
+        gc.disable()
+
+    metrics.clear_multiprocess_dir()
     api_app = FalconService()
     gunicorn_app = GunicornApp(api_app, appconfig.gunicorn)
 
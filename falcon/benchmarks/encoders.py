@@ -0,0 +1,46 @@
+""" Measures the JSON encoders of app/lib/encoders.py on users payloads,
+    from one user up to 100k users, to pick the PREFERENCE order
+
+    python -m benchmarks.encoders [--rows 1,100,10000,100000] [--repeat 3]
+
+    dumps: the users as dicts (User.as_dict) to JSON, as the streams and the
+           payloads without a compiled serializer go
+    loads: that JSON back, as the request bodies go
+"""
+import argparse
+import timeit
+
+from app.lib.encoders import available, get_encoder
+from benchmarks.serializers import make_users
+
+
+def best_us(case, repeat: int) -> float:
+    number, _ = timeit.Timer(case).autorange()
+    return min(timeit.repeat(case, number=number, repeat=repeat)) / number * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", default="1,100,10000,100000")
+    parser.add_argument("--repeat", type=int, default=3)
+    options = parser.parse_args()
+
+    encoders = [get_encoder(name) for name in available()]
+    print(f"{'encoder':<10} {'rows':>7} {'dumps us':>12} {'loads us':>12}")
+    for rows in map(int, options.rows.split(",")):
+        users = [user.as_dict for user in make_users(rows)]
+        payload = users[0] if rows == 1 else users
+
+        expected = encoders[-1].dumps(payload)
+        for encoder in encoders:
+            text = encoder.dumps(payload)
+            # same JSON whichever the encoder
+            assert text == expected, encoder.name
+
+            dumps = best_us(lambda: encoder.dumps(payload), options.repeat)
+            loads = best_us(lambda: encoder.loads(text), options.repeat)
+            print(f"{encoder.name:<10} {rows:>7} {dumps:>12.1f} {loads:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+""" Compares the serialization of the users responses, from the objects
+    to the body bytes
+
+    python -m benchmarks.serializers [--rows 1000] [--repeat 5]
+
+    as_dict: json_dumps([user.as_dict for user in users]), the former path
+    compiled: media_dumps(users), the serializer generated for User
+"""
+import argparse
+import datetime as dt
+import timeit
+
+from app.lib.serialization import json_dumps, media_dumps
+from app.models.users_models import User
+
+
+def make_users(rows: int):
+    created_date = dt.datetime(2020, 1, 1)
+    return [
+        User(
+            user_id=user_id,
+            full_name=f"User {user_id}",
+            email=f"user{user_id}@example.com",
+            password="not-a-hash",
+            created_date=created_date + dt.timedelta(seconds=user_id),
+        )
+        for user_id in range(rows)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+
+    users = make_users(options.rows)
+    cases = {
+        "one user, as_dict": lambda: json_dumps(users[0].as_dict).encode(),
+        "one user, compiled": lambda: media_dumps(users[0]).encode(),
+        f"{options.rows} users, as_dict": lambda: json_dumps(
+            [user.as_dict for user in users]
+        ).encode(),
+        f"{options.rows} users, compiled": lambda: media_dumps(users).encode(),
+    }
+    assert json_dumps([user.as_dict for user in users]) == media_dumps(users)
+
+    for name, case in cases.items():
+        number, _ = timeit.Timer(case).autorange()
+        best = min(timeit.repeat(case, number=number, repeat=options.repeat))
+        print(f"{name:<24} {best / number * 1e6:>12.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -45,6 +45,17 @@ def run() -> None:
     wsgi.main()
 
 
+@cli.command('run-asgi')
+def run_asgi() -> None:
+    """Runs the ASGI build (asyncpg) with Gunicorn and uvicorn workers"""
+    from app import asgi
+
+    logger.warning(
+        f'Running questionnaire-service (asgi) with gunicorn, settings: {appconfig.app.environment}')
+
+    asgi.main()
+
+
 @cli.command()
 def initdb() -> None:
     """ Create tables, mat views and base data """
@@ -53,6 +64,54 @@ def initdb() -> None:
     application.db.init_db()
 
 
+@cli.command('schema-snapshot')
+def schema_snapshot() -> None:
+    """ Saves the reflected schema, loaded at boot with HP__DB_REFLECTION=snapshot
+
+        to run again after each migration: an outdated snapshot is ignored
+    """
+    from app.connections import db
+
+    schema_hash = db.write_schema_snapshot()
+    click.echo(f'{db.reflection_schema} schema ({schema_hash}) saved to {db.snapshot_path}')
+
+
+@cli.command()
+def queries() -> None:
+    """ Lists the named queries of the sql files and their parameters
+
+        their call counts and timings are served by GET /_stats
+    """
+    from app.connections import db
+
+    for name, query in sorted(db.queries.items()):
+        params = ", ".join(sorted(query.params)) or "-"
+        click.echo(f'{name:<24} {query.source:<16} {params}')
+
+
+@click.option('--rows', type=int, default=10000, help='10000, 1000000, 10000000...')
+@click.option('--seed', type=int, default=42)
+@click.option('--active-ratio', type=float, default=0.9)
+@click.option('--superuser-ratio', type=float, default=0.01)
+@click.option('--days', type=int, default=365, help='created_date spread, from 2020-01-01')
+@click.option('--append', is_flag=True, default=False, help='keep the existing rows')
+@cli.command()
+def seed(rows, seed, active_ratio, superuser_ratio, days, append) -> None:
+    """ Fills the users table with deterministic fake users, through COPY """
+    from app.database.seed import UsersDistribution, seed_users
+
+    distribution = UsersDistribution(
+        rows=rows,
+        seed=seed,
+        active_ratio=active_ratio,
+        superuser_ratio=superuser_ratio,
+        days=days,
+    )
+    logger.warning(f'Seeding users: {distribution}')
+
+    application = FalconService()
+    seed_users(application.db.engine, distribution, truncate=not append)
+
 
 if __name__ == "__main__":
     cli()
@@ -0,0 +1,56 @@
+import io
+import json
+import logging
+
+import pytest
+
+from app.lib import access_log
+
+
+@pytest.fixture
+def stream():
+    stream = io.StringIO()
+    log = access_log.AccessLog()
+    log.start(logging.StreamHandler(stream))
+    yield log, stream
+    log.stop()
+
+
+def entries(log, stream):
+    log.stop()
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_redact_headers():
+    headers = {
+        "AUTHORIZATION": "Bearer secret",
+        "Cookie": "session=secret",
+        "x-api-key": "secret",
+        "USER-AGENT": "curl/7.68.0",
+    }
+    assert access_log.redact_headers(headers) == {
+        "AUTHORIZATION": access_log.REDACTED,
+        "Cookie": access_log.REDACTED,
+        "x-api-key": access_log.REDACTED,
+        "USER-AGENT": "curl/7.68.0",
+    }
+    assert headers["AUTHORIZATION"] == "Bearer secret"
+
+
+def test_log_redacts_the_headers(stream):
+    log, output = stream
+    log.log(
+        logging.WARNING, "GET", "/_profile", 401, 1.5, "127.0.0.1",
+        headers={"AUTHORIZATION": "Bearer secret", "HOST": "localhost"},
+    )
+    (entry,) = entries(log, output)
+    assert entry["status"] == 401
+    assert entry["headers"] == {"AUTHORIZATION": access_log.REDACTED, "HOST": "localhost"}
+    assert "secret" not in output.getvalue()
+
+
+def test_log_without_headers(stream):
+    log, output = stream
+    log.log(logging.INFO, "GET", "/users", 200, 1.5, "127.0.0.1")
+    (entry,) = entries(log, output)
+    assert "headers" not in entry
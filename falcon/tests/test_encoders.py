@@ -0,0 +1,85 @@
+import datetime as dt
+import decimal
+import uuid
+
+import attr
+import pytest
+
+from app.lib import encoders
+
+ENCODERS = encoders.available()
+
+
+@attr.s(auto_attribs=True)
+class Point(object):
+    x: int
+    y: int
+
+
+PAYLOAD = {
+    "text": "é / \"quoted\"",
+    "number": 1,
+    "float": 0.25,
+    "flag": False,
+    "nothing": None,
+    "items": [1, "two", {"b": 2, "a": 1}],
+    "naive": dt.datetime(2020, 1, 2, 3, 4, 5, 678901),
+    "aware": dt.datetime(2020, 1, 2, 3, 4, 5, tzinfo=dt.timezone(dt.timedelta(hours=2))),
+    "date": dt.date(2020, 1, 2),
+    "time": dt.time(3, 4, 5),
+    "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    "decimal": decimal.Decimal("12.5"),
+    "point": Point(x=1, y=2),
+}
+
+
+@pytest.fixture(params=ENCODERS)
+def encoder(request):
+    return encoders.get_encoder(request.param)
+
+
+def test_all_encoders_write_the_same_json(encoder):
+    assert encoder.dumps(PAYLOAD) == encoders.get_encoder("json").dumps(PAYLOAD)
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (dt.datetime(2020, 1, 2, 3, 4, 5), '"2020-01-02T03:04:05"'),
+        (dt.datetime(2020, 1, 2, 3, 4, 5, 6), '"2020-01-02T03:04:05.000006"'),
+        (
+            dt.datetime(2020, 1, 2, tzinfo=dt.timezone.utc),
+            '"2020-01-02T00:00:00+00:00"',
+        ),
+        (dt.date(2020, 1, 2), '"2020-01-02"'),
+        (dt.time(3, 4, 5), '"03:04:05"'),
+        (uuid.UUID(int=1), '"00000000-0000-0000-0000-000000000001"'),
+        (decimal.Decimal("1.10"), "1.1"),
+        (Point(x=1, y=2), '{"x":1,"y":2}'),
+    ],
+)
+def test_values_without_json_type(encoder, value, expected):
+    assert encoder.dumps([value]) == f"[{expected}]"
+
+
+def test_keys_are_sorted(encoder):
+    assert encoder.dumps({"b": 1, "a": {"d": 1, "c": 2}}) == '{"a":{"c":2,"d":1},"b":1}'
+
+
+def test_unknown_types_are_refused(encoder):
+    with pytest.raises(TypeError):
+        encoder.dumps({"value": object()})
+
+
+def test_loads_str_and_bytes(encoder):
+    text = encoder.dumps({"a": [1, "é"]})
+    assert encoder.loads(text) == encoder.loads(text.encode("utf-8")) == {"a": [1, "é"]}
+
+
+def test_auto_is_the_first_installed():
+    assert encoders.get_encoder("auto").name == ENCODERS[0]
+
+
+def test_unknown_encoder():
+    with pytest.raises(ValueError):
+        encoders.get_encoder("simplejson")
@@ -0,0 +1,105 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+from prometheus_client.parser import text_string_to_metric_families
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# a worker answering two requests, still in the middle of a third one
+WORKER = """
+from app.lib import metrics
+
+metrics.observe_request("GET", "/users", "200", 2_000_000)
+metrics.observe_request("GET", None, "404", 1_000_000)
+metrics.IN_FLIGHT.inc()
+"""
+
+# GET /metrics, after a gunicorn child_exit of the worker of pid sys.argv[1]
+SCRAPE = """
+import sys
+import types
+
+import falcon
+from falcon import testing
+
+from app.controllers.metrics_controller import MetricsResource
+from app.lib import metrics
+
+if len(sys.argv) > 1:
+    metrics.child_exit(None, types.SimpleNamespace(pid=int(sys.argv[1])))
+
+app = getattr(falcon, "App", None) or falcon.API
+api = app()
+api.add_route("/metrics", MetricsResource())
+result = testing.TestClient(api).simulate_get("/metrics")
+assert result.status_code == 200, result.status
+assert result.headers["content-type"].startswith("text/plain"), result.headers
+sys.stdout.write(result.text)
+"""
+
+
+def run(code: str, multiproc_dir, *args) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=ROOT, PROMETHEUS_MULTIPROC_DIR=str(multiproc_dir))
+    return subprocess.run(
+        [sys.executable, "-c", textwrap.dedent(code), *args],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=True,
+        universal_newlines=True,
+    )
+
+
+def samples(text: str) -> dict:
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(text)
+        for sample in family.samples
+    }
+
+
+def worker(multiproc_dir) -> int:
+    """ Runs a worker process, returns its pid """
+    before = set(os.listdir(multiproc_dir))
+    run(WORKER, multiproc_dir)
+    # the files of a process are named after its pid, as gauge_livesum_<pid>.db
+    created = set(os.listdir(multiproc_dir)) - before
+    return next(int(name.rsplit("_", 1)[1][:-3]) for name in created if "livesum" in name)
+
+
+def test_metrics_of_all_the_workers(tmp_path):
+    first = worker(tmp_path)
+    worker(tmp_path)
+
+    scraped = samples(run(SCRAPE, tmp_path).stdout)
+
+    ok = (("method", "GET"), ("route", "/users"), ("status", "200"))
+    unmatched = (("method", "GET"), ("route", "unmatched"), ("status", "404"))
+    assert scraped[("http_requests_total", ok)] == 2
+    assert scraped[("http_requests_total", unmatched)] == 2
+    assert scraped[("http_request_duration_seconds_count", ok[:2])] == 2
+    assert scraped[("http_request_duration_seconds_sum", ok[:2])] == 0.004
+    assert scraped[("http_requests_in_flight", ())] == 2
+
+    # the live gauges of a dead worker are dropped, its counters are kept
+    scraped = samples(run(SCRAPE, tmp_path, str(first)).stdout)
+    assert scraped[("http_requests_in_flight", ())] == 1
+    assert scraped[("http_requests_total", ok)] == 2
+
+
+def test_clear_multiprocess_dir(tmp_path, monkeypatch):
+    worker(tmp_path)
+    (tmp_path / "keep.txt").write_text("not a metrics file")
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+
+    from app.lib import metrics
+
+    metrics.clear_multiprocess_dir()
+
+    # only the files of prometheus_client: the directory may be shared
+    assert os.listdir(tmp_path) == ["keep.txt"]
+    ok = (("method", "GET"), ("route", "/users"), ("status", "200"))
+    assert ("http_requests_total", ok) not in samples(run(SCRAPE, tmp_path).stdout)
@@ -0,0 +1,187 @@
+import attr
+import sqlalchemy as sqla
+from sqlalchemy.dialects import postgresql
+
+from app.database.pycrudorm import CRUD, ObjectCache
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(max_size=2, ttl=10.0):
+    clock = FakeClock()
+    return ObjectCache(max_size=max_size, ttl=ttl, clock=clock), clock
+
+
+def test_hit_and_miss():
+    cache, _ = make_cache()
+    assert cache.get(("a",)) is None
+    cache.set(("a",), "row a")
+    assert cache.get(("a",)) == "row a"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_is_evicted():
+    cache, _ = make_cache(max_size=2)
+    cache.set(("a",), "row a")
+    cache.set(("b",), "row b")
+    # a read makes a the most recently used
+    cache.get(("a",))
+    cache.set(("c",), "row c")
+
+    assert cache.get(("b",)) is None
+    assert cache.get(("a",)) == "row a"
+    assert cache.get(("c",)) == "row c"
+    assert cache.evictions == 1
+    assert cache.as_dict["size"] == 2
+
+
+def test_entries_expire_after_ttl():
+    cache, clock = make_cache(ttl=10.0)
+    cache.set(("a",), "row a")
+
+    clock.now += 10.0
+    assert cache.get(("a",)) == "row a"
+
+    clock.now += 0.001
+    assert cache.get(("a",)) is None
+    assert cache.expirations == 1
+    assert cache.as_dict["size"] == 0
+
+
+def test_set_restarts_the_ttl():
+    cache, clock = make_cache(ttl=10.0)
+    cache.set(("a",), "row a")
+    clock.now += 8
+    cache.set(("a",), "row a2")
+    clock.now += 8
+    assert cache.get(("a",)) == "row a2"
+
+
+def test_invalidate_counts_the_entries_removed():
+    cache, _ = make_cache()
+    cache.set(("a",), "row a")
+    cache.invalidate([("a",), ("missing",)])
+    assert cache.get(("a",)) is None
+    assert cache.invalidations == 1
+
+
+def test_disabled_cache_stores_nothing():
+    cache, _ = make_cache(max_size=0)
+    cache.set(("a",), "row a")
+    assert cache.get(("a",)) is None
+    assert cache.as_dict["enabled"] is False
+    assert cache.misses == 0
+
+
+# invalidation by the CRUD writes, on a database faked at execute_sqla
+
+widgets = sqla.Table(
+    "widgets",
+    sqla.MetaData(),
+    sqla.Column("widget_id", sqla.Integer, primary_key=True),
+    sqla.Column("name", sqla.String, unique=True),
+    sqla.Column("color", sqla.String),
+)
+
+
+class FakeResult(object):
+    def __init__(self, row):
+        self.row = row
+
+    def first(self):
+        return self.row
+
+
+class FakeDB(object):
+    engine = attr.make_class("Engine", ["dialect"])(postgresql.dialect())
+
+    def __init__(self):
+        self.rows = {}
+        self.loads = 0
+
+    def execute_sqla(self, statement, params=None):
+        sql = str(statement)
+        if sql.startswith("SELECT"):
+            self.loads += 1
+            for row in self.rows.values():
+                if params["value"] in row[:2]:
+                    return FakeResult(row + ("1",))
+            return FakeResult(None)
+        if sql.startswith("INSERT"):
+            row = (params["widget_id"], params["name"], params["color"])
+            self.rows[row[0]] = row
+            return FakeResult(row)
+        if sql.startswith("UPDATE"):
+            row = self.rows[params["_pk"]]
+            self.rows[row[0]] = (
+                row[0],
+                params.get("name", row[1]),
+                params.get("color", row[2]),
+            )
+        elif sql.startswith("DELETE"):
+            del self.rows[params["_pk"]]
+        return FakeResult(None)
+
+
+@attr.s(auto_attribs=True)
+class Widget(CRUD):
+    widget_id: int
+    name: str
+    color: str
+
+    _table = widgets
+
+
+def setup_widgets():
+    Widget.db = FakeDB()
+    Widget.object_cache, clock = make_cache(max_size=10)
+    Widget.create(widget_id=1, name="gear", color="red")
+    return Widget.db, clock
+
+
+def test_load_is_cached_until_expired():
+    db, clock = setup_widgets()
+    assert Widget.load(widget_id=1).color == "red"
+    assert Widget.load(widget_id=1).color == "red"
+    assert db.loads == 1
+
+    clock.now += 11
+    Widget.load(widget_id=1)
+    assert db.loads == 2
+
+
+def test_update_invalidates_the_old_and_new_keys():
+    db, _ = setup_widgets()
+    Widget.load(widget_id=1)
+    Widget.load(name="gear")
+
+    Widget.load(widget_id=1).update(name="cog", color="blue")
+
+    assert Widget.load(widget_id=1).color == "blue"
+    assert Widget.load(name="gear") is None
+    assert Widget.load(name="cog").color == "blue"
+    assert db.loads == 5
+
+
+def test_delete_invalidates():
+    db, _ = setup_widgets()
+    widget = Widget.load(widget_id=1)
+    widget.delete()
+    assert Widget.load(widget_id=1) is None
+    assert db.loads == 2
+
+
+def test_create_invalidates_a_stale_entry():
+    db, _ = setup_widgets()
+    Widget.load(widget_id=1)
+    Widget.object_cache.set((Widget, "widget_id", 2), (2, "old", "grey", "1"))
+
+    Widget.create(widget_id=2, name="bolt", color="black")
+
+    assert Widget.load(widget_id=2).name == "bolt"
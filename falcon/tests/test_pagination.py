@@ -0,0 +1,92 @@
+import base64
+import json
+
+import pytest
+
+from app.lib.pagination import decode_cursor, encode_cursor, split_page
+
+
+def raw_cursor(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+@pytest.mark.parametrize("after", [0, 1, 63, 2 ** 31, 2 ** 63 - 1])
+def test_cursor_round_trip(after):
+    assert decode_cursor(encode_cursor(after)) == after
+
+
+def test_cursor_is_url_safe_without_padding():
+    for after in range(1000):
+        cursor = encode_cursor(after)
+        assert "=" not in cursor
+        assert set(cursor) <= set(
+            "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+        )
+
+
+@pytest.mark.parametrize("cursor", [None, ""])
+def test_no_cursor_starts_at_the_beginning(cursor):
+    assert decode_cursor(cursor) == 0
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not a cursor",
+        "@@@@",
+        "é",
+        base64.urlsafe_b64encode(b"not json").decode(),
+        raw_cursor([1]),
+        raw_cursor({"before": 1}),
+        raw_cursor({"after": -1}),
+        raw_cursor({"after": True}),
+        raw_cursor({"after": "1"}),
+        raw_cursor({"after": 1.5}),
+        raw_cursor({"after": None}),
+    ],
+)
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def rows(*user_ids):
+    return [{"user_id": user_id} for user_id in user_ids]
+
+
+def test_empty_page():
+    assert split_page([], 10) == ([], None)
+
+
+def test_last_page_shorter_than_limit():
+    assert split_page(rows(4, 5), 10) == (rows(4, 5), None)
+
+
+def test_last_page_exactly_limit():
+    # limit + 1 rows are fetched: limit rows means no next page
+    assert split_page(rows(1, 2, 3), 3) == (rows(1, 2, 3), None)
+
+
+def test_page_with_a_next_page():
+    page, next_after = split_page(rows(1, 2, 3, 7), 3)
+    assert page == rows(1, 2, 3)
+    # the next page starts after the last row shown, not the extra one
+    assert next_after == 3
+
+
+def test_page_of_one():
+    assert split_page(rows(8, 9), 1) == (rows(8,), 8)
+    assert split_page(rows(9), 1) == (rows(9), None)
+
+
+def test_pages_cover_the_table_once():
+    table = rows(*range(1, 26))
+    seen, after = [], 0
+    while True:
+        fetched = [row for row in table if row["user_id"] > after][:4 + 1]
+        page, next_after = split_page(fetched, 4)
+        seen.extend(page)
+        if next_after is None:
+            break
+        after = decode_cursor(encode_cursor(next_after))
+    assert seen == table
@@ -0,0 +1,98 @@
+import datetime as dt
+import json
+from typing import List, Optional
+
+import attr
+import pytest
+
+from app.lib.serialization import (
+    compile_serializer,
+    json_dumps,
+    media_dumps,
+    serializer,
+)
+
+
+def previous_dumps(media):
+    """ The output before the generated serializers: attr.asdict then json """
+    if isinstance(media, list):
+        return json_dumps([attr.asdict(item) for item in media])
+    return json_dumps(attr.asdict(media))
+
+
+@attr.s(auto_attribs=True)
+class Address(object):
+    city: str
+    zip_code: int
+
+
+@attr.s(auto_attribs=True)
+class Person(object):
+    user_id: int
+    name: str
+    is_active: bool = True
+    born: dt.date = dt.date(1990, 5, 17)
+    created_date: dt.datetime = dt.datetime(2020, 1, 2, 3, 4, 5, 678901)
+    nickname: Optional[str] = None
+    score: float = 0.5
+    tags: List[str] = attr.ib(factory=list)
+    address: Optional[Address] = None
+
+
+@attr.s(auto_attribs=True)
+class Empty(object):
+    pass
+
+
+PEOPLE = [
+    Person(user_id=1, name="Ada"),
+    Person(user_id=2, name="", is_active=False, nickname="countess"),
+    Person(user_id=-3, name='quote " backslash \\ slash /', tags=["a", "b"]),
+    Person(user_id=2 ** 70, name="tab\tnewline\ncontrol\x01\x1f"),
+    Person(user_id=5, name="unicode \u00e9 \u6f22\u5b57 \U0001f600 \u2028 \x7f"),
+    Person(user_id=9, name="literal \\u0041 is not an escape"),
+    Person(user_id=6, name="Grace", address=Address(city="Arlington", zip_code=22201)),
+    Person(
+        user_id=7,
+        name="aware",
+        created_date=dt.datetime(2020, 6, 1, 12, 0, tzinfo=dt.timezone.utc),
+    ),
+    Person(user_id=8, name="no microseconds", created_date=dt.datetime(2021, 1, 1)),
+]
+
+
+@pytest.mark.parametrize("person", PEOPLE, ids=lambda person: str(person.user_id))
+def test_same_output_as_asdict(person):
+    assert media_dumps(person) == previous_dumps(person)
+    assert json.loads(media_dumps(person)) == json.loads(previous_dumps(person))
+
+
+def test_values_not_of_the_annotated_type():
+    # a bool is not serialized as an int field, nor a str subclass as a str
+    class Name(str):
+        pass
+
+    odd = Person(user_id=True, name=Name("sub"), is_active=1, born=None, score=3)
+    assert media_dumps(odd) == previous_dumps(odd)
+
+
+def test_list_of_objects():
+    assert media_dumps(PEOPLE) == previous_dumps(PEOPLE)
+
+
+def test_mixed_list_falls_back():
+    mixed = [PEOPLE[0], Address(city="Paris", zip_code=75001)]
+    assert media_dumps(mixed) == previous_dumps(mixed)
+
+
+def test_plain_values_fall_back():
+    for media in ([], {}, {"a": [1, None]}, "text", 1, None):
+        assert media_dumps(media) == json_dumps(media)
+
+
+def test_class_without_fields():
+    assert compile_serializer(Empty)(Empty()) == "{}" == previous_dumps(Empty())
+
+
+def test_serializer_is_compiled_once():
+    assert serializer(Person) is serializer(Person)
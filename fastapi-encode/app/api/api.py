@@ -1,6 +1,8 @@
 from fastapi import APIRouter
 
-from app.api.endpoints import routes_users
+from app.api.endpoints import routes_metrics, routes_profile, routes_users
 
 api_router = APIRouter()
 api_router.include_router(routes_users.router, prefix="/users", tags=["users"])
+api_router.include_router(routes_metrics.router, tags=["metrics"])
+api_router.include_router(routes_profile.router, tags=["profile"])
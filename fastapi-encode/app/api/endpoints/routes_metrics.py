@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from prometheus_client import CONTENT_TYPE_LATEST
+from starlette.responses import Response
+
+from app.utils.metrics import latest
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """
+        The Prometheus metrics, of all the workers, see app.utils.metrics
+    """
+    return Response(latest(), headers={"content-type": CONTENT_TYPE_LATEST})
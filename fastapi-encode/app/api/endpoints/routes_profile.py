@@ -0,0 +1,62 @@
+import hmac
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+
+from app.core.config import settings
+from app.utils.profiler import ProfilerBusy, Stacks, profiler
+
+router = APIRouter()
+
+
+def check_token(authorization: Optional[str]) -> None:
+    if not settings.PROFILER_TOKEN:
+        raise HTTPException(status_code=404)
+    expected = f"Bearer {settings.PROFILER_TOKEN}".encode()
+    if not hmac.compare_digest((authorization or "").encode(), expected):
+        raise HTTPException(status_code=401, detail="Profiler Error")
+
+
+@router.get("/_profile", include_in_schema=False)
+async def profile(
+    seconds: int = Query(10, ge=1),
+    continuous: bool = False,
+    route: Optional[str] = None,
+    format: str = Query("speedscope", regex="^(speedscope|folded)$"),
+    authorization: Optional[str] = Header(None),
+) -> Response:
+    """
+        The sampling profiler of the worker answering, see
+        app.utils.profiler. Needs an "Authorization: Bearer PROFILER_TOKEN"
+        header, off without a PROFILER_TOKEN.
+
+        seconds: samples the worker for that long (at most
+                 PROFILER_MAX_SECONDS), the event loop keeps answering
+        continuous: the stacks of the continuous profiler instead, under
+                    their route, only the ones of route if given
+        format: speedscope (https://www.speedscope.app) or folded
+                (flamegraph.pl)
+    """
+    check_token(authorization)
+
+    stacks: Stacks
+    if continuous:
+        if profiler.continuous is None:
+            raise HTTPException(
+                status_code=409,
+                detail="the continuous profiler is off, see "
+                "PROFILER_CONTINUOUS_HZ",
+            )
+        stacks = profiler.continuous
+    else:
+        try:
+            stacks = await run_in_threadpool(profiler.profile, seconds)
+        except ProfilerBusy as exc:
+            raise HTTPException(status_code=409, detail=str(exc))
+
+    name = f"{os.getpid()}-{route or 'worker'}"
+    content_type, body = stacks.render(format, name, route)
+    return Response(body, headers={"content-type": content_type})
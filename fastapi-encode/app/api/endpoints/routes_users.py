@@ -1,18 +1,44 @@
-from typing import List, Optional
+from typing import Any, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
 from starlette import status
+from starlette.responses import StreamingResponse
 
 from app.api.servicesfac import get_user_services
 from app.domain.users.users_schema import (
+    UserBulkItemSchema,
+    UserBulkResultSchema,
     UserCreateSchema,
     UserDBSchema,
     UserUpdateSchema,
 )
+from app.core.config import settings
 from app.domain.users.users_service import UserService
+from app.utils.etag import etag_matches, make_etag
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.responses import (
+    EncodedRoute,
+    TrustedJSONResponse,
+    dumps_str,
+)
+from app.utils.streaming import (
+    NDJSON,
+    chunked,
+    stream_json_array,
+    stream_ndjson,
+)
 
-router = APIRouter()
+router = APIRouter(route_class=EncodedRoute)
 
 
 @router.post("/", response_model=UserDBSchema)
@@ -23,21 +49,158 @@ async def create_user(
     return await user_service.create_user(user)
 
 
+@router.post("/bulk", response_model=UserBulkResultSchema)
+async def create_users(
+    users: List[Any] = Body(...),
+    user_service: UserService = Depends(get_user_services),
+) -> UserBulkResultSchema:
+    """
+        Creates at most BULK_MAX_ITEMS users with one INSERT per set of
+        fields sent. Each user is validated on its own: an invalid or
+        duplicate user, or one refused by the database, comes back with its
+        error without failing the others.
+    """
+    if len(users) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=(
+                f"at most {settings.BULK_MAX_ITEMS} users can be created "
+                "per request"
+            ),
+        )
+
+    results: List[UserBulkItemSchema] = []
+    valid = []
+    for index, item in enumerate(users):
+        try:
+            valid.append((index, UserCreateSchema.parse_obj(item)))
+        except ValidationError as ex:
+            error = "; ".join(
+                f"{'.'.join(map(str, err['loc']))}: {err['msg']}"
+                for err in ex.errors()
+            )
+            results.append(UserBulkItemSchema(index=index, error=error))
+
+    created = await user_service.create_users([user for _, user in valid])
+    for (index, _), (user, error) in zip(valid, created):
+        results.append(UserBulkItemSchema(index=index, user=user, error=error))
+
+    results.sort(key=lambda result: result.index)
+    return UserBulkResultSchema(
+        created=len([result for result in results if result.user]),
+        failed=len([result for result in results if result.error]),
+        results=results,
+    )
+
+
 @router.get("/all", response_model=List[UserDBSchema])
 async def list_users(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=settings.PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    stream: bool = False,
     user_service: UserService = Depends(get_user_services),
 ) -> List[UserDBSchema]:
+    """
+        limit, cursor: keyset pagination ordered by user_id, the cursor of
+        the next page is sent in the X-Next-Cursor header (absent on the
+        last page). Takes precedence over stream.
+
+        stream: streams the users from a server-side cursor, as a JSON array
+        or as NDJSON when the client accepts application/x-ndjson
+
+        If-None-Match is answered with a 304 when the users table was not
+        written since
+
+        With TRUSTED_RESPONSES, the rows are written straight to JSON
+        without the validation of the response_model
+    """
+    ndjson = stream and NDJSON in request.headers.get("accept", "")
+    etag = make_etag(
+        f"users-{await user_service.get_users_version()}",
+        variant="ndjson" if ndjson else None,
+    )
+    cache_headers = {"ETag": etag, "Vary": "Accept"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers
+        )
+    response.headers.update(cache_headers)
+
+    if limit is not None or cursor is not None:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="not a valid cursor",
+            )
+
+        limit = limit or settings.PAGE_DEFAULT_LIMIT
+        if settings.TRUSTED_RESPONSES:
+            rows, next_after = await user_service.list_users_page_rows(
+                limit, after
+            )
+            if next_after is not None:
+                cache_headers["X-Next-Cursor"] = encode_cursor(next_after)
+            return TrustedJSONResponse(rows, headers=cache_headers)
+
+        page, next_after = await user_service.list_users_page(limit, after)
+        if next_after is not None:
+            response.headers["X-Next-Cursor"] = encode_cursor(next_after)
+        return page
+
+    if stream:
+        chunks = chunked(
+            user_service.iterate_users(), settings.STREAM_CHUNK_SIZE
+        )
+        if ndjson:
+            return StreamingResponse(
+                stream_ndjson(chunks, dumps_str),
+                media_type=NDJSON,
+                headers=cache_headers,
+            )
+        return StreamingResponse(
+            stream_json_array(chunks, dumps_str),
+            media_type="application/json",
+            headers=cache_headers,
+        )
+
+    if settings.TRUSTED_RESPONSES:
+        return TrustedJSONResponse(
+            await user_service.list_users_rows(), headers=cache_headers
+        )
+
     users: List[UserDBSchema] = await user_service.list_users()
     return users
 
 
 @router.get("/{user_id}", response_model=UserDBSchema)
-def get_user_by_id(
+async def get_user_by_id(
     user_id: int,
+    request: Request,
+    response: Response,
     user_service: UserService = Depends(get_user_services),
 ) -> Optional[UserDBSchema]:
-    user = user_service.get_user_by_id(db, user_id)
+    """
+        If-None-Match is answered with a 304 when the user did not change,
+        only its version is read from the database
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        version = await user_service.get_user_version(user_id)
+        if version is not None and etag_matches(
+            if_none_match, make_etag(version)
+        ):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED,
+                headers={"ETag": make_etag(version)},
+            )
+
+    user, version = await user_service.get_user_with_version(user_id)
     if user:
+        response.headers["ETag"] = make_etag(version)
         return user
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
@@ -46,23 +209,27 @@ def get_user_by_id(
 
 
 @router.put("/{user_id}", response_model=UserDBSchema)
-def update_user(
+async def update_user(
     user_id: int,
     new_user: UserUpdateSchema,
     user_service: UserService = Depends(get_user_services),
 ) -> UserDBSchema:
-    user_updated: UserDBSchema = user_service.update_user(
-        db, user_id, new_user
+    user_updated = await user_service.update_user(user_id, new_user)
+
+    if user_updated:
+        return user_updated
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"User with id:{user_id} not found",
     )
-    return user_updated
 
 
 @router.delete("/{user_id}", response_model=UserDBSchema)
-def remove_user(
+async def remove_user(
     user_id: int,
     user_service: UserService = Depends(get_user_services),
 ) -> UserDBSchema:
-    user_removed = user_service.remove_user(db, user_id)
+    user_removed = await user_service.remove_user(user_id)
 
     if user_removed:
         return user_removed
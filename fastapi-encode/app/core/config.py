@@ -45,6 +45,41 @@ class Settings(BaseSettings):
 
     SENTRY_DSN: Optional[str] = None
 
+    # rows per chunk written by the streaming endpoints
+    STREAM_CHUNK_SIZE: int = 1000
+
+    # keyset pagination of the list endpoints
+    PAGE_DEFAULT_LIMIT: int = 100
+    PAGE_MAX_LIMIT: int = 1000
+
+    # the list endpoints write the database rows straight to JSON, skipping
+    # the validation of their response_model
+    TRUSTED_RESPONSES: bool = False
+
+    # JSON library of the responses and request bodies: auto, json,
+    # rapidjson, ujson or orjson, see app/utils/encoders.py
+    JSON_ENCODER: str = "auto"
+
+    # access log of PerformanceMonitoringMiddleware: the level of the
+    # successful requests, and the share of them logged (errors are always
+    # logged), see app/utils/access_log.py
+    ACCESS_LOG_LEVEL: str = "INFO"
+    ACCESS_LOG_SAMPLE_RATE: float = 1.0
+
+    # sampling profiler, see app/utils/profiler.py. GET /_profile needs an
+    # "Authorization: Bearer <PROFILER_TOKEN>" header, and is off without one
+    PROFILER_TOKEN: Optional[str] = None
+    PROFILER_HZ: int = 100
+    PROFILER_MAX_SECONDS: int = 60
+    # SIGUSR2 to a worker writes a profile to PROFILER_DIR
+    PROFILER_SIGNAL_SECONDS: int = 30
+    PROFILER_DIR: Path = CODE_PATH / "profiles"
+    # always-on sampling of the worker, off when 0
+    PROFILER_CONTINUOUS_HZ: float = 0.0
+
+    # items accepted by the bulk creation endpoints
+    BULK_MAX_ITEMS: int = 1000
+
     class Config:
         env_file = ".env"  # p: Path = Path(__file__).parents[2] / ".env"
         case_sensitive = True
@@ -1,8 +1,11 @@
 import logging
+import time
+from typing import Any, AsyncGenerator, Dict, List, Mapping
 
 from databases import Database
 
 from app.core.config import settings
+from app.utils.timing import add_db_time
 
 # from sqlalchemy import create_engine
 # from sqlalchemy.ext.declarative import declarative_base
@@ -11,4 +14,78 @@ from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
-db = Database(settings.SQLALCHEMY_DATABASE_URI)
+
+class TimedDatabase(Database):
+    """
+        Database, adding the duration of its queries to the db time of the
+        current request, see app.utils.timing
+    """
+
+    @property
+    def pool_stats(self) -> Dict[str, int]:
+        """
+            The connections of the asyncpg pool, none until connected
+        """
+        pool = getattr(self._backend, "_pool", None)
+        if pool is None:
+            return {}
+        return {"size": pool.get_size(), "idle": pool.get_idle_size()}
+
+    async def fetch_all(self, query: Any, values: dict = None) -> List[Any]:
+        start_ns = time.perf_counter_ns()
+        try:
+            return await super().fetch_all(query, values)
+        finally:
+            add_db_time(start_ns)
+
+    async def fetch_one(self, query: Any, values: dict = None) -> Any:
+        start_ns = time.perf_counter_ns()
+        try:
+            return await super().fetch_one(query, values)
+        finally:
+            add_db_time(start_ns)
+
+    async def fetch_val(
+        self, query: Any, values: dict = None, column: Any = 0
+    ) -> Any:
+        start_ns = time.perf_counter_ns()
+        try:
+            return await super().fetch_val(query, values, column=column)
+        finally:
+            add_db_time(start_ns)
+
+    async def execute(self, query: Any, values: dict = None) -> Any:
+        start_ns = time.perf_counter_ns()
+        try:
+            return await super().execute(query, values)
+        finally:
+            add_db_time(start_ns)
+
+    async def execute_many(self, query: Any, values: list) -> None:
+        start_ns = time.perf_counter_ns()
+        try:
+            return await super().execute_many(query, values)
+        finally:
+            add_db_time(start_ns)
+
+    async def iterate(
+        self, query: Any, values: dict = None
+    ) -> AsyncGenerator[Mapping, None]:
+        # only the waits for the rows, not the work of the caller on them
+        rows = super().iterate(query, values)
+        try:
+            while True:
+                start_ns = time.perf_counter_ns()
+                try:
+                    row = await rows.__anext__()
+                except StopAsyncIteration:
+                    return
+                finally:
+                    add_db_time(start_ns)
+                yield row
+        finally:
+            # closes the cursor when the caller stops early
+            await rows.aclose()
+
+
+db = TimedDatabase(settings.SQLALCHEMY_DATABASE_URI)
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, EmailStr
 
@@ -28,3 +28,16 @@ class UserDBSchema(UserBase):
 
     class Config:
         orm_mode = True
+
+
+# result of one user of a bulk creation
+class UserBulkItemSchema(BaseModel):
+    index: int
+    user: Optional[UserDBSchema] = None
+    error: Optional[str] = None
+
+
+class UserBulkResultSchema(BaseModel):
+    created: int
+    failed: int
+    results: List[UserBulkItemSchema]
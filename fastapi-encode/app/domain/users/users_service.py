@@ -1,12 +1,26 @@
-from typing import Any, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-from sqlalchemy.orm import Session
+from asyncpg import PostgresError
 
 from app.domain.users.users_schema import (
     UserCreateSchema,
     UserDBSchema,
     UserUpdateSchema,
 )
+from app.utils.responses import rows_to_dicts, schema_fields
+
+# the columns selected for the trusted responses, see list_users_rows
+USER_FIELDS = schema_fields(UserDBSchema)
+
+ALREADY_EXISTS = "user already exists"
+
+
+def _row_to_dict(row: Any) -> Dict[str, Any]:
+    return {k: v for k, v in zip(row.keys(), row.values())}
+
+
+def _row_to_schema(row: Any) -> UserDBSchema:
+    return UserDBSchema(**_row_to_dict(row))
 
 
 class UserService:
@@ -15,32 +29,145 @@ class UserService:
 
     async def create_user(self, user: UserCreateSchema) -> UserDBSchema:
         new_user = await self.__user_queries.create_user(user)
-        return UserDBSchema.from_orm(new_user)
+        return _row_to_schema(new_user)
+
+    async def create_users(
+        self, users: List[UserCreateSchema]
+    ) -> List[Tuple[Optional[UserDBSchema], Optional[str]]]:
+        """
+            One (user, error) per user: the created user, or why it was not
+            created. Only the values sent are inserted, the columns left out
+            get their server default. The users sending the same columns are
+            inserted with one statement; when the database refuses it, they
+            are inserted one at a time so that only the faulty ones fail.
+
+            The inserted rows are matched back by email, of two users with
+            the same email only the first is created.
+        """
+        results: List[Tuple[Optional[UserDBSchema], Optional[str]]] = [
+            (None, ALREADY_EXISTS)
+        ] * len(users)
+        values = [user.dict(exclude_none=True) for user in users]
+        indexes_by_columns: Dict[Tuple[str, ...], List[int]] = {}
+        for index, row in enumerate(values):
+            indexes_by_columns.setdefault(tuple(sorted(row)), []).append(index)
+
+        for indexes in indexes_by_columns.values():
+            try:
+                rows = await self.__user_queries.create_users(
+                    [values[index] for index in indexes]
+                )
+            except PostgresError:
+                for index in indexes:
+                    results[index] = await self._create_one(values[index])
+                continue
+
+            created = {row["email"]: _row_to_schema(row) for row in rows}
+            for index in indexes:
+                user = created.pop(users[index].email, None)
+                if user is not None:
+                    results[index] = (user, None)
+
+        return results
+
+    async def _create_one(
+        self, values: Dict[str, Any]
+    ) -> Tuple[Optional[UserDBSchema], Optional[str]]:
+        try:
+            rows = await self.__user_queries.create_users([values])
+        except PostgresError as ex:
+            return None, str(ex)
+        if not rows:
+            return None, ALREADY_EXISTS
+        return _row_to_schema(rows[0]), None
 
     async def list_users(self) -> List[UserDBSchema]:
         users = await self.__user_queries.get_all_users()
-        users_schema = [UserDBSchema(**{k:v for k,v in zip(user.keys(), user.values())}) for user in users]  #kinda not noob friendly
+        users_schema = [_row_to_schema(user) for user in users]
         return users_schema
 
-    def get_user_by_id(
-        self, db: Session, user_id: int
-    ) -> Optional[UserDBSchema]:
-        user = self.__user_queries.get_user_byid(db, user_id)
+    async def list_users_page(
+        self, limit: int, after: int = 0
+    ) -> Tuple[List[UserDBSchema], Optional[int]]:
+        """
+            Keyset pagination: the first `limit` users with a user_id greater
+            than `after`, and the user_id to start the next page after (None
+            on the last page). One extra row tells if there is a next page.
+        """
+        rows = await self.__user_queries.get_users_page(after, limit + 1)
+        users = [_row_to_schema(row) for row in rows[:limit]]
+        next_after = users[-1].user_id if len(rows) > limit else None
+        return users, next_after
+
+    async def list_users_rows(self) -> List[Dict[str, Any]]:
+        """
+            The users as the dicts UserDBSchema would produce, for a
+            TrustedJSONResponse: only its fields are selected, their values
+            come from the database as is, no schema object is built.
+        """
+        rows = await self.__user_queries.get_all_users(USER_FIELDS)
+        return rows_to_dicts(rows, USER_FIELDS)
+
+    async def list_users_page_rows(
+        self, limit: int, after: int = 0
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+            list_users_page, as the dicts of list_users_rows
+        """
+        rows = await self.__user_queries.get_users_page(
+            after, limit + 1, USER_FIELDS
+        )
+        users = rows_to_dicts(rows[:limit], USER_FIELDS)
+        next_after = users[-1]["user_id"] if len(rows) > limit else None
+        return users, next_after
+
+    async def iterate_users(self) -> AsyncIterator[Dict[str, Any]]:
+        """
+            Yields the users as the dicts UserDBSchema would produce, without
+            building the schema objects: only its fields are selected, and
+            their values come from the database as is.
+        """
+        rows = self.__user_queries.iterate_users(USER_FIELDS)
+        async for row in rows:
+            yield _row_to_dict(row)
+
+    async def get_user_by_id(self, user_id: int) -> Optional[UserDBSchema]:
+        user = await self.__user_queries.get_user_byid(user_id)
         if user:
-            return UserDBSchema.from_orm(user)
+            return _row_to_schema(user)
         else:
             return None
 
-    def update_user(
-        self, db: Session, user_id: int, new_user: UserUpdateSchema
-    ) -> UserDBSchema:
-        old_user = self.__user_queries.get_user_byid(db, user_id)
-        user_updated = self.__user_queries.update_user(db, old_user, new_user)
-        return UserDBSchema.from_orm(user_updated)
+    async def get_user_with_version(
+        self, user_id: int
+    ) -> Tuple[Optional[UserDBSchema], Optional[str]]:
+        """
+            The user and the version of its row (xmin, changed by every
+            write), (None, None) when not found
+        """
+        user = await self.__user_queries.get_user_byid(user_id)
+        if user:
+            return _row_to_schema(user), user["version"]
+        return None, None
+
+    async def get_user_version(self, user_id: int) -> Optional[str]:
+        return await self.__user_queries.get_user_version(user_id)
+
+    async def get_users_version(self) -> int:
+        return await self.__user_queries.get_table_version()
+
+    async def update_user(
+        self, user_id: int, new_user: UserUpdateSchema
+    ) -> Optional[UserDBSchema]:
+        user_updated = await self.__user_queries.update_user(user_id, new_user)
+        if user_updated:
+            return _row_to_schema(user_updated)
+        else:
+            return None
 
-    def remove_user(self, db: Session, user_id: int) -> Optional[UserDBSchema]:
-        user_removed = self.__user_queries.delete_user(db, user_id)
+    async def remove_user(self, user_id: int) -> Optional[UserDBSchema]:
+        user_removed = await self.__user_queries.delete_user(user_id)
         if user_removed:
-            return UserDBSchema.from_orm(user_removed)
+            return _row_to_schema(user_removed)
         else:
             return None
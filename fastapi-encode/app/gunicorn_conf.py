@@ -1,3 +1,5 @@
+import gc
+import glob
 import json
 import multiprocessing
 import os
@@ -35,6 +37,8 @@ use_errorlog = errorlog_var or None
 graceful_timeout_str = os.getenv("GRACEFUL_TIMEOUT", "120")
 timeout_str = os.getenv("TIMEOUT", "120")
 keepalive_str = os.getenv("KEEP_ALIVE", "5")
+preload_var = os.getenv("PRELOAD", "")
+use_preload = preload_var.lower() in ("1", "true", "yes")
 
 # Gunicorn config variables
 loglevel = use_loglevel
@@ -45,6 +49,57 @@ accesslog = use_accesslog
 graceful_timeout = int(graceful_timeout_str)
 timeout = int(timeout_str)
 keepalive = int(keepalive_str)
+# the app is imported once, by the master. The database pool is still
+# connected by each worker (startup event), in its own event loop
+preload_app = use_preload
+
+if preload_app:
+    # until the app is loaded, see when_ready and pre_fork
+    gc.disable()
+
+
+def pre_fork(server, worker):
+    if server.cfg.preload_app:
+        # the objects of the preloaded app are left out of the collections
+        # of the workers: their memory pages stay shared with the master
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    gc.enable()
+
+
+def when_ready(server):
+    # the master collects again once the app is loaded, its objects frozen
+    # first: they stay out of the collections of the master too
+    gc.freeze()
+    gc.enable()
+
+
+# the Prometheus metrics of the workers, see app/utils/metrics.py
+prometheus_multiproc_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR", "")
+
+
+def on_starting(server):
+    if prometheus_multiproc_dir:
+        # the files of a previous run would be summed with the new ones,
+        # only those of prometheus_client: the directory may be shared
+        os.makedirs(prometheus_multiproc_dir, exist_ok=True)
+        for db_file in glob.glob(
+            os.path.join(prometheus_multiproc_dir, "*.db")
+        ):
+            try:
+                os.remove(db_file)
+            except FileNotFoundError:
+                pass
+
+
+def child_exit(server, worker):
+    if prometheus_multiproc_dir:
+        from prometheus_client import multiprocess
+
+        # the live gauges of a dead worker are dropped
+        multiprocess.mark_process_dead(worker.pid)
 
 
 # For debugging and testing
@@ -55,8 +110,10 @@ log_data = {
     "graceful_timeout": graceful_timeout,
     "timeout": timeout,
     "keepalive": keepalive,
+    "preload_app": preload_app,
     "errorlog": errorlog,
     "accesslog": accesslog,
+    "prometheus_multiproc_dir": prometheus_multiproc_dir,
     # Additional, non-gunicorn variables
     "workers_per_core": workers_per_core,
     "use_max_workers": use_max_workers,
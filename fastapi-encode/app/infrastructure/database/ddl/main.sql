@@ -7,6 +7,47 @@ create table users (
     is_active Boolean default true not null,
     is_superuser Boolean default false not null,
     created_date Timestamp default now() not null
-)
+);
 
 
+
+-- one version per table, moved by every transaction writing to it: the list
+-- endpoints use it as their ETag. It is a row, so a version only becomes
+-- visible with the commit of its writes. The list endpoints read it before
+-- the rows: a commit in between gives the new rows an older ETag, which the
+-- next request fixes, never old rows a newer ETag.
+--
+-- The trigger is deferred to the commit, a writer only holds the lock of the
+-- row while it commits. It is a row trigger (constraint triggers can not be
+-- statement ones): the transaction-local setting skips all its calls after
+-- the first.
+create table table_versions (
+    table_name varchar primary key,
+    version bigint not null default 0
+);
+
+create or replace function bump_table_version() returns trigger as $$
+begin
+    if current_setting('table_versions.' || TG_TABLE_NAME, true) = '1' then
+        return null;
+    end if;
+    perform set_config('table_versions.' || TG_TABLE_NAME, '1', true);
+
+    insert into table_versions (table_name, version)
+    values (TG_TABLE_NAME, 1)
+    on conflict (table_name)
+    do update set version = table_versions.version + 1;
+    return null;
+end;
+$$ language plpgsql;
+
+create constraint trigger users_table_version
+after insert or update or delete on users
+deferrable initially deferred
+for each row execute procedure bump_table_version();
+
+-- constraint triggers can not fire on truncate, which locks the whole table
+-- until its commit anyway
+create trigger users_table_version_truncate
+after truncate on users
+for each statement execute procedure bump_table_version();
@@ -0,0 +1,12 @@
+# coding: utf-8
+from sqlalchemy import BigInteger, Column, MetaData, String, Table, text
+
+metadata = MetaData()
+
+
+t_table_versions = Table(
+    'table_versions', metadata,
+    Column('table_name', String, primary_key=True),
+    Column('version', BigInteger, nullable=False, server_default=text("0")),
+    schema='public'
+)
@@ -1,44 +1,128 @@
-from typing import List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
 
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
-from sqlalchemy.sql import select
+from sqlalchemy.sql import literal_column, select
 
 from app.core.db import db
 from app.domain.users.users_schema import UserCreateSchema, UserUpdateSchema
+from app.infrastructure.database.models.table_versions import (
+    t_table_versions as TableVersionModel,
+)
 from app.infrastructure.database.models.users import t_users as UserModel
 
+# postgres system column changed by every write of a row
+ROW_VERSION = literal_column("xmin::text").label("version")
+
 
 class UserQueries:
     async def create_user(self, user: UserCreateSchema) -> UserModel:
-        query = UserModel.insert()
-        user_id = await db.execute(query=query, values=user.__dict__)
-        user.__dict__.update(
-            {"user_id": user_id}
-        )  # note that it's not going to take in account
-        return user
-
-    # def update_user(
-    #     self, db: Session, old_user: UserModel, new_user: UserUpdateSchema
-    # ) -> UserModel:
-    #     for key, value in new_user.dict().items():
-    #         setattr(old_user, key, value)
-
-    #     db.add(old_user)
-    #     db.commit()
-    #     db.refresh(old_user)
-    #     return old_user
-
-    # def delete_user(self, db: Session, user_id: int) -> Optional[UserModel]:
-    #     user = self.get_user_byid(db, user_id)
-    #     if user is not None:
-    #         db.delete(user)
-    #     return user
-
-    # def get_user_byid(self, db: Session, user_id: int) -> UserModel:
-    #     return db.query(UserModel).filter(UserModel.user_id == user_id).first()
-
-    async def get_all_users(self) -> List[list]:
-        s = UserModel.select()
+        """
+            Inserts the user and returns the inserted row, with the server
+            defaults (user_id, created_date), in a single round trip
+        """
+        query = UserModel.insert().returning(*UserModel.c)
+        return await db.fetch_one(query=query, values=user.dict())
+
+    async def create_users(self, users: List[Dict[str, Any]]) -> List[Any]:
+        """
+            Inserts the users with one multi-row INSERT, the ones conflicting
+            with an existing row (or a previous one of the batch) are
+            skipped. Returns the inserted rows, in no guaranteed order.
+        """
+        query = (
+            insert(UserModel)
+            .values(users)
+            .on_conflict_do_nothing()
+            .returning(*UserModel.c)
+        )
+        return await db.fetch_all(query=query)
+
+    async def update_user(
+        self, user_id: int, new_user: UserUpdateSchema
+    ) -> Optional[UserModel]:
+        values = new_user.dict(exclude_unset=True)
+        if not values:
+            return await self.get_user_byid(user_id)
+
+        query = (
+            UserModel.update()
+            .where(UserModel.c.user_id == user_id)
+            .values(**values)
+            .returning(*UserModel.c)
+        )
+        return await db.fetch_one(query=query)
+
+    async def delete_user(self, user_id: int) -> Optional[UserModel]:
+        query = (
+            UserModel.delete()
+            .where(UserModel.c.user_id == user_id)
+            .returning(*UserModel.c)
+        )
+        return await db.fetch_one(query=query)
+
+    async def get_user_byid(self, user_id: int) -> Optional[UserModel]:
+        """
+            The user row, with its version as an extra "version" column
+        """
+        query = select([*UserModel.c, ROW_VERSION]).where(
+            UserModel.c.user_id == user_id
+        )
+        return await db.fetch_one(query=query)
+
+    async def get_user_version(self, user_id: int) -> Optional[str]:
+        query = (
+            select([ROW_VERSION])
+            .select_from(UserModel)
+            .where(UserModel.c.user_id == user_id)
+        )
+        return await db.fetch_val(query=query)
+
+    async def get_table_version(self) -> int:
+        """
+            Moved by the commit of every transaction writing to the users
+            table, by the triggers of ddl/main.sql
+        """
+        query = select([TableVersionModel.c.version]).where(
+            TableVersionModel.c.table_name == UserModel.name
+        )
+        return await db.fetch_val(query=query) or 0
+
+    async def iterate_users(
+        self, columns: Sequence[str]
+    ) -> AsyncIterator[Any]:
+        """
+            Yields the users one row at a time, from a server-side cursor
+        """
+        query = select([UserModel.c[column] for column in columns])
+        async for row in db.iterate(query=query):
+            yield row
+
+    async def get_users_page(
+        self, after: int, limit: int, columns: Sequence[str] = None
+    ) -> List[Any]:
+        """
+            All the columns, or only the given ones in their order
+        """
+        query = (
+            self._select(columns)
+            .where(UserModel.c.user_id > after)
+            .order_by(UserModel.c.user_id)
+            .limit(limit)
+        )
+        return await db.fetch_all(query=query)
+
+    async def get_all_users(self, columns: Sequence[str] = None) -> List[list]:
+        """
+            All the columns, or only the given ones in their order
+        """
+        s = self._select(columns)
         res = await db.fetch_all(query=s)
         # print(res)
         return [row for row in res]
+
+    @staticmethod
+    def _select(columns: Optional[Sequence[str]]):
+        if columns is None:
+            return UserModel.select()
+        return select([UserModel.c[column] for column in columns])
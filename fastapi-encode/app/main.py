@@ -14,7 +14,12 @@ from fastapi import FastAPI
 from app.api.api import api_router
 from app.core.config import settings
 from app.core.db import db
-from app.utils.middleware import PerformanceMonitoringMiddleware
+from app.utils.middleware import (
+    PerformanceMonitoringMiddleware,
+    access_log,
+)
+from app.utils.profiler import profiler
+from app.utils.responses import EncodedJSONResponse
 
 # from app.core.db import db
 
@@ -30,7 +35,11 @@ def create_app() -> FastAPI:
         )
 
     logger.info("Initiliase fast-API app")
-    app = FastAPI(on_startup=[db.connect], on_shutdown=[db.disconnect])
+    app = FastAPI(
+        on_startup=[access_log.start, profiler.start, db.connect],
+        on_shutdown=[db.disconnect, profiler.stop, access_log.stop],
+        default_response_class=EncodedJSONResponse,
+    )
     # db.init_app(app=app)
     app.include_router(api_router)
 
@@ -32,5 +32,42 @@ def export_models() -> None:
     export_all_tables(settings)
 
 
+@manage.command(help="fill the users table with deterministic fake users")
+@click.option("--rows", type=int, default=10000, show_default=True)
+@click.option("--seed", type=int, default=42, show_default=True)
+@click.option("--active-ratio", type=float, default=0.9, show_default=True)
+@click.option("--superuser-ratio", type=float, default=0.01, show_default=True)
+@click.option(
+    "--days",
+    type=int,
+    default=365,
+    help="created_date spread, from 2020-01-01",
+)
+@click.option("--append", is_flag=True, help="keep the existing rows")
+def seed_db(
+    rows: int,
+    seed: int,
+    active_ratio: float,
+    superuser_ratio: float,
+    days: int,
+    append: bool,
+) -> None:
+    """
+        Loads 10k / 1M / 10M... users through COPY
+    """
+    from app.core.config import settings
+    from app.utils.seed import UsersDistribution, seed_users
+
+    distribution = UsersDistribution(
+        rows=rows,
+        seed=seed,
+        active_ratio=active_ratio,
+        superuser_ratio=superuser_ratio,
+        days=days,
+    )
+    print(f"Seeding users: {distribution}")
+    seed_users(settings, distribution, truncate=not append)
+
+
 if __name__ == "__main__":
     manage()
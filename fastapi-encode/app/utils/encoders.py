@@ -0,0 +1,124 @@
+import decimal
+import json
+import logging
+import uuid
+from functools import lru_cache, partial
+from typing import Any, Callable, List, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+# fastest first on the users payloads (benchmarks/encoders.py), "auto" picks
+# the first one installed
+PREFERENCE = ("orjson", "rapidjson", "json", "ujson")
+
+
+class JSONEncoder(NamedTuple):
+    name: str
+    dumps: Callable[[Any], bytes]
+    # from str or bytes
+    loads: Callable[[Any], Any]
+
+
+def _default(obj: Any) -> Any:
+    # the values all the encoders write the same way: UUIDs as strings,
+    # decimals as numbers (ujson only writes them so)
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    raise TypeError(f"{obj!r} is not JSON serializable")
+
+
+def _encoded(dumps: Callable[[Any], str]) -> Callable[[Any], bytes]:
+    return lambda content: dumps(content).encode("utf-8")
+
+
+def _json() -> JSONEncoder:
+    # the options of starlette's JSONResponse
+    dumps = partial(
+        json.dumps,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+        default=_default,
+    )
+    return JSONEncoder("json", _encoded(dumps), json.loads)
+
+
+def _rapidjson() -> JSONEncoder:
+    import rapidjson
+
+    dumps = partial(
+        rapidjson.dumps,
+        ensure_ascii=False,
+        datetime_mode=rapidjson.DM_ISO8601,
+        default=_default,
+    )
+    return JSONEncoder("rapidjson", _encoded(dumps), rapidjson.loads)
+
+
+def _ujson() -> JSONEncoder:
+    import ujson
+
+    dumps = partial(
+        ujson.dumps,
+        ensure_ascii=False,
+        escape_forward_slashes=False,
+        default=_default,
+    )
+    return JSONEncoder("ujson", _encoded(dumps), ujson.loads)
+
+
+def _orjson() -> JSONEncoder:
+    import orjson
+
+    return JSONEncoder(
+        "orjson", partial(orjson.dumps, default=_default), orjson.loads
+    )
+
+
+_FACTORIES = {
+    "json": _json,
+    "rapidjson": _rapidjson,
+    "ujson": _ujson,
+    "orjson": _orjson,
+}
+
+
+def available() -> List[str]:
+    """
+        The names of the encoders installed, in PREFERENCE order
+    """
+    names = []
+    for name in PREFERENCE:
+        try:
+            _FACTORIES[name]()
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+@lru_cache(maxsize=None)
+def get_encoder(name: str) -> JSONEncoder:
+    """
+        The encoder named name, or with "auto" the first one installed of
+        PREFERENCE. They write the same JSON, with dates in ISO 8601.
+    """
+    if name == "auto":
+        return get_encoder(available()[0])
+
+    try:
+        factory = _FACTORIES[name]
+    except KeyError:
+        raise ValueError(
+            f"unknown JSON encoder {name!r}, "
+            f"one of auto, {', '.join(_FACTORIES)}"
+        )
+    try:
+        return factory()
+    except ImportError:
+        logger.critical(f"JSON encoder {name} is not installed")
+        raise
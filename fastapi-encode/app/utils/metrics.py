@@ -0,0 +1,172 @@
+"""
+    The Prometheus metrics of the app, served by GET /metrics
+
+    With several gunicorn workers, PROMETHEUS_MULTIPROC_DIR must name a
+    directory, set in the environment before the start: every process
+    writes its metrics to memory-mapped files there, which /metrics sums
+    whichever worker answers. The master deletes those *.db files when it
+    starts (see app/gunicorn_conf.py). Without it, /metrics only has the
+    metrics of the process answering.
+
+    Recording a request is a few microseconds: the children of the labelled
+    metrics are cached, the pool and GC metrics are only written once per
+    FLUSH_INTERVAL_NS, by the request ending after it.
+"""
+import gc
+import os
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+MULTIPROC_DIR = "PROMETHEUS_MULTIPROC_DIR"
+
+FLUSH_INTERVAL_NS = 1_000_000_000
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# the states of TimedDatabase.pool_stats
+POOL_STATES = ("size", "idle")
+
+REQUESTS = Counter(
+    "http_requests", "Requests answered", ["method", "route", "status"]
+)
+LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time to answer a request",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requests being answered",
+    multiprocess_mode="livesum",
+)
+DB_POOL = Gauge(
+    "db_pool_connections",
+    "Connections of the database pools, by state",
+    ["state"],
+    multiprocess_mode="livesum",
+)
+GC_COLLECTIONS = Counter(
+    "gc_collections", "Garbage collections, by generation", ["generation"]
+)
+GC_PAUSE = Counter(
+    "gc_pause_seconds", "Time spent in garbage collections", ["generation"]
+)
+
+
+@lru_cache(maxsize=None)
+def _requests(method: str, route: str, status: int) -> Any:
+    return REQUESTS.labels(method, route, str(status))
+
+
+@lru_cache(maxsize=None)
+def _latency(method: str, route: str) -> Any:
+    return LATENCY.labels(method, route)
+
+
+def observe_request(
+    method: str, route: Optional[str], status: int, duration_ns: int
+) -> None:
+    """
+        route: the path template of the route, None when none matched
+    """
+    route = route or "unmatched"
+    _requests(method, route, status).inc()
+    _latency(method, route).observe(duration_ns / 1e9)
+
+
+class GCWatch:
+    """
+        Collections and pause time by generation, from gc.callbacks
+
+        The callback only adds them up: it can run in the middle of a write
+        to a metric, and the multiprocess metrics take a lock.
+    """
+
+    def __init__(self) -> None:
+        self.collections: List[int] = [0, 0, 0]
+        self.pause_ns: List[int] = [0, 0, 0]
+        self.start_ns = 0
+
+    def __call__(self, phase: str, info: Dict[str, Any]) -> None:
+        if phase == "start":
+            self.start_ns = time.perf_counter_ns()
+            return
+        generation = info["generation"]
+        self.collections[generation] += 1
+        self.pause_ns[generation] += time.perf_counter_ns() - self.start_ns
+
+    def flush(self) -> None:
+        for generation in range(3):
+            collections = self.collections[generation]
+            if not collections:
+                continue
+            pause_ns = self.pause_ns[generation]
+            # a collection during the flush is counted by the next one
+            self.collections[generation] -= collections
+            self.pause_ns[generation] -= pause_ns
+            GC_COLLECTIONS.labels(str(generation)).inc(collections)
+            GC_PAUSE.labels(str(generation)).inc(pause_ns / 1e9)
+
+
+gc_watch = GCWatch()
+gc.callbacks.append(gc_watch)
+
+
+class ProcessMetrics:
+    """
+        Writes the pool and GC metrics of the process, at most once per
+        FLUSH_INTERVAL_NS
+    """
+
+    def __init__(self, db: Any) -> None:
+        self.db = db
+        self.next_flush_ns = 0
+
+    def flush(self, now_ns: int) -> None:
+        if now_ns < self.next_flush_ns:
+            return
+        self.next_flush_ns = now_ns + FLUSH_INTERVAL_NS
+
+        gc_watch.flush()
+        stats = self.db.pool_stats
+        for state in POOL_STATES:
+            if state in stats:
+                DB_POOL.labels(state).set(stats[state])
+
+
+def latest() -> bytes:
+    """
+        The metrics in the text format, of all the workers when they share
+        PROMETHEUS_MULTIPROC_DIR
+    """
+    if not os.environ.get(MULTIPROC_DIR):
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
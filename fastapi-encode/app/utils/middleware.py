@@ -1,17 +1,105 @@
 import logging
 import time
+from typing import Optional
 
-from fastapi import FastAPI, Request
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.db import db
+from app.utils import metrics
+from app.utils.access_log import AccessLog
+from app.utils.timing import server_timing, start_db_timer
 
 logger = logging.getLogger(__name__)
 
+# started and stopped by the startup and shutdown events of the app
+access_log = AccessLog(
+    settings.ACCESS_LOG_LEVEL, settings.ACCESS_LOG_SAMPLE_RATE
+)
+
+
+def route_of(scope: Scope) -> Optional[str]:
+    """
+        The path template of the route that answered, set in the scope by
+        the router
+    """
+    route = scope.get("route")
+    if route is not None:
+        return getattr(route, "path_format", route.path)
+    endpoint = scope.get("endpoint")
+    return getattr(endpoint, "__name__", None)
+
+
+class PerformanceMonitoringMiddleware:
+    """
+        Adds the Server-Timing header (app and db time) to the responses,
+        writes the requests to the access log and to the Prometheus metrics
+
+        A plain ASGI middleware: the messages of the app go through as they
+        are, a streamed body included. Its headers, and so its
+        Server-Timing, are sent before the body is: the access log has the
+        duration of the whole response.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.process_metrics = metrics.ProcessMetrics(db)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics.IN_FLIGHT.inc()
+        start_ns = time.perf_counter_ns()
+        db_timer = start_db_timer()
+        status = 500
+
+        async def send_timed(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                total_ns = time.perf_counter_ns() - start_ns
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing", server_timing(total_ns, db_timer[0])
+                )
+                headers["X-Process-Time"] = str(total_ns / 1e9)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            metrics.IN_FLIGHT.dec()
+            now_ns = time.perf_counter_ns()
+            metrics.observe_request(
+                scope["method"], route_of(scope), status, now_ns - start_ns
+            )
+            self.process_metrics.flush(now_ns)
+            self.log(scope, status, start_ns)
 
-class PerformanceMonitoringMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
-        response = await call_next(request)
-        process_time = time.time() - start_time
-        response.headers["X-Process-Time"] = str(process_time)
-        logger.warn(f"Processed in {int(process_time*1000)  } ms")
-        return response
+    @staticmethod
+    def log(scope: Scope, status: int, start_ns: int) -> None:
+        level = access_log.level_of(status)
+        if level is None:
+            return
+        path = scope["path"]
+        if scope.get("query_string"):
+            path = f"{path}?{scope['query_string'].decode('latin-1')}"
+        client = scope.get("client")
+        headers = None
+        if status in (401, 403):
+            headers = {
+                name.decode("latin-1"): value.decode("latin-1")
+                for name, value in scope["headers"]
+            }
+        access_log.log(
+            level,
+            scope["method"],
+            path,
+            status,
+            (time.perf_counter_ns() - start_ns) / 1e6,
+            client[0] if client else "",
+            headers=headers,
+        )
@@ -0,0 +1,33 @@
+import base64
+import binascii
+import json
+from typing import Optional
+
+
+def encode_cursor(after: int) -> str:
+    """
+        Opaque keyset cursor: the last user_id of the page, base64url encoded
+    """
+    raw = json.dumps({"after": after}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    """
+        Returns the user_id to start after, 0 without cursor. Raises
+        ValueError when the cursor was not built by encode_cursor.
+    """
+    if not cursor:
+        return 0
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii"))
+        after = json.loads(raw)["after"]
+    except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError):
+        raise ValueError(f"invalid cursor {cursor!r}")
+
+    if not isinstance(after, int) or isinstance(after, bool) or after < 0:
+        raise ValueError(f"invalid cursor {cursor!r}")
+
+    return after
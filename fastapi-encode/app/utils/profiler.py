@@ -0,0 +1,326 @@
+"""
+    A sampling profiler of the worker, without restarting it under vmprof
+
+    A thread takes the stacks of the other threads of the process
+    (sys._current_frames) PROFILER_HZ times per second and counts each
+    distinct stack, leaving out the idle ones (the event loop waiting in its
+    selector, threads waiting on a lock or a queue). The counts are written
+    as folded stacks (flamegraph.pl, speedscope, inferno) or as a speedscope
+    file.
+
+    - GET /_profile?seconds=N samples the worker answering for N seconds,
+      see app/api/endpoints/routes_profile.py
+    - SIGUSR2 to a worker (not the master: it upgrades gunicorn) samples it
+      for PROFILER_SIGNAL_SECONDS, written to PROFILER_DIR
+    - with PROFILER_CONTINUOUS_HZ, the worker is sampled at a low rate for
+      its whole life, its stacks rooted under the route of their request
+"""
+import collections
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from pathlib import Path
+from types import FrameType
+from typing import (
+    Any,
+    Callable,
+    Counter,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from app.core.config import settings
+from app.utils.middleware import route_of
+
+logger = logging.getLogger(__name__)
+
+# name, file, line
+Frame = Tuple[str, str, int]
+Stack = Tuple[Frame, ...]
+
+# the innermost frames of a thread waiting for work
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("handlers.py", "dequeue"),
+    ("selectors.py", "select"),
+    ("socket.py", "accept"),
+    ("thread.py", "_worker"),
+}
+
+FORMATS = ("speedscope", "folded")
+
+# the threads of the samplers running, left out of the samples
+_samplers: Set[int] = set()
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+class Stacks:
+    """
+        Sampled stacks, root first, with the number of samples of each
+    """
+
+    def __init__(self, hz: float, max_stacks: int = 20000) -> None:
+        self.hz = hz
+        self.max_stacks = max_stacks
+        self.counts: Counter[Stack] = collections.Counter()
+
+    def add(self, stack: Stack) -> None:
+        if stack not in self.counts and len(self.counts) >= self.max_stacks:
+            stack = (("(more stacks)", "", 0),)
+        self.counts[stack] += 1
+
+    @property
+    def samples(self) -> int:
+        return sum(self.counts.copy().values())
+
+    def most_common(self, route: Optional[str] = None) -> List[Any]:
+        # a copy: the continuous profiler adds to its stacks meanwhile
+        return [
+            (stack, count)
+            for stack, count in self.counts.copy().most_common()
+            if route is None or stack[0][0] == route
+        ]
+
+    def folded(self, route: Optional[str] = None) -> str:
+        """
+            One "root;...;leaf count" line per stack, only the ones of route
+            when given (continuous profiler)
+        """
+        lines = []
+        for stack, count in self.most_common(route):
+            names = ";".join(
+                f"{name} ({file}:{line})" if file else name
+                for name, file, line in stack
+            )
+            lines.append(f"{names} {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(
+        self, name: str, route: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+            The speedscope file format (https://www.speedscope.app), the
+            weights are seconds
+        """
+        frames: Dict[Frame, int] = {}
+        samples, weights = [], []
+        for stack, count in self.most_common(route):
+            samples.append(
+                [frames.setdefault(frame, len(frames)) for frame in stack]
+            )
+            weights.append(count / self.hz)
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "app.utils.profiler",
+            "shared": {
+                "frames": [
+                    {"name": frame_name, "file": file, "line": line}
+                    for frame_name, file, line in frames
+                ]
+            },
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+        }
+
+    def render(
+        self, fmt: str, name: str, route: Optional[str] = None
+    ) -> Tuple[str, bytes]:
+        """
+            (content type, body) of the stacks in fmt, one of FORMATS
+        """
+        if fmt == "folded":
+            return "text/plain; charset=utf-8", self.folded(route).encode()
+        body = json.dumps(self.speedscope(name, route)).encode()
+        return "application/json", body
+
+
+def request_route(frame: FrameType) -> Optional[str]:
+    """
+        The path template of the request a frame handles: the ASGI
+        middleware and the router take its scope
+    """
+    if "scope" not in frame.f_code.co_varnames:
+        return None
+    scope = frame.f_locals.get("scope")
+    if not isinstance(scope, dict) or scope.get("type") != "http":
+        return None
+    return route_of(scope) or "(no route)"
+
+
+def stack_of(
+    frame: FrameType, route_of_frame: Optional[Callable] = None
+) -> Optional[Stack]:
+    """
+        The stack of a thread, root first, under its route with
+        route_of_frame. None when the thread is idle.
+    """
+    code = frame.f_code
+    if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+        return None
+
+    stack = []
+    route = None
+    current: Optional[FrameType] = frame
+    while current is not None:
+        code = current.f_code
+        stack.append((code.co_name, code.co_filename, current.f_lineno))
+        if route_of_frame is not None and route is None:
+            route = route_of_frame(current)
+        current = current.f_back
+    if route_of_frame is not None:
+        stack.append((route or "(no request)", "", 0))
+    stack.reverse()
+    return tuple(stack)
+
+
+def collect(
+    hz: float,
+    seconds: float,
+    route_of_frame: Optional[Callable] = None,
+    stop: Optional[threading.Event] = None,
+    stacks: Optional[Stacks] = None,
+) -> Stacks:
+    """
+        Samples the other threads for seconds, or until stop is set, from
+        the calling thread
+    """
+    stacks = stacks if stacks is not None else Stacks(hz=hz)
+    stop = stop or threading.Event()
+    interval = 1 / hz
+    deadline = time.monotonic() + seconds
+    ident = threading.get_ident()
+
+    _samplers.add(ident)
+    try:
+        while not stop.is_set() and time.monotonic() < deadline:
+            frames = sys._current_frames()
+            for thread_ident, frame in frames.items():
+                if thread_ident in _samplers:
+                    continue
+                stack = stack_of(frame, route_of_frame)
+                if stack is not None:
+                    stacks.add(stack)
+            # the frames of the threads must not outlive them
+            frames = frame = None  # type: ignore
+            stop.wait(interval)
+    finally:
+        _samplers.discard(ident)
+    return stacks
+
+
+class Profiler:
+    """
+        The profiling sessions and the continuous profiler of a worker
+    """
+
+    def __init__(
+        self,
+        hz: int = 100,
+        max_seconds: int = 60,
+        signal_seconds: int = 30,
+        directory: Path = Path("profiles"),
+        continuous_hz: float = 0.0,
+        route_of_frame: Optional[Callable] = request_route,
+    ) -> None:
+        self.hz = hz
+        self.max_seconds = max_seconds
+        self.signal_seconds = signal_seconds
+        self.directory = directory
+        self.continuous_hz = continuous_hz
+        self.route_of_frame = route_of_frame
+        self.continuous: Optional[Stacks] = None
+        self._session = threading.Lock()
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        """
+            In each worker (startup event): the SIGUSR2 handler and the
+            continuous profiler
+        """
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGUSR2, self.handle_signal)
+        if self.continuous_hz > 0 and self.continuous is None:
+            self._stop.clear()
+            self.continuous = Stacks(hz=self.continuous_hz)
+            threading.Thread(
+                target=collect,
+                kwargs={
+                    "hz": self.continuous_hz,
+                    "seconds": float("inf"),
+                    "route_of_frame": self.route_of_frame,
+                    "stop": self._stop,
+                    "stacks": self.continuous,
+                },
+                name="continuous-profiler",
+                daemon=True,
+            ).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def profile(self, seconds: float) -> Stacks:
+        """
+            Samples the worker for seconds, from the calling thread. One
+            session at a time.
+        """
+        if not self._session.acquire(blocking=False):
+            raise ProfilerBusy("a profile of this worker is already running")
+        try:
+            return collect(
+                self.hz, min(seconds, self.max_seconds), stop=self._stop
+            )
+        finally:
+            self._session.release()
+
+    def handle_signal(self, signum: int, frame: Optional[FrameType]) -> None:
+        threading.Thread(
+            target=self.profile_to_file, name="profiler", daemon=True
+        ).start()
+
+    def profile_to_file(self) -> None:
+        try:
+            stacks = self.profile(self.signal_seconds)
+        except ProfilerBusy as exc:
+            logger.warning(str(exc))
+            return
+
+        name = f"{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{name}.speedscope.json"
+        path.write_text(json.dumps(stacks.speedscope(name)))
+        logger.warning(
+            f"Profile of {stacks.samples} samples written to {path}"
+        )
+
+
+# started and stopped by the startup and shutdown events of the app
+profiler = Profiler(
+    hz=settings.PROFILER_HZ,
+    max_seconds=settings.PROFILER_MAX_SECONDS,
+    signal_seconds=settings.PROFILER_SIGNAL_SECONDS,
+    directory=settings.PROFILER_DIR,
+    continuous_hz=settings.PROFILER_CONTINUOUS_HZ,
+)
@@ -0,0 +1,97 @@
+import json
+from typing import Any, Callable, Dict, Iterable, List, Tuple, Type
+
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+from app.core.config import settings
+from app.utils.encoders import get_encoder
+
+# the JSON library of the responses and request bodies, see JSON_ENCODER
+encoder = get_encoder(settings.JSON_ENCODER)
+
+
+def dumps(content: Any) -> bytes:
+    """
+        The JSON bytes of content, written by the encoder of JSON_ENCODER
+    """
+    return encoder.dumps(content)
+
+
+def dumps_str(content: Any) -> str:
+    """
+        dumps, for the streaming serializers of app.utils.streaming
+    """
+    return encoder.dumps(content).decode("utf-8")
+
+
+def schema_fields(schema: Type[BaseModel]) -> Tuple[str, ...]:
+    """
+        The fields of the schema, in its order: the columns to select for
+        a trusted response
+    """
+    return tuple(schema.__fields__)
+
+
+def rows_to_dicts(
+    rows: Iterable[Any], fields: Tuple[str, ...]
+) -> List[Dict[str, Any]]:
+    """
+        The rows, selected with exactly the fields, as the dicts the schema
+        of the fields would produce, without building it
+    """
+    return [dict(zip(fields, row.values())) for row in rows]
+
+
+class EncodedJSONResponse(JSONResponse):
+    """
+        The default response class of the app: JSONResponse, written by the
+        encoder of JSON_ENCODER
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class EncodedRequest(Request):
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            body = await self.body()
+            try:
+                self._json = encoder.loads(body)
+            except json.JSONDecodeError:
+                raise
+            except ValueError as exc:
+                # ujson and rapidjson: the 422 of an invalid body, as json
+                raise json.JSONDecodeError(
+                    str(exc), body.decode(errors="replace"), 0
+                )
+        return self._json
+
+
+class EncodedRoute(APIRoute):
+    """
+        Reads the JSON request bodies with the encoder of JSON_ENCODER
+    """
+
+    def get_route_handler(self) -> Callable:
+        route_handler = super().get_route_handler()
+
+        async def encoded_route_handler(request: Request) -> Response:
+            request = EncodedRequest(request.scope, request.receive)
+            return await route_handler(request)
+
+        return encoded_route_handler
+
+
+class TrustedJSONResponse(EncodedJSONResponse):
+    """
+        Writes its content, the dicts of trusted database rows, straight to
+        JSON: neither validated against the response_model of the route
+        (still the one of the OpenAPI docs) nor walked by jsonable_encoder
+
+        The headers set on the `response` parameter of the route are not
+        applied to a returned Response, they have to be given here.
+    """
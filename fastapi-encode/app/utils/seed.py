@@ -0,0 +1,165 @@
+import datetime as dt
+import logging
+import random
+import time
+from itertools import islice
+from typing import Iterator
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+COPY_READ_SIZE = 1 << 20
+
+USERS_COLUMNS = (
+    "email",
+    "full_name",
+    "password",
+    "is_active",
+    "is_superuser",
+    "created_date",
+)
+
+FIRST_NAMES = (
+    "Ada",
+    "Alan",
+    "Barbara",
+    "Dennis",
+    "Edsger",
+    "Frances",
+    "Grace",
+    "Guido",
+    "John",
+    "Ken",
+    "Linus",
+    "Margaret",
+    "Niklaus",
+    "Radia",
+    "Tim",
+    "Yukihiro",
+)
+LAST_NAMES = (
+    "Allen",
+    "Dijkstra",
+    "Hamilton",
+    "Hopper",
+    "Kernighan",
+    "Knuth",
+    "Liskov",
+    "Lovelace",
+    "McCarthy",
+    "Perlman",
+    "Ritchie",
+    "Rossum",
+    "Thompson",
+    "Torvalds",
+    "Turing",
+    "Wirth",
+)
+
+
+class UsersDistribution(BaseModel):
+    """
+        How the values of the seeded users are spread. The same
+        distribution always produces the same rows, as the falcon seeder.
+    """
+
+    rows: int
+    seed: int = 42
+    active_ratio: float = 0.9
+    superuser_ratio: float = 0.01
+    days: int = 365
+    start: dt.datetime = dt.datetime(2020, 1, 1)
+
+
+def generate_users(
+    distribution: UsersDistribution, first: int = 0
+) -> Iterator[str]:
+    """
+        Yields the users as lines of a COPY ... FROM STDIN (text format), the
+        emails numbered from first
+    """
+    rng = random.Random(distribution.seed)
+    random_value = rng.random
+    choice = rng.choice
+    seconds = distribution.days * 86400
+    # naive UTC arithmetic, the rows must not depend on the local timezone
+    start = (distribution.start - dt.datetime(1970, 1, 1)).total_seconds()
+    fromtimestamp = dt.datetime.utcfromtimestamp
+    active_ratio = distribution.active_ratio
+    superuser_ratio = distribution.superuser_ratio
+
+    for n in range(first, first + distribution.rows):
+        created = fromtimestamp(start + int(random_value() * seconds))
+        yield (
+            f"user{n}@example.com\t"
+            f"{choice(FIRST_NAMES)} {choice(LAST_NAMES)}\t"
+            f"sha256${n:016x}\t"
+            f"{'t' if random_value() < active_ratio else 'f'}\t"
+            f"{'t' if random_value() < superuser_ratio else 'f'}\t"
+            f"{created:%Y-%m-%d %H:%M:%S}\n"
+        )
+
+
+class CopySource:
+    """
+        File-like object fed to COPY, generating the lines as they are read.
+        Only a chunk of lines lives in memory at any time.
+    """
+
+    def __init__(self, lines: Iterator[str], lines_per_chunk: int = 10000):
+        self._lines = lines
+        self._lines_per_chunk = lines_per_chunk
+        self._buffer = ""
+        self._position = 0
+
+    def read(self, size: int = -1) -> str:
+        if self._position >= len(self._buffer):
+            self._buffer = "".join(islice(self._lines, self._lines_per_chunk))
+            self._position = 0
+
+        if size < 0:
+            size = len(self._buffer)
+        data = self._buffer[self._position : self._position + size]
+        self._position += size
+        return data
+
+
+def seed_users(
+    settings, distribution: UsersDistribution, truncate: bool = True
+) -> int:
+    """
+        Loads the users described by distribution with a single COPY.
+        Returns the number of rows in the table afterwards.
+    """
+    import psycopg2
+
+    started = time.perf_counter()
+    connection = psycopg2.connect(str(settings.SQLALCHEMY_DATABASE_URI))
+    try:
+        with connection, connection.cursor() as cursor:
+            first = 0
+            if truncate:
+                cursor.execute("TRUNCATE TABLE users RESTART IDENTITY")
+            else:
+                # numbered after the rows already there: the emails stay unique
+                cursor.execute("SELECT coalesce(max(user_id), 0) FROM users")
+                first = cursor.fetchone()[0]
+
+            cursor.copy_expert(
+                f"COPY users ({', '.join(USERS_COLUMNS)}) FROM STDIN",
+                CopySource(generate_users(distribution, first)),
+                size=COPY_READ_SIZE,
+            )
+            cursor.execute("ANALYZE users")
+            cursor.execute("SELECT count(*) FROM users")
+            total = cursor.fetchone()[0]
+    finally:
+        connection.close()
+
+    elapsed = time.perf_counter() - started
+    logger.warning(
+        f"Seeded {distribution.rows} users in {elapsed:.1f}s "
+        f"({distribution.rows / elapsed:.0f} rows/s), {total} rows in table"
+    )
+    return total
@@ -0,0 +1,43 @@
+import json
+from typing import AsyncIterator, Callable, List
+
+NDJSON = "application/x-ndjson"
+
+
+async def chunked(items: AsyncIterator, size: int) -> AsyncIterator[List]:
+    """
+        Groups the items of an async iterator in lists of `size` items
+    """
+    chunk = []
+    async for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def stream_json_array(
+    chunks: AsyncIterator[List], dumps: Callable = json.dumps
+) -> AsyncIterator[bytes]:
+    """
+        Serializes the chunks of items as one JSON array, chunk by chunk
+    """
+    yield b"["
+    separator = ""
+    async for chunk in chunks:
+        # each chunk is a valid array, only its items are kept
+        yield (separator + dumps(chunk)[1:-1]).encode("utf-8")
+        separator = ","
+    yield b"]"
+
+
+async def stream_ndjson(
+    chunks: AsyncIterator[List], dumps: Callable = json.dumps
+) -> AsyncIterator[bytes]:
+    """
+        Serializes the chunks of items as newline delimited JSON
+    """
+    async for chunk in chunks:
+        yield "".join(dumps(item) + "\n" for item in chunk).encode("utf-8")
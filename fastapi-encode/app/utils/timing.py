@@ -0,0 +1,43 @@
+"""
+    The time spent in the database by the current request, for the
+    Server-Timing header of PerformanceMonitoringMiddleware
+
+    The middleware starts a timer per request, in a context variable: the
+    queries of app.core.db add their duration to it. The timer is a list so
+    that the copies of the context (tasks started by the request) add to
+    the same one.
+"""
+import time
+from contextvars import ContextVar
+from typing import List, Optional
+
+_db_timer: ContextVar[Optional[List[int]]] = ContextVar(
+    "db_timer", default=None
+)
+
+
+def start_db_timer() -> List[int]:
+    """
+        A new timer for the current request, [nanoseconds in the database]
+    """
+    timer = [0]
+    _db_timer.set(timer)
+    return timer
+
+
+def add_db_time(start_ns: int) -> None:
+    """
+        Adds the time since start_ns to the timer of the current request,
+        if any (scripts, startup events)
+    """
+    timer = _db_timer.get()
+    if timer is not None:
+        timer[0] += time.perf_counter_ns() - start_ns
+
+
+def server_timing(total_ns: int, db_ns: int) -> str:
+    """
+        The Server-Timing header value: the time in the app, outside of the
+        database, and in the database, in milliseconds
+    """
+    return f"app;dur={(total_ns - db_ns) / 1e6:.3f}, db;dur={db_ns / 1e6:.3f}"
@@ -0,0 +1,61 @@
+"""
+    Measures the JSON encoders of app/utils/encoders.py on users payloads,
+    from one user up to 100k users, to pick their PREFERENCE order
+
+    python -m benchmarks.encoders [--rows 1,100,10000,100000] [--repeat 3]
+
+    dumps: the users, as UserDBSchema dicts, to JSON bytes (responses)
+    loads: those bytes back (request bodies)
+"""
+import argparse
+import json
+import timeit
+from typing import Any, Dict, List
+
+from app.domain.users.users_schema import UserDBSchema
+from app.utils.encoders import available, get_encoder
+
+
+def make_users(rows: int) -> List[Dict[str, Any]]:
+    return [
+        UserDBSchema(
+            user_id=user_id,
+            full_name=f"User {user_id}",
+            email=f"user{user_id}@example.com",
+        ).dict()
+        for user_id in range(rows)
+    ]
+
+
+def best_us(case, repeat: int) -> float:
+    number, _ = timeit.Timer(case).autorange()
+    best = min(timeit.repeat(case, number=number, repeat=repeat))
+    return best / number * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", default="1,100,10000,100000")
+    parser.add_argument("--repeat", type=int, default=3)
+    options = parser.parse_args()
+
+    encoders = [get_encoder(name) for name in available()]
+    print(f"{'encoder':<10} {'rows':>7} {'dumps us':>12} {'loads us':>12}")
+    for rows in map(int, options.rows.split(",")):
+        users = make_users(rows)
+        payload = users[0] if rows == 1 else users
+
+        for encoder in encoders:
+            body = encoder.dumps(payload)
+            # same JSON whichever the encoder
+            assert json.loads(body) == payload, encoder.name
+
+            dumps = best_us(lambda: encoder.dumps(payload), options.repeat)
+            loads = best_us(lambda: encoder.loads(body), options.repeat)
+            print(
+                f"{encoder.name:<10} {rows:>7} {dumps:>12.1f} {loads:>12.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+    Measures the per-request overhead of PerformanceMonitoringMiddleware,
+    against the BaseHTTPMiddleware it replaced and no middleware at all
+
+    python -m benchmarks.middleware [--requests 20000]
+
+    The requests are sent straight to the ASGI app, without a server nor a
+    database: a small JSON response and a response streamed in 100 chunks.
+    The access log of each middleware is written to a null handler.
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from app.utils.middleware import PerformanceMonitoringMiddleware, access_log
+
+previous_logger = logging.getLogger("benchmarks.previous")
+
+
+class PreviousMiddleware(BaseHTTPMiddleware):
+    # PerformanceMonitoringMiddleware before it became a plain ASGI one
+    async def dispatch(self, request: Request, call_next):
+        start_time = time.time()
+        response = await call_next(request)
+        process_time = time.time() - start_time
+        response.headers["X-Process-Time"] = str(process_time)
+        previous_logger.warning(f"Processed in {int(process_time*1000)  } ms")
+        return response
+
+
+async def user(request: Request) -> JSONResponse:
+    return JSONResponse({"user_id": 1, "email": "user1@example.com"})
+
+
+async def users(request: Request) -> StreamingResponse:
+    async def chunks():
+        for _ in range(100):
+            yield b'{"user_id": 1, "email": "user1@example.com"}\n'
+
+    return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+
+def make_app(middleware) -> Starlette:
+    app = Starlette(routes=[Route("/user", user), Route("/users", users)])
+    if middleware is not None:
+        app.add_middleware(middleware)
+    return app
+
+
+async def call(app, path: str) -> None:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 8000),
+    }
+
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # the client stays connected
+        await asyncio.Event().wait()
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def per_request_us(app, path: str, requests: int) -> float:
+    for _ in range(100):
+        await call(app, path)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await call(app, path)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    options = parser.parse_args()
+
+    previous_logger.addHandler(logging.NullHandler())
+    previous_logger.propagate = False
+    access_log.start(logging.NullHandler())
+
+    apps = {
+        "none": make_app(None),
+        "previous": make_app(PreviousMiddleware),
+        "asgi": make_app(PerformanceMonitoringMiddleware),
+    }
+    print(f"{'middleware':<10} {'path':<7} {'us/request':>11} {'overhead':>9}")
+    for path in ("/user", "/users"):
+        baseline = None
+        for name, app in apps.items():
+            us = await per_request_us(app, path, options.requests)
+            baseline = us if baseline is None else baseline
+            print(f"{name:<10} {path:<7} {us:>11.1f} {us - baseline:>9.1f}")
+    access_log.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
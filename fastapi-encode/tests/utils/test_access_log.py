@@ -0,0 +1,71 @@
+import io
+import json
+import logging
+from typing import Any, Dict, Iterator, List, Tuple
+
+import pytest
+
+from app.utils import access_log
+
+
+@pytest.fixture
+def stream() -> Iterator[Tuple[access_log.AccessLog, io.StringIO]]:
+    stream = io.StringIO()
+    log = access_log.AccessLog()
+    log.start(logging.StreamHandler(stream))
+    yield log, stream
+    log.stop()
+
+
+def entries(
+    log: access_log.AccessLog, stream: io.StringIO
+) -> List[Dict[str, Any]]:
+    log.stop()
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_redact_headers() -> None:
+    headers = {
+        "authorization": "Bearer secret",
+        "Cookie": "session=secret",
+        "X-API-KEY": "secret",
+        "user-agent": "curl/7.68.0",
+    }
+    assert access_log.redact_headers(headers) == {
+        "authorization": access_log.REDACTED,
+        "Cookie": access_log.REDACTED,
+        "X-API-KEY": access_log.REDACTED,
+        "user-agent": "curl/7.68.0",
+    }
+    assert headers["authorization"] == "Bearer secret"
+
+
+def test_log_redacts_the_headers(
+    stream: Tuple[access_log.AccessLog, io.StringIO]
+) -> None:
+    log, output = stream
+    log.log(
+        logging.WARNING,
+        "GET",
+        "/_profile",
+        401,
+        1.5,
+        "127.0.0.1",
+        headers={"authorization": "Bearer secret", "host": "localhost"},
+    )
+    (entry,) = entries(log, output)
+    assert entry["status"] == 401
+    assert entry["headers"] == {
+        "authorization": access_log.REDACTED,
+        "host": "localhost",
+    }
+    assert "secret" not in output.getvalue()
+
+
+def test_log_without_headers(
+    stream: Tuple[access_log.AccessLog, io.StringIO]
+) -> None:
+    log, output = stream
+    log.log(logging.INFO, "GET", "/users", 200, 1.5, "127.0.0.1")
+    (entry,) = entries(log, output)
+    assert "headers" not in entry
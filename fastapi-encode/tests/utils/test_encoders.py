@@ -0,0 +1,80 @@
+import datetime as dt
+import decimal
+import uuid
+from typing import Any
+
+import pytest
+
+from app.utils import encoders
+
+ENCODERS = encoders.available()
+
+PAYLOAD = {
+    "text": 'é / "quoted"',
+    "number": 1,
+    "float": 0.25,
+    "flag": False,
+    "nothing": None,
+    "items": [1, "two", {"b": 2, "a": 1}],
+    "naive": dt.datetime(2020, 1, 2, 3, 4, 5, 678901),
+    "aware": dt.datetime(
+        2020, 1, 2, 3, 4, 5, tzinfo=dt.timezone(dt.timedelta(hours=2))
+    ),
+    "date": dt.date(2020, 1, 2),
+    "time": dt.time(3, 4, 5),
+    "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    "decimal": decimal.Decimal("12.5"),
+}
+
+
+@pytest.fixture(params=ENCODERS)
+def encoder(request: Any) -> encoders.JSONEncoder:
+    return encoders.get_encoder(request.param)
+
+
+def test_all_encoders_write_the_same_json(
+    encoder: encoders.JSONEncoder,
+) -> None:
+    expected = encoders.get_encoder("json").dumps(PAYLOAD)
+    assert encoder.dumps(PAYLOAD) == expected
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (dt.datetime(2020, 1, 2, 3, 4, 5), b'"2020-01-02T03:04:05"'),
+        (dt.datetime(2020, 1, 2, 3, 4, 5, 6), b'"2020-01-02T03:04:05.000006"'),
+        (
+            dt.datetime(2020, 1, 2, tzinfo=dt.timezone.utc),
+            b'"2020-01-02T00:00:00+00:00"',
+        ),
+        (dt.date(2020, 1, 2), b'"2020-01-02"'),
+        (dt.time(3, 4, 5), b'"03:04:05"'),
+        (uuid.UUID(int=1), b'"00000000-0000-0000-0000-000000000001"'),
+        (decimal.Decimal("1.10"), b"1.1"),
+    ],
+)
+def test_values_without_json_type(
+    encoder: encoders.JSONEncoder, value: Any, expected: bytes
+) -> None:
+    assert encoder.dumps([value]) == b"[" + expected + b"]"
+
+
+def test_unknown_types_are_refused(encoder: encoders.JSONEncoder) -> None:
+    with pytest.raises(TypeError):
+        encoder.dumps({"value": object()})
+
+
+def test_loads_str_and_bytes(encoder: encoders.JSONEncoder) -> None:
+    content = encoder.dumps({"a": [1, "é"]})
+    assert encoder.loads(content) == {"a": [1, "é"]}
+    assert encoder.loads(content.decode("utf-8")) == {"a": [1, "é"]}
+
+
+def test_auto_is_the_first_installed() -> None:
+    assert encoders.get_encoder("auto").name == ENCODERS[0]
+
+
+def test_unknown_encoder() -> None:
+    with pytest.raises(ValueError):
+        encoders.get_encoder("simplejson")
@@ -0,0 +1,92 @@
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+from typing import Dict, Tuple
+
+from prometheus_client.parser import text_string_to_metric_families
+
+ROOT = Path(__file__).parents[2]
+
+# a worker answering two requests, still in the middle of a third one
+WORKER = """
+from app.utils import metrics
+
+metrics.observe_request("GET", "/users/{user_id}", 200, 2_000_000)
+metrics.observe_request("GET", None, 404, 1_000_000)
+metrics.IN_FLIGHT.inc()
+"""
+
+SCRAPE = """
+import sys
+
+from fastapi import FastAPI
+from starlette.testclient import TestClient
+
+from app.api.endpoints import routes_metrics
+
+app = FastAPI()
+app.include_router(routes_metrics.router)
+response = TestClient(app).get("/metrics")
+assert response.status_code == 200, response.status_code
+assert response.headers["content-type"].startswith("text/plain")
+sys.stdout.write(response.text)
+"""
+
+# the gunicorn master starting again
+ON_STARTING = """
+from app import gunicorn_conf
+
+gunicorn_conf.on_starting(None)
+"""
+
+
+def run(code: str, multiproc_dir: Path) -> str:
+    env = dict(
+        os.environ,
+        PYTHONPATH=str(ROOT),
+        PROMETHEUS_MULTIPROC_DIR=str(multiproc_dir),
+    )
+    return subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", textwrap.dedent(code)],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.PIPE,
+        check=True,
+        universal_newlines=True,
+    ).stdout
+
+
+def samples(text: str) -> Dict[Tuple, float]:
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(text)
+        for sample in family.samples
+    }
+
+
+def test_metrics_of_all_the_workers(tmp_path: Path) -> None:
+    run(WORKER, tmp_path)
+    run(WORKER, tmp_path)
+
+    scraped = samples(run(SCRAPE, tmp_path))
+
+    ok = (("method", "GET"), ("route", "/users/{user_id}"), ("status", "200"))
+    unmatched = (("method", "GET"), ("route", "unmatched"), ("status", "404"))
+    assert scraped[("http_requests_total", ok)] == 2
+    assert scraped[("http_requests_total", unmatched)] == 2
+    assert scraped[("http_request_duration_seconds_count", ok[:2])] == 2
+    assert scraped[("http_requests_in_flight", ())] == 2
+
+
+def test_gunicorn_on_starting_keeps_other_files(tmp_path: Path) -> None:
+    run(WORKER, tmp_path)
+    (tmp_path / "keep.txt").write_text("not a metrics file")
+
+    run(ON_STARTING, tmp_path)
+
+    # only the files of prometheus_client: the directory may be shared
+    assert os.listdir(tmp_path) == ["keep.txt"]
+    scraped = samples(run(SCRAPE, tmp_path))
+    assert not any(name == "http_requests_total" for name, _ in scraped)
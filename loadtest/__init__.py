@@ -0,0 +1,2 @@
+"""Load-test harness driving every application of the repository with the
+same workloads, see README.md"""
@@ -0,0 +1,246 @@
+import os
+import signal
+import subprocess  # nosec
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Tuple
+from urllib.parse import urlparse
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+class DbSettings:
+    """Connection settings shared by every application under test"""
+
+    def __init__(self, url: str):
+        parsed = urlparse(url)
+        self.url = url
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 5432
+        self.user = parsed.username or ""
+        self.password = parsed.password or ""
+        self.dbname = parsed.path.lstrip("/")
+
+
+class Framework:
+    """How to boot one application and which routes implement each
+    operation of the workload"""
+
+    name: str = ""
+    directory: Path = REPO_ROOT
+    health_path: str = "/"
+    # operation -> (HTTP method, path template)
+    routes: Dict[str, Tuple[str, str]] = {}
+
+    def command(self, python: str) -> List[str]:
+        raise NotImplementedError
+
+    def seed_command(self, python: str, rows: int, seed: int) -> List[str]:
+        raise NotImplementedError
+
+    def environment(
+        self, db: DbSettings, bind: str, workers: int
+    ) -> Dict[str, str]:
+        raise NotImplementedError
+
+
+class Falcon(Framework):
+    name = "falcon"
+    directory = REPO_ROOT / "falcon"
+    health_path = "/"
+    routes = {
+        "create": ("POST", "/users"),
+        "get": ("GET", "/users?user_id={user_id}"),
+        "list": ("GET", "/users/all"),
+        "update": ("PUT", "/users?user_id={user_id}"),
+        "delete": ("DELETE", "/users?user_id={user_id}"),
+    }
+
+    def command(self, python: str) -> List[str]:
+        return [python, "manage.py", "run"]
+
+    def seed_command(self, python: str, rows: int, seed: int) -> List[str]:
+        return [
+            python,
+            "manage.py",
+            "seed",
+            f"--rows={rows}",
+            f"--seed={seed}",
+        ]
+
+    def environment(
+        self, db: DbSettings, bind: str, workers: int
+    ) -> Dict[str, str]:
+        return {
+            "HP__DB_HOST": db.host,
+            "HP__DB_PORT": str(db.port),
+            "HP__DB_USER": db.user,
+            "HP__DB_PASSWORD": db.password,
+            "HP__DB_DBNAME": db.dbname,
+            "HP__GUNICORN_BIND": bind,
+            "HP__GUNICORN_WORKERS": str(workers),
+        }
+
+
+class FalconASGI(Falcon):
+    """The ASGI build of the falcon app (app/asgi.py): same routes and
+    settings, asyncpg and uvicorn workers"""
+
+    name = "falcon-asgi"
+
+    def command(self, python: str) -> List[str]:
+        return [python, "manage.py", "run-asgi"]
+
+
+class FastAPIEncode(Framework):
+    name = "fastapi-encode"
+    directory = REPO_ROOT / "fastapi-encode"
+    health_path = "/openapi.json"
+    routes = {
+        "create": ("POST", "/users/"),
+        "get": ("GET", "/users/{user_id}"),
+        "list": ("GET", "/users/all"),
+        "update": ("PUT", "/users/{user_id}"),
+        "delete": ("DELETE", "/users/{user_id}"),
+    }
+
+    def command(self, python: str) -> List[str]:
+        return [
+            python,
+            "-m",
+            "gunicorn",
+            "-k",
+            "uvicorn.workers.UvicornWorker",
+            "-c",
+            "app/gunicorn_conf.py",
+            "app.main:app",
+        ]
+
+    def seed_command(self, python: str, rows: int, seed: int) -> List[str]:
+        return [
+            python,
+            "app/manage.py",
+            "seed-db",
+            f"--rows={rows}",
+            f"--seed={seed}",
+        ]
+
+    def environment(
+        self, db: DbSettings, bind: str, workers: int
+    ) -> Dict[str, str]:
+        return {
+            "DB_HOST": db.host,
+            "DB_PORT": str(db.port),
+            "DB_USER": db.user,
+            "DB_PASSWORD": db.password,
+            "DB_NAME": db.dbname,
+            "BIND": bind,
+            "WEB_CONCURRENCY": str(workers),
+            # only the access log of the app middleware, as falcon
+            "ACCESS_LOG": "",
+        }
+
+
+FRAMEWORKS: Dict[str, Framework] = {
+    framework.name: framework for framework in (Falcon(), FalconASGI(), FastAPIEncode())
+}
+
+
+def seed_dataset(
+    framework: Framework, python: str, db: DbSettings, rows: int, seed: int
+) -> None:
+    """Fills the users table with the framework's own seed command, every
+    command generating the same rows for the same seed"""
+    env = dict(os.environ)
+    env.update(framework.environment(db, "", 1))
+    subprocess.run(  # nosec
+        framework.seed_command(python, rows, seed),
+        cwd=framework.directory,
+        env=env,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+class AppProcess:
+    """Boots an application in its own process group, and waits until it
+    answers on its health route"""
+
+    def __init__(
+        self,
+        framework: Framework,
+        python: str,
+        db: DbSettings,
+        host: str,
+        port: int,
+        workers: int,
+        log_path: Path,
+        boot_timeout: float = 60.0,
+    ):
+        self.framework = framework
+        self.python = python
+        self.db = db
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.log_path = log_path
+        self.boot_timeout = boot_timeout
+        self._process = None
+        self._log = None
+
+    def __enter__(self) -> "AppProcess":
+        env = dict(os.environ)
+        env.update(
+            self.framework.environment(
+                self.db, f"{self.host}:{self.port}", self.workers
+            )
+        )
+        self._log = open(self.log_path, "wb")
+        self._process = subprocess.Popen(  # nosec
+            self.framework.command(self.python),
+            cwd=self.framework.directory,
+            env=env,
+            stdout=self._log,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+        try:
+            self._wait_until_ready()
+        except Exception:
+            self.__exit__(None, None, None)
+            raise
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._process.poll() is None:
+            os.killpg(self._process.pid, signal.SIGTERM)
+            try:
+                self._process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                os.killpg(self._process.pid, signal.SIGKILL)
+                self._process.wait()
+        self._log.close()
+
+    def _wait_until_ready(self) -> None:
+        url = f"http://{self.host}:{self.port}{self.framework.health_path}"
+        deadline = time.monotonic() + self.boot_timeout
+        while time.monotonic() < deadline:
+            if self._process.poll() is not None:
+                raise RuntimeError(
+                    f"{self.framework.name} exited during boot, "
+                    f"see {self.log_path}"
+                )
+            try:
+                with urllib.request.urlopen(url, timeout=1) as resp:  # nosec
+                    if resp.status == 200:
+                        return
+            except (urllib.error.URLError, ConnectionError, OSError):
+                pass
+            time.sleep(0.25)
+
+        raise RuntimeError(
+            f"{self.framework.name} not ready after {self.boot_timeout}s, "
+            f"see {self.log_path}"
+        )
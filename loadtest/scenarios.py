@@ -0,0 +1,131 @@
+import asyncio
+import itertools
+import json
+import random
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .client import HTTPConnection
+from .frameworks import Framework
+from .stats import RouteRecorder
+
+# operations in the order they are played, each one relies on the users
+# created by the first one
+OPERATIONS = ("create", "get", "list", "update", "delete")
+
+Request = Tuple[str, str, Optional[bytes]]
+
+
+def user_payload(email: str, revision: int = 0) -> bytes:
+    return json.dumps(
+        {
+            "full_name": f"Load Test {email} r{revision}",
+            "email": email,
+            "password": f"password-{revision}",
+        }
+    ).encode()
+
+
+class Workload:
+    """The requests played against one framework
+
+    Every request is planned before its operation starts, from a seeded
+    random generator: two frameworks given the same seed receive exactly
+    the same sequence, and building the requests is not measured.
+    """
+
+    def __init__(self, framework: Framework, seed: int, requests: int):
+        self.framework = framework
+        self.requests = requests
+        self.rng = random.Random(seed)
+        self.user_ids: List[int] = []
+        self.emails: Dict[int, str] = {}
+
+    def route(self, operation: str) -> str:
+        method, template = self.framework.routes[operation]
+        return f"{method} {template.split('?')[0]}"
+
+    def plan(self, operation: str) -> List[Request]:
+        method, template = self.framework.routes[operation]
+
+        if operation == "create":
+            return [
+                (method, template, user_payload(f"loadtest-{n}@example.com"))
+                for n in range(self.requests)
+            ]
+
+        if operation == "list":
+            return [(method, template, None)] * self.requests
+
+        if not self.user_ids:
+            return []
+
+        # responses arrive in any order, the draw must not depend on it
+        user_ids = sorted(self.user_ids)
+        if operation == "delete":
+            ids = self.rng.sample(user_ids, min(self.requests, len(user_ids)))
+        else:
+            ids = [self.rng.choice(user_ids) for _ in range(self.requests)]
+
+        body = None
+        plan = []
+        for revision, user_id in enumerate(ids):
+            if operation == "update":
+                body = user_payload(self.emails[user_id], revision)
+            plan.append((method, template.format(user_id=user_id), body))
+        return plan
+
+    def on_response(self, operation: str) -> Optional[Callable]:
+        if operation != "create":
+            return None
+
+        def remember_user(payload: bytes) -> None:
+            user = json.loads(payload)
+            self.user_ids.append(user["user_id"])
+            self.emails[user["user_id"]] = user["email"]
+
+        return remember_user
+
+
+async def play(
+    host: str,
+    port: int,
+    plan: List[Request],
+    concurrency: int,
+    recorder: RouteRecorder,
+    on_response: Optional[Callable] = None,
+) -> None:
+    """Plays the plan over `concurrency` connections, in order"""
+    tickets = itertools.count()
+
+    async def worker() -> None:
+        connection = HTTPConnection(host, port)
+        try:
+            while True:
+                index = next(tickets)
+                if index >= len(plan):
+                    return
+                method, path, body = plan[index]
+                start = time.perf_counter_ns()
+                try:
+                    status, _, payload = await connection.request(
+                        method, path, body
+                    )
+                except (OSError, EOFError, ValueError, asyncio.TimeoutError):
+                    status, payload = None, b""
+                recorder.record(time.perf_counter_ns() - start, status)
+                if on_response is not None and status == 200:
+                    on_response(payload)
+        finally:
+            await connection.close()
+
+    recorder.started_ns = time.perf_counter_ns()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    recorder.finished_ns = time.perf_counter_ns()
+
+
+async def warmup(
+    host: str, port: int, path: str, requests: int, concurrency: int
+) -> None:
+    plan = [("GET", path, None)] * requests
+    await play(host, port, plan, concurrency, RouteRecorder("warmup"))
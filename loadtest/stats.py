@@ -0,0 +1,68 @@
+import math
+from array import array
+from collections import Counter
+from typing import Dict, Optional
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def percentile(sorted_values: array, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted array"""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+
+class RouteRecorder:
+    """Collects the outcome of every request sent to one route
+
+    Latencies are kept in nanoseconds in a compact array, so a few million
+    requests do not distort the measurement with allocations.
+    """
+
+    def __init__(self, route: str):
+        self.route = route
+        self.latencies = array("q")
+        self.status_codes: Counter = Counter()
+        self.errors = 0
+        self.started_ns: Optional[int] = None
+        self.finished_ns: Optional[int] = None
+
+    def record(self, latency_ns: int, status: Optional[int]) -> None:
+        self.latencies.append(latency_ns)
+        if status is None:
+            self.status_codes["connection-error"] += 1
+            self.errors += 1
+            return
+
+        self.status_codes[str(status)] += 1
+        if status >= 400:
+            self.errors += 1
+
+    def summary(self) -> Dict:
+        requests = len(self.latencies)
+        elapsed_s = (self.finished_ns - self.started_ns) / 1e9
+        ordered = array("q", sorted(self.latencies))
+
+        return {
+            "route": self.route,
+            "requests": requests,
+            "errors": self.errors,
+            "error_rate": self.errors / requests if requests else 0.0,
+            "elapsed_s": round(elapsed_s, 3),
+            "throughput_rps": round(requests / elapsed_s, 2)
+            if elapsed_s
+            else 0.0,
+            "latency_ms": {
+                **{
+                    f"p{pct:g}": round(percentile(ordered, pct) / 1e6, 3)
+                    for pct in PERCENTILES
+                },
+                "mean": round(sum(ordered) / requests / 1e6, 3)
+                if requests
+                else 0.0,
+                "max": round(ordered[-1] / 1e6, 3) if requests else 0.0,
+            },
+            "status_codes": dict(self.status_codes),
+        }